@@ -2,22 +2,161 @@
 AI service integration with Google Gemini
 """
 
-from typing import List, Optional
-from PIL import Image
-import google.generativeai as genai
+import os
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple, Union
 
-from models import Topic, Message
+from canvas_images import CanvasImage
+from models import Topic, Message, HELP_REQUEST_TEXT
+from answer_checker import CheckResult, generated_problem, prompt_note
+from problem_generator import generator_for, greeting
+from topic_retrieval import select_materials
+from tracing import span
+from metrics import (
+    AI_CACHE,
+    AI_COALESCED,
+    AI_ERRORS,
+    AI_IN_FLIGHT,
+    AI_IMAGE_BYTES,
+    AI_TOKENS,
+    LOCAL_PROBLEMS,
+)
+from response_cache import DEFAULT_CACHE_DIR, ResponseCache, make_key
+from single_flight import SingleFlight
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# "retrieval" sends only the materials relevant to the current turn,
+# "full" always sends the whole materials section
+CONTEXT_STRATEGY = os.getenv("LEIA_CONTEXT_STRATEGY", "retrieval")
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Feedback for identical prompts (and canvas images) is served from here
+response_cache = ResponseCache(cache_dir=DEFAULT_CACHE_DIR)
+_in_flight_calls = SingleFlight()
+
+# google.generativeai is slow to import, so it is loaded and configured on
+# the first model request rather than at application startup
+_configured_key: Optional[str] = None
+_configure_lock = threading.Lock()
 
 
 def get_gemini_model(api_key: Optional[str]):
     """Get configured Gemini model"""
+    global _configured_key
     if not api_key:
         return None
-    return genai.GenerativeModel("gemini-2.5-flash")
 
+    with span("ai.model_init"):
+        import google.generativeai as genai
+
+        with _configure_lock:
+            if _configured_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_key = api_key
+        return genai.GenerativeModel(MODEL_NAME)
+
+
+@dataclass
+class CallUsage:
+    """Tokens, payload and latency of one Gemini call (filled in by the call)"""
+
+    model: str = MODEL_NAME
+    context_strategy: str = "full"  # "retrieval" when trimmed materials were sent
+    prompt_chars: int = 0
+    image_bytes: int = 0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    model_latency_ms: Optional[float] = None  # None if no call was made
+    cache_hit: bool = False  # Served from the response cache without a call
+    coalesced: bool = False  # Shared an identical call already in flight
+    prefetched: bool = False  # Generated speculatively before it was asked for
+    local_check: Optional[str] = None  # "correct"/"incorrect" if verified locally
+    served_locally: bool = False  # Templated feedback, no model call
+
+
+def _image_part(image: Union["Image.Image", CanvasImage]) -> dict:
+    """Inline PNG part for an image, so the bytes sent are known exactly"""
+    if isinstance(image, CanvasImage):
+        # Already encoded for the session, no need to do it twice
+        return {"mime_type": "image/png", "data": bytes(image)}
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return {"mime_type": "image/png", "data": buffer.getvalue()}
+
+
+def _call_model(model, contents: Any, kind: str, image: bool):
+    """One upstream call: (text, usage metadata, latency ms)"""
+    with AI_IN_FLIGHT.track(), span(
+        "ai.generate_content", kind=kind, image=image
+    ) as call:
+        response = model.generate_content(contents)
+        text = response.text
+    return text, getattr(response, "usage_metadata", None), call.duration_ms
+
+
+def _generate(
+    model,
+    prompt: str,
+    image_part: Optional[dict],
+    kind: str,
+    usage: Optional[CallUsage],
+) -> str:
+    """Call the model and record usage; exceptions propagate to the caller.
+
+    Identical requests already in flight (e.g. a whole class starting the
+    same topic at once) share the pending call instead of making their own.
+    """
+    image_bytes = len(image_part["data"]) if image_part else 0
+    contents: Any = [prompt, image_part] if image_part else prompt
+    key = make_key(kind, MODEL_NAME, prompt, image_part["data"] if image_part else None)
+
+    (text, meta, latency_ms), shared = _in_flight_calls.do(
+        key, lambda: _call_model(model, contents, kind, bool(image_part))
+    )
+    if shared:
+        AI_COALESCED.inc(kind=kind)
+        if usage is not None:
+            usage.coalesced = True
+        return text
+
+    input_tokens = getattr(meta, "prompt_token_count", None)
+    output_tokens = getattr(meta, "candidates_token_count", None)
+    AI_TOKENS.inc(input_tokens or 0, direction="input")
+    AI_TOKENS.inc(output_tokens or 0, direction="output")
+    if image_bytes:
+        AI_IMAGE_BYTES.inc(image_bytes)
+
+    if usage is not None:
+        usage.prompt_chars = len(prompt)
+        usage.image_bytes = image_bytes
+        usage.input_tokens = input_tokens
+        usage.output_tokens = output_tokens
+        usage.total_tokens = getattr(meta, "total_token_count", None)
+        usage.model_latency_ms = latency_ms
+    return text
+
+
+def select_context(topic: Topic, query: str, strategy: Optional[str] = None) -> str:
+    """Materials to include in the prompt for this turn"""
+    with span("ai.select_context") as current:
+        if (strategy or CONTEXT_STRATEGY) == "retrieval":
+            selected = select_materials(topic, query)
+            if selected is not None:
+                current.attrs["retrieved"] = True
+                return selected
+        return topic.materials
 
-def create_system_prompt(topic: Topic) -> str:
+
+def create_system_prompt(topic: Topic, materials: Optional[str] = None) -> str:
     """Create the system prompt for the AI tutor"""
+    if materials is None:
+        materials = topic.materials
     return f"""You are an AI tutor for Leia, age 9.
 
 CRITICAL: Write in SHORT, SIMPLE sentences. Max 10 words per sentence when possible.
@@ -28,7 +167,7 @@ Goals:
 {topic.objectives}
 
 Materials:
-{topic.materials}
+{materials}
 
 Teaching Style:
 - Ask questions, don't give answers
@@ -38,24 +177,50 @@ Teaching Style:
 - Be warm and encouraging"""
 
 
-def generate_initial_task(topic: Topic, api_key: Optional[str]) -> str:
-    """Generate the initial practice problem"""
+def generate_initial_task(
+    topic: Topic,
+    api_key: Optional[str],
+    usage: Optional[CallUsage] = None,
+    personalize: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Generate the initial practice problem (``usage`` is filled in if given).
+
+    Topics with a problem generator start on a generated problem without a
+    model call. ``personalize`` is applied to this caller's copy of the
+    response, so students sharing one coalesced call can still get their
+    own greeting.
+    """
+    generator = generator_for(topic)
+    if generator is not None:
+        LOCAL_PROBLEMS.inc(use="greeting")
+        if usage is not None:
+            usage.model = "local"
+            usage.served_locally = True
+        task = greeting(topic, generator.generate_one())
+        return personalize(task) if personalize else task
+
     model = get_gemini_model(api_key)
     if not model:
         return "Please configure your GEMINI_API_KEY in the .env file."
 
-    prompt = f"""{create_system_prompt(topic)}
+    examples = topic.examples[:3]
+    materials = select_context(topic, " ".join(examples))
+    if usage is not None:
+        usage.context_strategy = "full" if materials == topic.materials else "retrieval"
+
+    prompt = f"""{create_system_prompt(topic, materials)}
 
 Generate a friendly greeting and an appropriate first practice problem for this student.
 Choose from these example problems or create a similar one:
-{chr(10).join('- ' + ex for ex in topic.examples[:3])}
+{chr(10).join('- ' + ex for ex in examples)}
 
 Keep it encouraging and clear!"""
 
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        task = _generate(model, prompt, None, "initial_task", usage)
+        return personalize(task) if personalize else task
     except Exception as e:
+        AI_ERRORS.inc(function="generate_initial_task")
         return f"Error generating task: {str(e)}"
 
 
@@ -63,10 +228,20 @@ def get_ai_feedback(
     topic: Topic,
     conversation_history: List[Message],
     student_text: str,
-    canvas_image: Optional[Image.Image],
+    canvas_image: Optional[Union["Image.Image", CanvasImage]],
     api_key: Optional[str],
+    context_strategy: Optional[str] = None,
+    usage: Optional[CallUsage] = None,
+    use_cache: bool = True,
+    verified: Optional[CheckResult] = None,
 ) -> str:
-    """Get AI feedback on student's work"""
+    """Get AI feedback on student's work (``usage`` is filled in if given).
+
+    Identical requests are answered from the response cache unless
+    ``use_cache`` is False (e.g. when the student asks for another hint).
+    ``verified`` is a local exact check of the typed answer, passed on to
+    the model so it does not have to do the arithmetic itself.
+    """
     model = get_gemini_model(api_key)
     if not model:
         return "Please configure your GEMINI_API_KEY in the .env file."
@@ -79,7 +254,27 @@ def get_ai_feedback(
         ]
     )
 
-    prompt = f"""{create_system_prompt(topic)}
+    # Retrieve materials for the problem being worked on right now
+    last_tutor = next(
+        (m.content for m in reversed(conversation_history) if m.role == "tutor"), ""
+    )
+    materials = select_context(topic, f"{last_tutor}\n{student_text}", context_strategy)
+    upcoming = generated_problem(topic, conversation_history)
+    if usage is not None:
+        usage.context_strategy = "full" if materials == topic.materials else "retrieval"
+        if verified is not None:
+            usage.local_check = "correct" if verified.correct else "incorrect"
+
+    canvas_note = (
+        "The student has also drawn their work on the canvas (see image)."
+        if canvas_image
+        else ""
+    )
+    feedback_request = (
+        "Provide constructive, encouraging feedback. If their answer is correct, "
+        "celebrate and offer the next problem."
+    )
+    prompt = f"""{create_system_prompt(topic, materials)}
 
 Conversation so far:
 {history_text}
@@ -87,20 +282,77 @@ Conversation so far:
 The student has now submitted their work.
 Student's text response: {student_text if student_text else "(no text provided)"}
 
-{"The student has also drawn their work on the canvas (see image)." if canvas_image else ""}
+{canvas_note}
+{prompt_note(verified)}
 
-Provide constructive, encouraging feedback. If their answer is correct, celebrate and offer the next problem.
+{feedback_request}
+{f"The next problem is: {upcoming}" if upcoming else ""}
 If incorrect or incomplete, give a gentle hint to guide them toward the solution.
 Remember to be patient, warm, and use age-appropriate language!"""
 
     try:
-        if canvas_image:
-            # Use Gemini Vision with both text and image
-            response = model.generate_content([prompt, canvas_image])
+        # Use Gemini Vision with both text and image, or text only
+        image_part = _image_part(canvas_image) if canvas_image else None
+        image_data = image_part["data"] if image_part else None
+
+        cache_key = None
+        if use_cache and response_cache.enabled:
+            # The prompt already holds the topic, recent history and student text
+            cache_key = make_key("feedback", MODEL_NAME, prompt, image_data)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                AI_CACHE.inc(result="hit")
+                if usage is not None:
+                    usage.cache_hit = True
+                return cached
+            AI_CACHE.inc(result="miss")
         else:
-            # Text only
-            response = model.generate_content(prompt)
+            AI_CACHE.inc(result="bypass")
 
-        return response.text
+        feedback = _generate(model, prompt, image_part, "feedback", usage)
+        if cache_key is not None:
+            response_cache.put(cache_key, feedback)
+        return feedback
     except Exception as e:
+        AI_ERRORS.inc(function="get_ai_feedback")
         return f"Error getting feedback: {str(e)}"
+
+
+def prefetch_hint(
+    topic: Topic, conversation_history: List[Message], api_key: Optional[str]
+) -> Optional[Tuple[str, CallUsage]]:
+    """Generate the hint "Ask for Help" would get, before it is asked for.
+
+    The canvas is not included since the student is still drawing. Returns
+    None when no hint could be generated.
+    """
+    usage = CallUsage(prefetched=True)
+    hint = get_ai_feedback(
+        topic,
+        conversation_history,
+        HELP_REQUEST_TEXT,
+        None,
+        api_key,
+        usage=usage,
+        use_cache=False,
+    )
+    if usage.model_latency_ms is None and not usage.coalesced:
+        return None
+    return hint, usage
+
+
+def pregenerate_initial_task(
+    topic: Topic, api_key: Optional[str]
+) -> Optional[Tuple[str, CallUsage]]:
+    """Generate a topic's opening message before any student asks for it.
+
+    Returns None for topics that start on a local problem (they are already
+    instant) and when no greeting could be generated.
+    """
+    if generator_for(topic) is not None:
+        return None
+    usage = CallUsage(prefetched=True)
+    task = generate_initial_task(topic, api_key, usage=usage)
+    if usage.model_latency_ms is None and not usage.coalesced:
+        return None
+    return task, usage
@@ -0,0 +1,337 @@
+"""
+Exact local answer checking for arithmetic topics.
+
+A topic opts in with front-matter naming its checker::
+
+    ---
+    answer_checker: multiplication
+    ---
+
+The checker finds the problem in the tutor's recent messages and the
+student's typed answer, and verifies it exactly. Depending on
+``LEIA_LOCAL_CHECK`` the verdict is attached to the Gemini prompt
+("verify", the default) or, for correct answers, the turn is answered
+instantly with templated feedback ("answer").
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Dict, List, Optional, Set
+
+from metrics import (
+    AI_REQUEST_SECONDS,
+    LOCAL_ANSWERS,
+    LOCAL_CHECKS,
+    LOCAL_PROBLEMS,
+    LOCAL_SAVED_SECONDS,
+)
+from models import Message, Problem, Topic
+from problem_generator import generator_for
+
+
+CHECK_MODE = os.getenv("LEIA_LOCAL_CHECK", "verify")  # "off", "verify" or "answer"
+MAX_LOOKBACK = 3  # Tutor messages searched for the current problem
+GENERATE_ATTEMPTS = 20  # Candidates tried when avoiding already asked problems
+
+NUMBER_RE = re.compile(r"(?<![\d.,])(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)(?![\d,]*\d)")
+FRACTION_RE = re.compile(r"(?<![\d/])(\d+)\s*/\s*(\d+)(?![\d/])")
+
+
+@dataclass
+class CheckResult:
+    """Verdict on a student's answer to a problem"""
+
+    problem: Problem
+    statement: str  # Worked result, e.g. "24 × 13 = 312"
+    expected: str
+    answer: str  # The student's answer as read from their text
+    correct: bool
+    note: str = ""  # e.g. why an equal value is still not accepted
+
+
+def _parse_number(text: str) -> Fraction:
+    return Fraction(text.replace(",", ""))
+
+
+def _answer_part(student_text: str) -> str:
+    """The part of the student's text that holds the answer"""
+    return student_text.rsplit("=", 1)[-1]
+
+
+class AnswerChecker:
+    """Base class: subclasses read problems and answers of one kind"""
+
+    name = ""
+
+    def find_problems(self, tutor_text: str) -> List[Problem]:
+        raise NotImplementedError
+
+    def assigned_problems(self, tutor_text: str) -> List[Problem]:
+        """Problems the text sets, rather than just mentions (e.g. in a hint)"""
+        return self.find_problems(tutor_text)
+
+    def check(self, problem: Problem, student_text: str) -> Optional[CheckResult]:
+        """Verdict, or None if no single answer can be read from the text"""
+        raise NotImplementedError
+
+
+class MultiplicationChecker(AnswerChecker):
+    """Whole-number products such as "Multiply 24 × 13" """
+
+    name = "multiplication"
+    PROBLEM_RE = re.compile(
+        r"(?<![\d.,])(\d{1,4})\s*[×xX*✕]\s*(\d{1,4})(?![\d.,]*\d)(?!\s*=\s*\d)"
+    )
+
+    def find_problems(self, tutor_text: str) -> List[Problem]:
+        return [
+            Problem(self.name, (int(a), int(b)))
+            for a, b in self.PROBLEM_RE.findall(tutor_text)
+        ]
+
+    def check(self, problem: Problem, student_text: str) -> Optional[CheckResult]:
+        numbers = NUMBER_RE.findall(_answer_part(student_text))
+        if len(numbers) != 1:
+            return None
+        a, b = problem.operands
+        given = _parse_number(numbers[0])
+        return CheckResult(
+            problem=problem,
+            statement=f"{a} × {b} = {a * b:,}",
+            expected=f"{a * b:,}",
+            answer=numbers[0],
+            correct=given == a * b,
+        )
+
+
+class SimplifyFractionChecker(AnswerChecker):
+    """Reducing a fraction to lowest terms, such as "Simplify 6/8" """
+
+    name = "simplify_fraction"
+    SIMPLIFY_RE = re.compile(r"simplif\w*\s+(\d+)\s*/\s*(\d+)", re.IGNORECASE)
+    RESULT_RE = re.compile(r"=\s*$")
+
+    def find_problems(self, tutor_text: str) -> List[Problem]:
+        found = self.SIMPLIFY_RE.findall(tutor_text)
+        if not found:
+            # Fractions on either side of "=" are worked results, not problems
+            found = [
+                match.groups()
+                for match in FRACTION_RE.finditer(tutor_text)
+                if not self.RESULT_RE.search(tutor_text[: match.start()])
+                and not tutor_text[match.end() :].lstrip().startswith("=")
+            ]
+        return self._problems(found)
+
+    def assigned_problems(self, tutor_text: str) -> List[Problem]:
+        # "What divides both parts of 6/8?" mentions 6/8 without asking for it
+        return self._problems(self.SIMPLIFY_RE.findall(tutor_text))
+
+    def _problems(self, found) -> List[Problem]:
+        return [Problem(self.name, (int(n), int(d))) for n, d in found if int(d) != 0]
+
+    def check(self, problem: Problem, student_text: str) -> Optional[CheckResult]:
+        part = _answer_part(student_text)
+        fractions = FRACTION_RE.findall(part)
+        if len(fractions) == 1:
+            given = fractions[0]
+        elif not fractions and len(NUMBER_RE.findall(part)) == 1:
+            given = (NUMBER_RE.findall(part)[0], "1")  # Whole number, e.g. 8/4 = 2
+        else:
+            return None
+        numbers = [_parse_number(g) for g in given]
+        if numbers[1] == 0 or any(x.denominator != 1 for x in numbers):
+            return None
+
+        n, d = problem.operands
+        value = Fraction(n, d)
+        if given[1] == "1" and value.denominator != 1:
+            # A whole number cannot simplify 6/8; it answers a hint's step
+            return None
+        expected = str(value)
+        given_num, given_den = (int(x) for x in numbers)
+        equal = Fraction(given_num, given_den) == value
+        simplest = (given_num, given_den) == (value.numerator, value.denominator)
+        answer = f"{given[0]}/{given[1]}" if given[1] != "1" else given[0]
+        return CheckResult(
+            problem=problem,
+            statement=f"{n}/{d} = {expected} in simplest form",
+            expected=expected,
+            answer=answer,
+            correct=equal and simplest,
+            note=(
+                "Equal value, but not in simplest form."
+                if equal and not simplest
+                else ""
+            ),
+        )
+
+
+_checkers: Dict[str, AnswerChecker] = {}
+
+
+def register_checker(checker: AnswerChecker) -> None:
+    """Make a checker available to topics naming it in their front-matter"""
+    _checkers[checker.name] = checker
+
+
+register_checker(MultiplicationChecker())
+register_checker(SimplifyFractionChecker())
+
+
+def checker_for(topic: Topic) -> Optional[AnswerChecker]:
+    return _checkers.get(topic.metadata.get("answer_checker", ""))
+
+
+def current_problem(
+    checker: AnswerChecker, history: List[Message]
+) -> Optional[Problem]:
+    """The problem the student is working on, if exactly one can be found.
+
+    Tutor hints often do not repeat the problem ("Not quite, try again"),
+    so a few earlier tutor messages are searched too. A message naming
+    several problems is ambiguous and stops the search, and so does a
+    latest message asking its own question (e.g. "What is 4 + 20?" or "What
+    divides both parts of 6/8?"): the student is answering that, not the
+    earlier problem.
+    """
+    tutor_messages = [m for m in reversed(history) if m.role == "tutor"]
+    for i, message in enumerate(tutor_messages[:MAX_LOOKBACK]):
+        if i == 0 and "?" in message.content:
+            assigned = set(checker.assigned_problems(message.content))
+            return assigned.pop() if len(assigned) == 1 else None
+        problems = set(checker.find_problems(message.content))
+        if len(problems) == 1:
+            return problems.pop()
+        if problems:
+            return None
+    return None
+
+
+def check_answer(
+    topic: Topic, history: List[Message], student_text: str
+) -> Optional[CheckResult]:
+    """Verify the student's typed answer exactly, when the topic allows it.
+
+    Only the topic's own exercises are checked (see ``is_assigned``): a
+    verdict on a hint's smaller step could contradict what the tutor asked.
+    """
+    checker = checker_for(topic)
+    if CHECK_MODE == "off" or checker is None or not student_text:
+        return None
+    problem = current_problem(checker, history)
+    if problem is not None and not is_assigned(topic, problem):
+        problem = None
+    result = checker.check(problem, student_text) if problem else None
+    if result is None:
+        LOCAL_CHECKS.inc(result="unchecked")
+    else:
+        LOCAL_CHECKS.inc(result="correct" if result.correct else "incorrect")
+    return result
+
+
+def _asked(checker: AnswerChecker, history: List[Message]) -> Set[Problem]:
+    return {
+        problem
+        for message in history
+        if message.role == "tutor"
+        for problem in checker.find_problems(message.content)
+    }
+
+
+def next_example(topic: Topic, history: List[Message]) -> Optional[str]:
+    """First example problem from the topic not yet asked in this session"""
+    checker = checker_for(topic)
+    if checker is None:
+        return None
+    asked = _asked(checker, history)
+    for example in topic.examples:
+        problems = checker.find_problems(example)
+        if problems and not asked.intersection(problems):
+            return example
+    return None
+
+
+def generated_problem(topic: Topic, history: List[Message]) -> Optional[str]:
+    """A fresh problem from the topic's generator, not yet asked.
+
+    Seeded by the conversation, so an identical request gets the same
+    problem (and can still be served from the response cache).
+    """
+    generator = generator_for(
+        topic, seed="\n".join(m.content for m in history if m.role == "tutor")
+    )
+    if generator is None:
+        return None
+    checker = checker_for(topic)
+    asked = _asked(checker, history) if checker else set()
+    for candidate in generator.generate(GENERATE_ATTEMPTS):
+        if candidate.problem not in asked:
+            LOCAL_PROBLEMS.inc(use="next")
+            return candidate.text
+    return None
+
+
+def next_problem(topic: Topic, history: List[Message]) -> Optional[str]:
+    """Next problem to offer: a generated one, else an unused example"""
+    return generated_problem(topic, history) or next_example(topic, history)
+
+
+def is_assigned(topic: Topic, problem: Problem) -> bool:
+    """Whether the problem is one of the topic's exercises.
+
+    Hints often pose smaller steps ("what is 24 × 3 first?"); answering one
+    of those must not move the student on to the next problem.
+    """
+    checker = checker_for(topic)
+    if checker is None:
+        return False
+    generator = generator_for(topic)
+    if generator is not None and generator.owns(problem):
+        return True
+    return any(problem in checker.find_problems(example) for example in topic.examples)
+
+
+def local_feedback(
+    topic: Topic, history: List[Message], result: Optional[CheckResult]
+) -> Optional[str]:
+    """Templated feedback for a verified correct answer in "answer" mode.
+
+    Returns None (ask Gemini) for wrong answers, which deserve a real hint,
+    for intermediate steps, and when there is no next problem to offer.
+    """
+    if CHECK_MODE != "answer" or result is None or not result.correct:
+        return None
+    if not is_assigned(topic, result.problem):
+        return None
+    upcoming = next_problem(topic, history)
+    if upcoming is None:
+        return None
+
+    LOCAL_ANSWERS.inc()
+    count = AI_REQUEST_SECONDS.count(kind="feedback")
+    if count:
+        LOCAL_SAVED_SECONDS.inc(AI_REQUEST_SECONDS.sum(kind="feedback") / count)
+    return (
+        f"Yes! {result.statement}. 🎉\n\n"
+        f"Great work! Ready for the next one?\n\n**{upcoming}**"
+    )
+
+
+def prompt_note(result: Optional[CheckResult]) -> str:
+    """Verified verdict to include in the Gemini prompt"""
+    if result is None:
+        return ""
+    if result.correct:
+        return (
+            f"Checked by exact calculation: the student's answer {result.answer} "
+            f"is CORRECT ({result.statement})."
+        )
+    note = f" {result.note}" if result.note else ""
+    return (
+        f"Checked by exact calculation: the student's answer {result.answer} "
+        f"is NOT correct.{note} The correct answer is {result.expected}. "
+        f"Do not tell the student the answer; guide them toward it."
+    )
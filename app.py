@@ -2,22 +2,136 @@
 Leia's AI Tutor - Interactive tutoring application with canvas drawing
 """
 
+import startup_profile
+
+# Must run before the imports below so they show up in the timeline
+startup_profile.start()
+
 import os
-import base64
-from io import BytesIO
 from pathlib import Path
 from dataclasses import asdict
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 import math
 
 import solara
-from PIL import Image
-import google.generativeai as genai
 from dotenv import load_dotenv
 
-# Monkey-patch to fix ipywidgets bytes serialization issue
-import ipywidgets.widgets.trait_types as trait_types
+# Import from our modules
+from models import Topic, Message, Session, HELP_REQUEST_TEXT
+from topic_loader import get_topics
+from session_manager import (
+    save_session,
+    load_session,
+    list_sessions,
+    register_save_hook,
+)
+from ai_service import (
+    CallUsage,
+    generate_initial_task,
+    get_ai_feedback,
+    get_gemini_model,
+    prefetch_hint,
+    pregenerate_initial_task,
+)
+from hint_prefetch import HintPrefetcher
+from debounce import Debouncer
+from canvas_images import (
+    CanvasImage,
+    encode_png,
+    has_ink,
+    make_thumbnail,
+    quantize_canvas,
+)
+from answer_checker import check_answer, local_feedback
+from learning_stats import get_learning_stats, record_session
+from search_index import index_generation, index_session, search_sessions
+from metrics import ACTIVE_SESSIONS, mount_metrics
+from image_route import image_source, mount_images
+from message_html import message_html, prerender, render_markdown
+from prewarm import GreetingPool, Prewarmer
+from render_profile import PROFILER, mount_render_profile, profiled
+from tracing import STORE_TURN_TIMINGS, span, stage_summary, trace
+
+# Load environment variables
+load_dotenv()
+
+# Gemini is configured on first use (see ai_service.get_gemini_model)
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Opt-in (LEIA_INPUT_DEBOUNCE_MS, e.g. 300): store the typed answer once typing
+# pauses for this long, instead of on every keystroke
+INPUT_DEBOUNCE_MS = int(os.getenv("LEIA_INPUT_DEBOUNCE_MS", "0"))
+
+# Directories (the sessions directory is created on first save)
+TOPICS_DIR = Path("topics")
+SESSIONS_DIR = Path("sessions")
+
+# Keep per-topic learning statistics up to date as sessions are saved
+register_save_hook(record_session)
+register_save_hook(index_session)
+
+# Prometheus-style metrics at /metrics when running under `solara run`
+served = mount_metrics()
+# Drawings in the chat history are fetched from /canvas-images/<hash>.png
+mount_images(sessions_dir=SESSIONS_DIR)
+# Opt-in (LEIA_RENDER_PROFILE=1): render counts and times at /render-profile
+mount_render_profile()
+
+# Opt-in (LEIA_PREFETCH_HINTS=1): prepare a hint while the student works
+hint_prefetcher = HintPrefetcher(
+    lambda topic, history: prefetch_hint(topic, history, GEMINI_API_KEY)
+)
+
+# Opt-in (LEIA_PREWARM_GREETINGS=1): an opening message ready for each topic
+greeting_pool = GreetingPool(
+    lambda topic: pregenerate_initial_task(topic, GEMINI_API_KEY)
+)
+
+
+def warm_imports():
+    """Import what the first canvas submission and chat message would"""
+    load_ipycanvas()
+    import canvas_delta  # noqa: F401 (numpy and PIL)
+
+    render_markdown("**Ready**")
+
+
+# Paid once in the background at server start instead of by the first student
+prewarmer = Prewarmer(
+    [
+        ("topics", lambda: get_topics(TOPICS_DIR)),
+        ("sessions", lambda: list_sessions(SESSIONS_DIR)),
+        ("learning_stats", lambda: get_learning_stats(SESSIONS_DIR)),
+        ("imports", warm_imports),
+        ("ai_client", lambda: get_gemini_model(GEMINI_API_KEY)),
+        ("greetings", lambda: greeting_pool.fill(get_topics(TOPICS_DIR).values())),
+    ]
+)
+if served:
+    prewarmer.start()
+
+startup_profile.mark("app module imported")
+
+
+def usage_record(usage: CallUsage):
+    """Usage dict to store on a tutor message (None if no call was made)"""
+    if usage.model_latency_ms is None and not (
+        usage.cache_hit or usage.coalesced or usage.served_locally
+    ):
+        return None
+    return asdict(usage)
+
+
+def model_latency(usage: CallUsage, duration_ms: float) -> Optional[float]:
+    """``latency_ms`` for a tutor message: set only if the turn waited on Gemini.
+
+    Local answers, cache hits and prefetched responses take next to no
+    time and would pull the "AI latency" statistics towards zero.
+    """
+    waited = usage.model_latency_ms is not None or usage.coalesced
+    return duration_ms if waited and not usage.prefetched else None
+
 
 def patched_bytes_from_json(js, obj):
     """Fixed bytes_from_json that handles both bytes and memoryview"""
@@ -27,30 +141,23 @@ def patched_bytes_from_json(js, obj):
         return js
     return js.tobytes()
 
-# Patch both the function and the serialization dictionary
-trait_types.bytes_from_json = patched_bytes_from_json
-trait_types.bytes_serialization['from_json'] = patched_bytes_from_json
 
-# Import from our modules
-import ipycanvas
-from ipycanvas import Canvas
-from models import Topic, Message, Session
-from topic_loader import load_all_topics
-from session_manager import save_session, load_session, list_sessions
-from ai_service import generate_initial_task, get_ai_feedback
+def load_ipycanvas():
+    """Import ipycanvas on first use, patching ipywidgets beforehand.
 
-# Load environment variables
-load_dotenv()
+    Canvas copies ipywidgets' bytes serializers when its class is defined,
+    so the monkey-patch for the bytes serialization issue must be applied
+    before ipycanvas is imported.
+    """
+    import ipywidgets.widgets.trait_types as trait_types
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+    # Patch both the function and the serialization dictionary
+    trait_types.bytes_from_json = patched_bytes_from_json
+    trait_types.bytes_serialization["from_json"] = patched_bytes_from_json
 
-# Directories
-TOPICS_DIR = Path("topics")
-SESSIONS_DIR = Path("sessions")
-SESSIONS_DIR.mkdir(exist_ok=True)
+    import ipycanvas
+
+    return ipycanvas
 
 
 # ============================================================================
@@ -65,8 +172,19 @@ drawing_canvas = solara.reactive(None)
 is_loading = solara.reactive(False)
 status_message = solara.reactive("")
 
+# Renders are attributed to these when profiling (see render_profile.py)
+PROFILER.watch(
+    selected_topic=selected_topic,
+    current_session=current_session,
+    student_input=student_input,
+    drawing_canvas=drawing_canvas,
+    is_loading=is_loading,
+    status_message=status_message,
+)
+
 
 @solara.component
+@profiled
 def DrawingCanvas():
     """Interactive canvas component for drawing"""
     is_drawing = solara.use_reactive(False)
@@ -79,7 +197,8 @@ def DrawingCanvas():
         """Create and initialize the canvas with mouse event handlers"""
         # You need to create a canvas manager, since global widgets cannot be share between users
         # See: https://py.cafe/maartenbreddels/solara-ipycanvas-smiley
-        canvas = Canvas(
+        ipycanvas = load_ipycanvas()
+        canvas = ipycanvas.Canvas(
             width=700,
             height=500,
             _canvas_manager=ipycanvas.canvas._CanvasManager(),
@@ -172,9 +291,94 @@ def DrawingCanvas():
 
 
 @solara.component
+@profiled
+def CanvasAttachment(messages: list, index: int, session_id: Optional[str] = None):
+    """A student's drawing: the thumbnail, with the full image on request"""
+    expanded = solara.use_reactive(False)
+    msg = messages[index]
+    thumbnail = msg.get("canvas_thumbnail")
+    show_full = expanded.value or not thumbnail
+
+    def shown_image():
+        """The image to show, or the error that prevented making it"""
+        if not show_full:
+            return thumbnail
+        if msg.get("canvas_image"):
+            return msg["canvas_image"]
+        try:
+            # Delta snapshots are rebuilt from the session's earlier drawings
+            from canvas_delta import snapshot_png
+
+            return CanvasImage(snapshot_png(messages, index))
+        except Exception as e:
+            return e
+
+    # Rebuilt only when this message or the expanded state changes; the
+    # browser then fetches (and caches) the image by its content hash
+    image = solara.use_memo(shown_image, [msg, show_full])
+    if isinstance(image, Exception):
+        solara.Text(f"[Canvas image - error displaying: {image}]")
+    else:
+        solara.Image(
+            image_source(image, session_id, index),
+            width="100%" if expanded.value else "300px",
+        )
+
+    if thumbnail:
+        solara.Button(
+            "Hide full drawing" if expanded.value else "🔍 Show full drawing",
+            on_click=lambda: expanded.set(not expanded.value),
+            text=True,
+            style={"font-size": "0.8em"},
+        )
+
+
+@solara.component
+@profiled
+def ChatMessage(messages: list, index: int, session_id: Optional[str] = None):
+    """One message of the conversation (``messages`` up to and including it)"""
+    msg = Message(**messages[index])
+    tutor = msg.role == "tutor"
+
+    with solara.Card(
+        style={
+            "background-color": "#e3f2fd" if tutor else "#fff3e0",
+            "margin-bottom": "10px",
+        }
+    ):
+        # Markdown is converted once per message text (see message_html.py)
+        solara.HTML(
+            unsafe_innerHTML=message_html(
+                messages[index], "🤖 AI Tutor:" if tutor else "👧 Leia:"
+            ),
+            classes=["solara-markdown"],
+        )
+
+        if not tutor and (msg.canvas_image or msg.canvas_delta):
+            CanvasAttachment(messages, index, session_id)
+
+        if msg.timestamp:
+            solara.Text(
+                f"_{msg.timestamp}_",
+                style={"font-size": "0.8em", "color": "#666"},
+            )
+
+
+@solara.component
+@profiled
 def ChatHistory():
     """Display conversation history"""
     session = current_session.value
+    has_session = session is not None
+
+    def track_active_session():
+        """Count this page in the active-sessions gauge while a session is open"""
+        if not has_session:
+            return None
+        ACTIVE_SESSIONS.inc()
+        return ACTIVE_SESSIONS.dec
+
+    solara.use_effect(track_active_session, [has_session])
 
     with solara.Column(
         style={
@@ -189,70 +393,33 @@ def ChatHistory():
         if not session or not session.messages:
             solara.Markdown("*No messages yet. Start a new session to begin!*")
         else:
-            for msg_dict in session.messages:
-                msg = Message(**msg_dict)
-
-                if msg.role == "tutor":
-                    with solara.Card(
-                        style={"background-color": "#e3f2fd", "margin-bottom": "10px"}
-                    ):
-                        solara.Markdown(f"**🤖 AI Tutor:** {msg.content}")
-                        if msg.timestamp:
-                            solara.Text(
-                                f"_{msg.timestamp}_",
-                                style={"font-size": "0.8em", "color": "#666"},
-                            )
-                else:
-                    with solara.Card(
-                        style={"background-color": "#fff3e0", "margin-bottom": "10px"}
-                    ):
-                        solara.Markdown(f"**👧 Leia:** {msg.content}")
-
-                        if msg.canvas_image:
-                            try:
-                                # Decode and display canvas image
-                                img_data = base64.b64decode(
-                                    msg.canvas_image.split(",")[1]
-                                    if "," in msg.canvas_image
-                                    else msg.canvas_image
-                                )
-                                img = Image.open(BytesIO(img_data))
-                                solara.Image(img, width="300px")
-                            except Exception as e:
-                                solara.Text(f"[Canvas image - error displaying: {e}]")
-
-                        if msg.timestamp:
-                            solara.Text(
-                                f"_{msg.timestamp}_",
-                                style={"font-size": "0.8em", "color": "#666"},
-                            )
+            for index in range(len(session.messages)):
+                # Earlier messages are passed unchanged, so only new ones render
+                ChatMessage(session.messages[: index + 1], index, session.session_id)
 
 
-@solara.component
-def SessionControls():
-    """Controls for managing sessions"""
-    topics = load_all_topics(TOPICS_DIR)
-    topic_names = list(topics.keys())
-
-    if not topic_names:
-        solara.Error(
-            "No topics found! Please add markdown files to the 'topics/' folder."
-        )
+def start_new_session():
+    """Start a new tutoring session"""
+    if not selected_topic.value:
+        status_message.value = "Please select a topic first!"
         return
 
-    def start_new_session():
-        """Start a new tutoring session"""
-        if not selected_topic.value:
-            status_message.value = "Please select a topic first!"
-            return
-
-        is_loading.value = True
-        status_message.value = "Starting new session..."
+    is_loading.value = True
+    status_message.value = "Starting new session..."
 
-        topic = topics[selected_topic.value]
+    topic = get_topics(TOPICS_DIR)[selected_topic.value]
 
+    with trace("turn.start_session") as turn:
         # Generate initial task
-        initial_message = generate_initial_task(topic, GEMINI_API_KEY)
+        usage = CallUsage()
+        with span("turn.ai_call") as ai_span:
+            pregenerated = greeting_pool.take(topic)
+            if pregenerated is not None:
+                initial_message, usage = pregenerated
+            else:
+                initial_message = generate_initial_task(
+                    topic, GEMINI_API_KEY, usage=usage
+                )
 
         # Create new session
         session = Session(
@@ -261,8 +428,12 @@ def SessionControls():
                 {
                     "role": "tutor",
                     "content": initial_message,
+                    "content_html": prerender(initial_message),
                     "canvas_image": None,
                     "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "latency_ms": model_latency(usage, ai_span.duration_ms),
+                    "timings": (turn.rounded_timings() if STORE_TURN_TIMINGS else None),
+                    "usage": usage_record(usage),
                 }
             ],
             created_at=datetime.now().isoformat(),
@@ -270,140 +441,283 @@ def SessionControls():
         )
 
         # Save and set as current
-        save_session(session, SESSIONS_DIR)
+        with span("turn.save"):
+            save_session(session, SESSIONS_DIR)
+    current_session.value = session
+    hint_prefetcher.schedule(session, topic)
+    student_input.value = ""
+
+    is_loading.value = False
+    status_message.value = "Session started! 🎉"
+
+
+def load_existing_session(session_id: str):
+    """Load an existing session"""
+    session = load_session(session_id, SESSIONS_DIR)
+    if session:
         current_session.value = session
-        student_input.value = ""
-
-        is_loading.value = False
-        status_message.value = "Session started! 🎉"
-
-    def load_existing_session(session_id: str):
-        """Load an existing session"""
-        session = load_session(session_id, SESSIONS_DIR)
-        if session:
-            current_session.value = session
-            if session.topic_name in topics:
-                selected_topic.value = session.topic_name
-            status_message.value = f"Loaded session from {session.created_at}"
-        else:
-            status_message.value = "Error loading session"
+        if session.topic_name in get_topics(TOPICS_DIR):
+            selected_topic.value = session.topic_name
+        status_message.value = f"Loaded session from {session.created_at}"
+    else:
+        status_message.value = "Error loading session"
 
-    with solara.Card("Session Controls"):
-        with solara.Column(gap="10px"):
-            # Topic selector
-            if selected_topic.value is None and topic_names:
-                selected_topic.value = topic_names[0]
 
-            solara.Select(
-                label="Select Topic", value=selected_topic, values=topic_names
-            )
+@solara.component
+@profiled
+def TopicSelect(topic_names: list):
+    """Topic dropdown (re-renders only when the selected topic changes)"""
+    if selected_topic.value is None and topic_names:
+        selected_topic.value = topic_names[0]
+
+    solara.Select(label="Select Topic", value=selected_topic, values=topic_names)
+
+
+@solara.component
+@profiled
+def NewSessionButton():
+    """Starts a session; disabled while the AI is working"""
+    solara.Button(
+        "🎓 Start New Session",
+        on_click=start_new_session,
+        color="primary",
+        disabled=is_loading.value,
+        block=True,
+    )
+
+
+def wait_until_warm(cancel):
+    """Wait in a page thread for the pre-warm, so the notice can go away"""
+    while prewarmer.started and not cancel.is_set():
+        if prewarmer.wait(0.5):
+            return True
+    return prewarmer.ready
+
+
+@solara.component
+@profiled
+def WarmupNotice():
+    """Shown while the server is still warming up after a restart"""
+    solara.use_thread(wait_until_warm, [], intrusive_cancel=False)
+    if prewarmer.started and not prewarmer.ready:
+        solara.Info("⏳ Getting ready... the first response may take a moment.")
+
+
+@solara.component
+@profiled
+def StatusMessage():
+    """The latest status message"""
+    if status_message.value:
+        solara.Info(status_message.value)
+
+
+@solara.component
+@profiled
+def PreviousSessions():
+    """The most recent sessions, to reopen one"""
+    session = current_session.value
+    # Sessions are only added when one is started, so the directory is
+    # scanned again only when the current session changes
+    session_id = session.session_id if session else None
+    sessions = solara.use_memo(lambda: list_sessions(SESSIONS_DIR), [session_id])
+
+    if sessions:
+        solara.Markdown("### 📚 Previous Sessions")
+        for sess in sessions[:5]:  # Show last 5 sessions
+            with solara.Row(gap="5px"):
+                solara.Button(
+                    f"📖 {sess['topic_name']} - {sess['created_at'][:10]}",
+                    on_click=lambda sid=sess["session_id"]: load_existing_session(sid),
+                    text=True,
+                    style={"font-size": "0.9em"},
+                )
+
 
-            # New session button
+@solara.component
+@profiled
+def ConversationSearch():
+    """Search all conversations"""
+    search_query = solara.use_reactive("")
+    query = search_query.value.strip()
+    topic = selected_topic.value
+    if query:
+        # Reading the session re-renders the results on each turn, and the
+        # index generation re-runs the search once something was saved
+        current_session.value
+    hits = solara.use_memo(
+        lambda: search_sessions(SESSIONS_DIR, query, topic=topic) if query else [],
+        [query, topic, index_generation()],
+    )
+
+    solara.InputText(label="🔍 Search conversations", value=search_query)
+    if query:
+        if not hits:
+            solara.Text("No matches found.")
+        for hit in hits[:10]:
             solara.Button(
-                "🎓 Start New Session",
-                on_click=start_new_session,
-                color="primary",
-                disabled=is_loading.value,
-                block=True,
+                f"📖 {hit.created_at[:10]} - {hit.snippet}",
+                on_click=lambda sid=hit.session_id: load_existing_session(sid),
+                text=True,
+                style={"font-size": "0.9em", "text-transform": "none"},
             )
 
-            # Status message
-            if status_message.value:
-                solara.Info(status_message.value)
-
-            # List previous sessions
-            sessions = list_sessions(SESSIONS_DIR)
-            if sessions:
-                solara.Markdown("### 📚 Previous Sessions")
-                for sess in sessions[:5]:  # Show last 5 sessions
-                    with solara.Row(gap="5px"):
-                        solara.Button(
-                            f"📖 {sess['topic_name']} - {sess['created_at'][:10]}",
-                            on_click=lambda sid=sess[
-                                "session_id"
-                            ]: load_existing_session(sid),
-                            text=True,
-                            style={"font-size": "0.9em"},
-                        )
-
 
 @solara.component
-def StudentInputArea():
-    """Area for student to type and submit answers"""
+@profiled
+def SessionControls():
+    """Controls for managing sessions.
 
-    def submit_answer():
-        """Submit student's answer and get AI feedback"""
-        if not current_session.value:
-            status_message.value = "Please start a session first!"
-            return
+    Each part below reads only the reactive values it shows, so a status
+    change or a new session re-renders that part alone.
+    """
+    topics = get_topics(TOPICS_DIR)
 
-        text = student_input.value.strip()
-        canvas = drawing_canvas.value
+    if not topics:
+        solara.Error(
+            "No topics found! Please add markdown files to the 'topics/' folder."
+        )
+        return
 
-        if not text and not canvas:
-            status_message.value = "Please write something or draw on the canvas!"
-            return
+    with solara.Card("Session Controls"):
+        with solara.Column(gap="10px"):
+            TopicSelect(list(topics))
+            NewSessionButton()
+            StatusMessage()
+            PreviousSessions()
+            ConversationSearch()
+
+
+def submit_answer(use_cache: bool = True, prefetched=None):
+    """Submit student's answer and get AI feedback.
+
+    ``prefetched`` is a ready ``(feedback, usage)`` pair to use instead
+    of calling the AI.
+    """
+    if not current_session.value:
+        status_message.value = "Please start a session first!"
+        return
+
+    text = student_input.value.strip()
+    canvas = drawing_canvas.value
 
-        is_loading.value = True
-        status_message.value = "Getting feedback from AI tutor..."
+    if not text and not canvas:
+        status_message.value = "Please write something or draw on the canvas!"
+        return
 
+    is_loading.value = True
+    status_message.value = "Getting feedback from AI tutor..."
+
+    with trace("turn.submit") as turn:
         # Capture canvas as image
-        canvas_image_b64 = None
-        canvas_img = None
+        canvas_image = None
+        canvas_delta = None
+        canvas_thumbnail = None
+        canvas_png = None
 
         if canvas:
+            from PIL import Image
+
             try:
                 # Get canvas image data
-                img_data = canvas.get_image_data()
-                # Convert to PIL Image
-                canvas_img = Image.fromarray(img_data.astype("uint8"), "RGBA")
-                # Convert to RGB (remove alpha)
-                canvas_img = canvas_img.convert("RGB")
-                # Encode to base64
-                buffer = BytesIO()
-                canvas_img.save(buffer, format="PNG")
-                canvas_image_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+                with span("turn.canvas_capture"):
+                    img_data = canvas.get_image_data()
+                with span("turn.canvas_convert"):
+                    # Convert to PIL Image
+                    canvas_img = Image.fromarray(img_data.astype("uint8"), "RGBA")
+                    # Convert to RGB (remove alpha)
+                    canvas_img = canvas_img.convert("RGB")
+                    # Black strokes on white: a few grey levels are enough
+                    canvas_img = quantize_canvas(canvas_img)
+                with span("turn.png_encode") as encode_span:
+                    # Kept as bytes; base64 is only made when saving
+                    canvas_png = CanvasImage(encode_png(canvas_img), canvas_img)
+                    encode_span.attrs["bytes"] = len(canvas_png)
+                # Usually only a few tiles changed since the last submission
+                with span("turn.canvas_delta"):
+                    from canvas_delta import encode_snapshot
+
+                    canvas_image, canvas_delta = encode_snapshot(
+                        current_session.value.messages, canvas_img, canvas_png
+                    )
+                # Made once here so the history view never resizes images
+                with span("turn.thumbnail"):
+                    canvas_thumbnail = CanvasImage.coerce(make_thumbnail(canvas_img))
             except Exception as e:
                 print(f"Error capturing canvas: {e}")
 
         # Create student message
+        content = text if text else "(see canvas)"
         student_msg = Message(
             role="student",
-            content=text if text else "(see canvas)",
-            canvas_image=canvas_image_b64,
+            content=content,
+            content_html=prerender(content),
+            canvas_image=canvas_image,
+            canvas_thumbnail=canvas_thumbnail,
+            canvas_delta=canvas_delta,
             timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         )
 
-        # Create new messages list with student message (immutable update)
-        new_messages = current_session.value.messages + [asdict(student_msg)]
+        with span("turn.session_copy"):
+            # Create new messages list with student message (immutable update)
+            new_messages = current_session.value.messages + [asdict(student_msg)]
 
-        # Create new session with updated messages to trigger UI update
-        current_session.value = Session(
-            topic_name=current_session.value.topic_name,
-            messages=new_messages,
-            created_at=current_session.value.created_at,
-            status=current_session.value.status,
-            session_id=current_session.value.session_id,
-        )
+            # Create new session with updated messages to trigger UI update
+            current_session.value = Session(
+                topic_name=current_session.value.topic_name,
+                messages=new_messages,
+                created_at=current_session.value.created_at,
+                status=current_session.value.status,
+                session_id=current_session.value.session_id,
+            )
 
         # Get AI feedback
-        topics = load_all_topics(TOPICS_DIR)
-        topic = topics.get(current_session.value.topic_name)
+        with span("turn.topic_load"):
+            topics = get_topics(TOPICS_DIR)
+            topic = topics.get(current_session.value.topic_name)
 
         if topic:
             # Convert message dicts back to Message objects for AI
             msg_objects = [Message(**m) for m in current_session.value.messages[:-1]]
 
-            feedback = get_ai_feedback(
-                topic, msg_objects, text, canvas_img, GEMINI_API_KEY
-            )
+            usage = CallUsage()
+            with span("turn.ai_call") as ai_span:
+                if prefetched is not None:
+                    feedback, usage = prefetched
+                else:
+                    # Arithmetic answers are verified exactly, and correct
+                    # ones may be answered without calling the AI
+                    with span("turn.local_check"):
+                        verified = check_answer(topic, msg_objects, text)
+                        feedback = local_feedback(topic, msg_objects, verified)
+                    if feedback is not None:
+                        usage = CallUsage(
+                            model="local",
+                            local_check="correct",
+                            served_locally=True,
+                        )
+                    else:
+                        feedback = get_ai_feedback(
+                            topic,
+                            msg_objects,
+                            text,
+                            canvas_png,
+                            GEMINI_API_KEY,
+                            usage=usage,
+                            use_cache=use_cache,
+                            verified=verified,
+                        )
 
-            # Create tutor response message
+            # Create tutor response message; timings cover everything up
+            # to the AI call (the save below is only in the span buffer)
             tutor_msg = Message(
                 role="tutor",
                 content=feedback,
+                content_html=prerender(feedback),
                 canvas_image=None,
                 timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                latency_ms=model_latency(usage, ai_span.duration_ms),
+                timings=turn.rounded_timings() if STORE_TURN_TIMINGS else None,
+                usage=usage_record(usage),
             )
 
             # Add tutor message and create new session (immutable update)
@@ -419,45 +733,167 @@ def StudentInputArea():
             )
 
             # Save session
-            save_session(current_session.value, SESSIONS_DIR)
+            with span("turn.save"):
+                save_session(current_session.value, SESSIONS_DIR)
+            hint_prefetcher.schedule(current_session.value, topic)
 
-        # Clear input
-        student_input.value = ""
+    # Clear input
+    student_input.value = ""
 
-        is_loading.value = False
-        status_message.value = "Feedback received! ✨"
+    is_loading.value = False
+    status_message.value = "Feedback received! ✨"
 
-    def ask_for_help():
-        """Ask the AI for help"""
-        student_input.value = "I need help with this problem. Can you give me a hint?"
-        submit_answer()
 
-    with solara.Card("Your Answer"):
+def canvas_has_drawing() -> bool:
+    """Whether the student has drawn anything on the canvas"""
+    canvas = drawing_canvas.value
+    if canvas is None:
+        return False
+    try:
+        return has_ink(canvas.get_image_data())
+    except Exception as e:
+        print(f"Error reading canvas: {e}")
+        return True  # Better a real call than a hint that ignores the drawing
+
+
+def ask_for_help():
+    """Ask the AI for help"""
+    # A hint prefetched for this exact conversation state is served as is,
+    # unless there is a drawing: prefetched hints never saw the canvas
+    prefetched = None
+    if current_session.value and not canvas_has_drawing():
+        prefetched = hint_prefetcher.take(current_session.value)
+    student_input.value = HELP_REQUEST_TEXT
+    # Asking again should give a fresh hint, not the cached one
+    submit_answer(use_cache=False, prefetched=prefetched)
+
+
+@solara.component
+@profiled
+def AnswerInput(debouncer: Optional[Debouncer]):
+    """The answer field; typing re-renders nothing else"""
+    if debouncer is None:
         solara.InputText(
             label="Type your answer or question here...",
             value=student_input,
             continuous_update=True,
             style={"width": "100%"},
         )
+    else:
+        # The field keeps its own text and the answer is stored once typing
+        # pauses (this component then re-renders once, not per keystroke)
+        solara.InputText(
+            label="Type your answer or question here...",
+            value=student_input.value,
+            on_value=debouncer,
+            continuous_update=True,
+            style={"width": "100%"},
+        )
 
-        with solara.Row(gap="10px", style={"margin-top": "10px"}):
-            solara.Button(
-                "✅ Submit Answer",
-                on_click=submit_answer,
-                color="success",
-                disabled=is_loading.value,
-            )
-            solara.Button(
-                "💡 Ask for Help",
-                on_click=ask_for_help,
-                color="warning",
-                disabled=is_loading.value,
-            )
+
+@solara.component
+@profiled
+def AnswerButtons(debouncer: Optional[Debouncer]):
+    """Submit and help buttons; disabled while the AI is working"""
+
+    def submit():
+        if debouncer is not None:
+            debouncer.flush()  # Typed just before clicking
+        submit_answer()
+
+    def help_request():
+        if debouncer is not None:
+            debouncer.cancel()
+        ask_for_help()
+
+    with solara.Row(gap="10px", style={"margin-top": "10px"}):
+        solara.Button(
+            "✅ Submit Answer",
+            on_click=submit,
+            color="success",
+            disabled=is_loading.value,
+        )
+        solara.Button(
+            "💡 Ask for Help",
+            on_click=help_request,
+            color="warning",
+            disabled=is_loading.value,
+        )
+
+
+@solara.component
+@profiled
+def StudentInputArea():
+    """Area for student to type and submit answers"""
+    debouncer = solara.use_memo(
+        lambda: (
+            Debouncer(INPUT_DEBOUNCE_MS / 1000, student_input.set)
+            if INPUT_DEBOUNCE_MS > 0
+            else None
+        ),
+        [],
+    )
+
+    with solara.Card("Your Answer"):
+        AnswerInput(debouncer)
+        AnswerButtons(debouncer)
 
 
 @solara.component
+@profiled
+def StatsDashboard():
+    """Per-topic learning statistics, maintained incrementally on save"""
+    show = solara.use_reactive(False)
+
+    with solara.Card("Learning Statistics"):
+        solara.Button(
+            "📊 Hide Statistics" if show.value else "📊 Show Statistics",
+            on_click=lambda: show.set(not show.value),
+            text=True,
+        )
+        if not show.value:
+            return
+
+        stats = get_learning_stats(SESSIONS_DIR).topic_stats()
+        if not stats:
+            solara.Markdown("*No statistics yet.*")
+        else:
+            rows = [
+                "| Topic | Sessions | Turns/session | Canvas | Text | Help "
+                "| Avg AI latency |",
+                "|---|---|---|---|---|---|---|",
+            ]
+            for name, topic_stats in sorted(stats.items()):
+                latency = topic_stats.avg_latency_ms
+                rows.append(
+                    f"| {name} | {topic_stats.sessions_started} "
+                    f"| {topic_stats.turns_per_session:.1f} "
+                    f"| {topic_stats.vision_turns} | {topic_stats.text_turns} "
+                    f"| {topic_stats.help_requests} "
+                    f"| {f'{latency / 1000:.1f}s' if latency is not None else '-'} |"
+                )
+            solara.Markdown("\n".join(rows))
+
+        # Where the time goes in recent turns (model vs our own code)
+        timings = stage_summary()
+        if timings:
+            rows = [
+                "| Stage | Count | p50 | p95 | Max |",
+                "|---|---|---|---|---|",
+            ]
+            for name, row in sorted(timings.items()):
+                rows.append(
+                    f"| {name} | {row['count']} | {row['p50_ms']:.0f} ms "
+                    f"| {row['p95_ms']:.0f} ms | {row['max_ms']:.0f} ms |"
+                )
+            solara.Markdown("#### Recent Stage Timings\n\n" + "\n".join(rows))
+
+
+@solara.component
+@profiled
 def Page():
     """Main application page"""
+    solara.use_effect(startup_profile.first_page_rendered, [])
 
     with solara.Column(
         gap="20px", style={"padding": "20px", "max-width": "1400px", "margin": "0 auto"}
@@ -469,13 +905,16 @@ def Page():
         # Check API key
         if not GEMINI_API_KEY:
             solara.Error(
-                "⚠️ GEMINI_API_KEY not found! Please create a .env file with your API key."
+                "⚠️ GEMINI_API_KEY not found! "
+                "Please create a .env file with your API key."
             )
             solara.Markdown(
                 "Get your API key from: https://makersuite.google.com/app/apikey"
             )
             return
 
+        WarmupNotice()
+
         # Session controls
         SessionControls()
 
@@ -492,6 +931,9 @@ def Page():
         # Student input area
         StudentInputArea()
 
+        # Learning statistics dashboard
+        StatsDashboard()
+
 
 # Run the app
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+"""
+Benchmark: size and speed of canvas image encodings
+
+Encodes a corpus of synthetic handwriting canvases (anti-aliased black
+strokes on white, 700x500 like the app's canvas) with each candidate and
+reports the mean stored size, encode time and decode time.
+
+Run with: python bench_canvas_encoding.py
+"""
+
+import math
+import random
+import statistics
+import time
+from io import BytesIO
+from typing import Callable, Dict, List
+
+from PIL import Image, ImageDraw, features
+
+from canvas_images import encode_png, quantize_canvas
+
+
+WIDTH, HEIGHT = 700, 500
+SUPERSAMPLE = 2  # Strokes are drawn larger and scaled down to anti-alias them
+STROKE_COUNTS = (3, 10, 30, 60)  # From a single digit to a full worked answer
+CANVASES_PER_COUNT = 5
+RUNS = 3
+
+
+def synthetic_canvas(rng: random.Random, strokes: int) -> Image.Image:
+    """White canvas with ``strokes`` wandering pen strokes and some erasing"""
+    size = (WIDTH * SUPERSAMPLE, HEIGHT * SUPERSAMPLE)
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for i in range(strokes):
+        x, y = rng.uniform(50, WIDTH - 50), rng.uniform(50, HEIGHT - 50)
+        angle = rng.uniform(0, 2 * math.pi)
+        points = []
+        for _ in range(rng.randint(8, 30)):
+            angle += rng.uniform(-0.6, 0.6)
+            x += 6 * math.cos(angle)
+            y += 6 * math.sin(angle)
+            points.append((x * SUPERSAMPLE, y * SUPERSAMPLE))
+        eraser = i % 10 == 9
+        draw.line(
+            points,
+            fill=255 if eraser else 0,
+            width=(20 if eraser else 3) * SUPERSAMPLE,
+            joint="curve",
+        )
+    return image.resize((WIDTH, HEIGHT), Image.Resampling.BOX).convert("RGB")
+
+
+def _save(image: Image.Image, **options) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def candidates() -> Dict[str, Callable[[Image.Image], bytes]]:
+    """Encoders to compare, by name; "current" is what the app stores"""
+    found = {
+        "rgb png (before)": lambda im: _save(im, format="PNG"),
+        "current": lambda im: encode_png(quantize_canvas(im)),
+    }
+    for colors in (256, 16, 4, 2):
+        for level in (1, 6, 9):
+            found[f"{colors} greys png z{level}"] = (
+                lambda im, c=colors, z=level: _save(
+                    quantize_canvas(im, c), format="PNG", compress_level=z
+                )
+            )
+        found[f"{colors} greys png optimize"] = lambda im, c=colors: _save(
+            quantize_canvas(im, c), format="PNG", optimize=True
+        )
+    if features.check("webp"):
+        for colors in (4, 2):
+            found[f"{colors} greys webp lossless"] = lambda im, c=colors: _save(
+                quantize_canvas(im, c).convert("L"), format="WEBP", lossless=True
+            )
+    return found
+
+
+def measure(encode: Callable[[Image.Image], bytes], corpus: List[Image.Image]):
+    """Mean bytes, best-of-RUNS mean encode ms and decode ms per canvas"""
+    encode_ms, decode_ms = [], []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        encoded = [encode(image) for image in corpus]
+        encode_ms.append((time.perf_counter() - start) * 1000 / len(corpus))
+
+        start = time.perf_counter()
+        for data in encoded:
+            Image.open(BytesIO(data)).load()
+        decode_ms.append((time.perf_counter() - start) * 1000 / len(corpus))
+    size = statistics.mean(len(data) for data in encoded)
+    return size, min(encode_ms), min(decode_ms)
+
+
+def main() -> None:
+    rng = random.Random(42)
+    corpus = [
+        synthetic_canvas(rng, strokes)
+        for strokes in STROKE_COUNTS
+        for _ in range(CANVASES_PER_COUNT)
+    ]
+    print(f"{len(corpus)} synthetic {WIDTH}x{HEIGHT} canvases\n")
+    print(f"{'encoding':<28} {'bytes':>8} {'encode ms':>10} {'decode ms':>10}")
+    results = {name: measure(encode, corpus) for name, encode in candidates().items()}
+    baseline = results["rgb png (before)"][0]
+    for name, (size, encode_ms, decode_ms) in sorted(
+        results.items(), key=lambda item: item[1][0]
+    ):
+        print(
+            f"{name:<28} {size:>8.0f} {encode_ms:>10.2f} {decode_ms:>10.2f}"
+            f"  ({size / baseline:.0%} of RGB PNG)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: topic cold start with and without the precompiled topic pack
+
+Run with: python bench_topic_pack.py
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from topic_loader import build_topic_pack
+
+
+SOURCE_TOPIC = Path(__file__).parent / "topics" / "double-digit-multiplication.md"
+SIZES = (1, 100, 1000)
+RUNS = 5
+
+# Each measurement runs in a fresh interpreter so nothing is cached in-process
+CHILD = """
+import sys, time
+from pathlib import Path
+from topic_loader import load_all_topics
+start = time.perf_counter()
+topics = load_all_topics(Path(sys.argv[1]), use_pack=sys.argv[2] == "pack")
+print(time.perf_counter() - start, len(topics))
+"""
+
+
+def make_topics(topics_dir: Path, count: int) -> None:
+    """Write ``count`` distinct copies of a real curriculum file"""
+    content = SOURCE_TOPIC.read_text(encoding="utf-8")
+    for i in range(count):
+        (topics_dir / f"topic-{i:04d}.md").write_text(
+            content.replace(
+                "# Double Digit Multiplication", f"# Double Digit Multiplication {i}", 1
+            ),
+            encoding="utf-8",
+        )
+
+
+def cold_start(topics_dir: Path, mode: str, expected: int) -> float:
+    timings = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, str(topics_dir), mode],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.split()
+        assert int(out[1]) == expected, out
+        timings.append(float(out[0]))
+    return statistics.median(timings)
+
+
+def main() -> None:
+    print(f"{'topics':>7} {'parse (ms)':>11} {'pack (ms)':>10} {'speedup':>8}")
+    for count in SIZES:
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            make_topics(temp_dir, count)
+            build_topic_pack(temp_dir)
+            parse = cold_start(temp_dir, "parse", count)
+            pack = cold_start(temp_dir, "pack", count)
+            print(
+                f"{count:>7} {parse * 1000:>11.1f} {pack * 1000:>10.1f} "
+                f"{parse / pack:>7.1f}x"
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: section-tree topic parser vs the previous regex-split parser
+
+The tree parser does more than the old one (H1-H3 nesting, offsets, code
+fences), so it is slower on very large files; the topic pack means the
+server does not parse unchanged topics at all.
+
+Run with: python bench_topic_parser.py
+"""
+
+import re
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from topic_loader import parse_markdown_topic
+
+
+SOURCE_TOPIC = Path(__file__).parent / "topics" / "double-digit-multiplication.md"
+MATERIAL_COPIES = (1, 100, 1000)  # Number of times the materials are repeated
+RUNS = 5
+
+
+def legacy_parse(filepath: Path):
+    """The regex-split parser this module replaced, kept for comparison"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    title_match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
+    name = title_match.group(1) if title_match else filepath.stem
+    sections = re.split(r"\n##\s+", content)
+
+    objectives = ""
+    materials = ""
+    examples = []
+    for section in sections[1:]:
+        lines = section.split("\n", 1)
+        header = lines[0].strip()
+        body = lines[1].strip() if len(lines) > 1 else ""
+        if "learning objective" in header.lower():
+            objectives = body
+        elif "material" in header.lower():
+            materials = body
+        elif "example problem" in header.lower():
+            examples = [
+                line.strip("- ").strip()
+                for line in body.split("\n")
+                if line.strip().startswith("-")
+            ]
+    return name, objectives, materials, examples
+
+
+def make_curriculum(path: Path, copies: int) -> None:
+    """Grow a real topic file by repeating its H3 material subsections"""
+    content = SOURCE_TOPIC.read_text(encoding="utf-8")
+    head, rest = content.split("## Materials\n", 1)
+    materials, tail = rest.split("\n## Example Problems", 1)
+    path.write_text(
+        head
+        + "## Materials\n"
+        + "\n".join(materials for _ in range(copies))
+        + "\n## Example Problems"
+        + tail,
+        encoding="utf-8",
+    )
+
+
+def measure(fn, path: Path):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn(path)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main() -> None:
+    print(
+        f"{'size (KB)':>10} {'legacy (ms)':>12} {'tree (ms)':>12} "
+        f"{'legacy peak (KB)':>17} {'tree peak (KB)':>17}"
+    )
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        for copies in MATERIAL_COPIES:
+            path = temp_dir / f"curriculum-{copies}.md"
+            make_curriculum(path, copies)
+            legacy_time, legacy_peak = measure(legacy_parse, path)
+            tree_time, tree_peak = measure(parse_markdown_topic, path)
+            print(
+                f"{path.stat().st_size / 1024:>10.0f} {legacy_time * 1000:>12.2f} "
+                f"{tree_time * 1000:>12.2f} {legacy_peak / 1024:>17.0f} "
+                f"{tree_peak / 1024:>17.0f}"
+            )
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
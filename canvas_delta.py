@@ -0,0 +1,188 @@
+"""
+Delta-compressed canvas snapshots within a session.
+
+Students usually add to the same drawing between submissions, so after a
+keyframe (a complete image in ``Message.canvas_image``) later snapshots are
+stored in ``Message.canvas_delta`` as only the 32x32 tiles that changed since
+the previous snapshot. A keyframe is written every ``KEYFRAME_INTERVAL``
+snapshots, and whenever the delta would not be smaller than a full image.
+
+Delta format::
+
+    {"size": [width, height], "tiles": [[row, col], ...], "data": <PNG>}
+
+where ``data`` holds the changed tiles stacked top to bottom in ``tiles``
+order (None when nothing changed). Like the keyframes it is a
+``CanvasImage`` in memory and base64 in session files.
+"""
+
+import argparse
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from canvas_images import CanvasImage, encode_png
+
+
+TILE = 32
+KEYFRAME_INTERVAL = int(os.getenv("LEIA_CANVAS_KEYFRAME_INTERVAL", "8"))
+
+
+def snapshot_array(image: Image.Image) -> np.ndarray:
+    """Pixels to diff: grey levels for quantized drawings, else RGB"""
+    if image.mode in ("1", "L", "P"):
+        return np.asarray(image.convert("L"))
+    return np.asarray(image.convert("RGB"))
+
+
+def array_image(pixels: np.ndarray) -> Image.Image:
+    """Lossless image of a snapshot array (1-bit when only black and white)"""
+    image = Image.fromarray(pixels)
+    if pixels.ndim == 2 and np.isin(pixels, (0, 255)).all():
+        return image.convert("1")  # Nothing to dither: already 0 or 255
+    return image
+
+
+def _tiled(pixels: np.ndarray) -> np.ndarray:
+    """View as (rows, TILE, cols, TILE, ...) after padding to whole tiles"""
+    height, width = pixels.shape[:2]
+    pad_y, pad_x = -height % TILE, -width % TILE
+    if pad_y or pad_x:
+        padding = [(0, pad_y), (0, pad_x)] + [(0, 0)] * (pixels.ndim - 2)
+        pixels = np.pad(pixels, padding, mode="edge")
+    rows, cols = pixels.shape[0] // TILE, pixels.shape[1] // TILE
+    return pixels.reshape((rows, TILE, cols, TILE) + pixels.shape[2:])
+
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """``(n, 2)`` array of the (row, col) of every tile that differs"""
+    different = _tiled(previous) != _tiled(current)
+    axes = (1, 3) + tuple(range(4, different.ndim))
+    return np.argwhere(different.any(axis=axes))
+
+
+def make_delta(previous: np.ndarray, current: np.ndarray) -> Dict[str, Any]:
+    """Tile delta turning ``previous`` into ``current`` (same shape)"""
+    height, width = current.shape[:2]
+    tiles = changed_tiles(previous, current)
+    data = None
+    if len(tiles):
+        tiled = _tiled(current)
+        strip = np.concatenate([tiled[row, :, col] for row, col in tiles])
+        image = array_image(strip)
+        data = CanvasImage(encode_png(image), image)
+    return {"size": [width, height], "tiles": tiles.tolist(), "data": data}
+
+
+def apply_delta(previous: np.ndarray, delta: Dict[str, Any]) -> np.ndarray:
+    """Reconstruct the snapshot a delta was made from"""
+    if not delta["tiles"]:
+        return previous
+    height, width = previous.shape[:2]
+    tiled = _tiled(previous.copy())
+    strip = snapshot_array(CanvasImage.coerce(delta["data"]).image)
+    for i, (row, col) in enumerate(delta["tiles"]):
+        tiled[row, :, col] = strip[i * TILE : (i + 1) * TILE]
+    rows, cols = tiled.shape[0], tiled.shape[2]
+    pixels = tiled.reshape((rows * TILE, cols * TILE) + tiled.shape[4:])
+    return pixels[:height, :width]
+
+
+def iter_snapshots(messages: List[Dict]) -> Iterator[Tuple[int, np.ndarray]]:
+    """Every canvas snapshot in a session, in order, as (message index, pixels).
+
+    This is the timeline replay: each delta is applied once to the snapshot
+    before it.
+    """
+    previous = None
+    for index, msg in enumerate(messages):
+        if msg.get("canvas_image"):
+            image = CanvasImage.coerce(msg["canvas_image"]).image
+            previous = snapshot_array(image)
+        elif msg.get("canvas_delta") and previous is not None:
+            previous = apply_delta(previous, msg["canvas_delta"])
+        else:
+            continue
+        yield index, previous
+
+
+def snapshot_at(messages: List[Dict], index: int) -> Optional[np.ndarray]:
+    """Pixels of the drawing attached to ``messages[index]``.
+
+    Replays only from the nearest keyframe at or before ``index``.
+    """
+    start = index
+    while start >= 0 and not messages[start].get("canvas_image"):
+        start -= 1
+    if start < 0:
+        return None
+    for found, pixels in iter_snapshots(messages[start : index + 1]):
+        if start + found == index:
+            return pixels
+    return None
+
+
+def snapshot_png(messages: List[Dict], index: int) -> Optional[bytes]:
+    """Full PNG of the drawing attached to ``messages[index]``"""
+    canvas_image = messages[index].get("canvas_image")
+    if canvas_image:
+        return bytes(CanvasImage.coerce(canvas_image))
+    pixels = snapshot_at(messages, index)
+    return encode_png(array_image(pixels)) if pixels is not None else None
+
+
+def encode_snapshot(
+    messages: List[Dict], image: Image.Image, keyframe: CanvasImage
+) -> Tuple[Optional[CanvasImage], Optional[Dict[str, Any]]]:
+    """``(canvas_image, canvas_delta)`` to store for a new snapshot.
+
+    ``messages`` are the session's earlier messages and ``keyframe`` the
+    PNG of ``image``; exactly one of the two results is set.
+    """
+    last_keyframe = next(
+        (i for i in reversed(range(len(messages))) if messages[i].get("canvas_image")),
+        None,
+    )
+    if last_keyframe is None:
+        return keyframe, None  # First snapshot in the session
+
+    previous, count = None, 0
+    for _, previous in iter_snapshots(messages[last_keyframe:]):
+        count += 1
+    current = snapshot_array(image)
+    if count >= KEYFRAME_INTERVAL or previous.shape != current.shape:
+        return keyframe, None
+    delta = make_delta(previous, current)
+    if delta["data"] is not None and len(delta["data"]) >= len(keyframe):
+        return keyframe, None
+    return None, delta
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Write every canvas snapshot of a session as numbered PNG frames"""
+    from session_manager import load_session
+
+    parser = argparse.ArgumentParser(description="Replay a session's drawings")
+    parser.add_argument("session_id")
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--out", type=Path, default=Path("timeline"))
+    args = parser.parse_args(argv)
+
+    session = load_session(args.session_id, args.sessions_dir)
+    if session is None:
+        print(f"Session {args.session_id} not found.")
+        return
+    args.out.mkdir(parents=True, exist_ok=True)
+    frames = 0
+    for index, pixels in iter_snapshots(session.messages):
+        path = args.out / f"{args.session_id}_{index:04d}.png"
+        path.write_bytes(encode_png(array_image(pixels)))
+        frames += 1
+    print(f"Wrote {frames} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
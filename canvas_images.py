@@ -0,0 +1,189 @@
+"""
+Encoding of canvas drawings for storage and display
+"""
+
+import base64
+import hashlib
+import os
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# The canvas only holds black pen strokes on white (the eraser paints white),
+# so stored images are reduced to grey levels: 2 (1-bit, the default), up to
+# 256, or 0 to keep full RGB. A 1-bit PNG is about a third of the size of the
+# RGB PNG and 3x faster to encode (see bench_canvas_encoding.py).
+CANVAS_COLORS = int(os.getenv("LEIA_CANVAS_COLORS", "2"))
+# zlib level 9 (or optimize=True) saves another ~12% but is 5x slower to
+# encode. Lossless WebP is smaller still but slower to encode and decode, and
+# everything reading stored canvases (exports, Gemini parts) expects PNG.
+PNG_COMPRESS_LEVEL = 6
+
+THUMBNAIL_WIDTH = 300  # Width the chat history shows canvas images at
+THUMBNAIL_COLORS = 4  # Pen strokes on white need only a few grey levels
+
+
+class CanvasImage:
+    """PNG bytes of a canvas drawing, kept binary in memory.
+
+    Sessions hold these in ``canvas_image``, ``canvas_thumbnail`` and the
+    ``data`` of a ``canvas_delta``; base64 is only produced when a session is
+    written as JSON (see ``to_json_value``) and parsed when one is read. The
+    PIL image is decoded on first use and kept. Values are immutable, so
+    copies of a message share them.
+    """
+
+    __slots__ = ("data", "_image", "_digest")
+
+    def __init__(
+        self, data: Union[bytes, memoryview], image: Optional["Image.Image"] = None
+    ):
+        self.data = data
+        self._image = image
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, value: str) -> "CanvasImage":
+        """Parse stored base64, accepting an optional data-URL prefix"""
+        if "," in value:
+            value = value.split(",", 1)[1]
+        return cls(base64.b64decode(value))
+
+    @classmethod
+    def coerce(cls, value: Any) -> Optional["CanvasImage"]:
+        """A CanvasImage for a stored value (base64 or bytes), None if empty"""
+        if not value:
+            return None
+        if isinstance(value, CanvasImage):
+            return value
+        if isinstance(value, str):
+            return cls.from_json(value)
+        return cls(value)
+
+    def to_json(self) -> str:
+        """Base64 text as stored in session files"""
+        return base64.b64encode(self.data).decode("ascii")
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the PNG bytes (hex), used to address the image"""
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+        return self._digest
+
+    @property
+    def image(self) -> "Image.Image":
+        """The decoded image (decoded once, then reused)"""
+        if self._image is None:
+            from PIL import Image
+
+            image = Image.open(BytesIO(self.data))
+            image.load()
+            self._image = image
+        return self._image
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CanvasImage):
+            return NotImplemented
+        return self.data == other.data
+
+    def __hash__(self) -> int:
+        return hash(bytes(self.data))
+
+    def __repr__(self) -> str:
+        return f"CanvasImage({len(self.data)} bytes)"
+
+    def __copy__(self) -> "CanvasImage":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "CanvasImage":
+        return self
+
+
+def to_json_value(value: Any) -> str:
+    """``default`` for ``json.dump``: canvas images become base64"""
+    if isinstance(value, CanvasImage):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def decode_images(messages: List[dict]) -> List[dict]:
+    """Turn the base64 images of freshly loaded messages into CanvasImages"""
+    for msg in messages:
+        for key in ("canvas_image", "canvas_thumbnail"):
+            if msg.get(key):
+                msg[key] = CanvasImage.coerce(msg[key])
+        delta = msg.get("canvas_delta")
+        if delta and delta.get("data"):
+            delta["data"] = CanvasImage.coerce(delta["data"])
+    return messages
+
+
+_THRESHOLD = [255 if v >= 128 else 0 for v in range(256)]
+
+
+def _grey_levels(colors: int) -> List[int]:
+    """Palette of ``colors`` evenly spaced greys, black first"""
+    return [round(i * 255 / (colors - 1)) for i in range(colors)]
+
+
+def quantize_canvas(
+    image: "Image.Image", colors: int = CANVAS_COLORS
+) -> "Image.Image":
+    """Reduce a drawing to ``colors`` grey levels (mode "1" for 2, else "P").
+
+    A fixed grey palette is used rather than an adaptive one, so the result
+    only depends on each pixel's brightness and is cheap to compute.
+    """
+    if colors <= 0:
+        return image
+    grey = image.convert("L")
+    if colors == 2:
+        # Straight to mode "1" through a lookup table, without dithering
+        return grey.point(_THRESHOLD, "1")
+
+    colors = min(colors, 256)
+    index = grey.point([round(v * (colors - 1) / 255) for v in range(256)])
+    index.putpalette([c for level in _grey_levels(colors) for c in (level,) * 3])
+    return index
+
+
+def has_ink(pixels) -> bool:
+    """Whether canvas pixel data (an RGB or RGBA array) has anything drawn"""
+    return pixels is not None and pixels.size > 0 and int(pixels[..., :3].min()) < 255
+
+
+def encode_png(image: "Image.Image") -> bytes:
+    """PNG bytes with the compression level chosen for canvas images"""
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+def make_thumbnail(
+    image: "Image.Image", width: int = THUMBNAIL_WIDTH
+) -> Optional[bytes]:
+    """Small palette PNG of the drawing for the history view.
+
+    Images no wider than ``width`` are kept as they are (returns None), since
+    the full image is then just as cheap to show.
+    """
+    from PIL import Image
+
+    if image.width <= width:
+        return None
+    height = max(1, round(image.height * width / image.width))
+    thumbnail = image.convert("RGB").resize((width, height), Image.Resampling.BOX)
+    thumbnail = thumbnail.quantize(colors=THUMBNAIL_COLORS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,52 @@
+"""
+Debouncing: run a function once calls have paused for a while
+"""
+
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+class Debouncer:
+    """Call ``fn`` with the latest arguments ``delay`` seconds after the last call.
+
+    Calls arriving meanwhile restart the wait, so a burst (e.g. keystrokes)
+    results in a single call. ``flush`` runs a pending call right away.
+    """
+
+    def __init__(self, delay: float, fn: Callable[..., Any]):
+        self.delay = delay
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._args: Optional[Tuple] = None
+
+    def __call__(self, *args) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._args = args
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def pending(self) -> bool:
+        return self._args is not None
+
+    def flush(self) -> None:
+        """Make the pending call now (nothing happens if there is none)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            args, self._args = self._args, None
+        if args is not None:
+            self.fn(*args)
+
+    def cancel(self) -> None:
+        """Drop the pending call"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._args = None
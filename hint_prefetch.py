@@ -0,0 +1,128 @@
+"""
+Opt-in speculative prefetching of a first hint while the student works
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from models import Message, Session, Topic
+from metrics import HINT_PREFETCH
+from response_cache import make_key
+
+
+PREFETCH_ENABLED = os.getenv("LEIA_PREFETCH_HINTS") == "1"
+PREFETCH_BUDGET = int(os.getenv("LEIA_PREFETCH_BUDGET", "3"))  # Calls per session
+PREFETCH_WAIT_SECONDS = 30.0  # How long a help request waits for a running prefetch
+MAX_TRACKED_SESSIONS = 256  # Pending hints and budgets kept, least recent dropped
+
+
+def session_state_key(session: Session) -> str:
+    """Identifies the conversation state a hint was generated for"""
+    last = session.messages[-1] if session.messages else {}
+    return make_key(
+        session.session_id, len(session.messages), last.get("role"), last.get("content")
+    )
+
+
+@dataclass
+class PrefetchedHint:
+    state_key: str
+    future: Future  # Resolves to (hint text, CallUsage)
+
+
+class HintPrefetcher:
+    """Generates a hint in the background after each new tutor problem.
+
+    ``fetch(topic, history)`` returns ``(text, usage)``, or None if no hint
+    could be generated; it runs on a small worker pool. A prefetched hint is
+    only handed out while the session is still in the state it was
+    generated for. Hints are generated without the canvas, so callers must
+    not use one when the student has drawn something (see ``has_ink``).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Topic, list], Optional[Tuple[str, object]]],
+        enabled: bool = PREFETCH_ENABLED,
+        budget: int = PREFETCH_BUDGET,
+        workers: int = 2,
+    ):
+        self.fetch = fetch
+        self.enabled = enabled
+        self.budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=workers) if enabled else None
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, PrefetchedHint]" = OrderedDict()
+        # session_id -> prefetch calls made, for the most recent sessions
+        self._spent: "OrderedDict[str, int]" = OrderedDict()
+
+    def _discard(self, hint: PrefetchedHint) -> None:
+        if hint.future.cancel():
+            return
+        HINT_PREFETCH.inc(result="discarded")
+
+    def schedule(self, session: Session, topic: Topic) -> bool:
+        """Start prefetching a hint for the session's current state"""
+        if not self.enabled or not session.session_id or not session.messages:
+            return False
+        if session.messages[-1].get("role") != "tutor":
+            return False
+
+        state_key = session_state_key(session)
+        with self._lock:
+            current = self._pending.get(session.session_id)
+            if current is not None and current.state_key == state_key:
+                return True
+            spent = self._spent.get(session.session_id, 0)
+            self._spent[session.session_id] = spent
+            self._spent.move_to_end(session.session_id)
+            while len(self._spent) > MAX_TRACKED_SESSIONS:
+                self._spent.popitem(last=False)
+            if spent >= self.budget:
+                HINT_PREFETCH.inc(result="over_budget")
+                return False
+            if current is not None:
+                self._discard(current)
+
+            self._spent[session.session_id] = spent + 1
+            history = [Message(**m) for m in session.messages]
+            future = self._executor.submit(self.fetch, topic, history)
+            self._pending[session.session_id] = PrefetchedHint(state_key, future)
+            self._pending.move_to_end(session.session_id)
+            while len(self._pending) > MAX_TRACKED_SESSIONS:
+                _, oldest = self._pending.popitem(last=False)
+                self._discard(oldest)
+        HINT_PREFETCH.inc(result="scheduled")
+        return True
+
+    def take(self, session: Session) -> Optional[Tuple[str, object]]:
+        """Return the prefetched ``(hint, usage)`` if it matches the session.
+
+        Waits for a prefetch that is still running (it is already part way
+        through the round trip). Returns None if there is no usable hint.
+        """
+        if not self.enabled or not session.session_id:
+            return None
+        with self._lock:
+            hint = self._pending.pop(session.session_id, None)
+        if hint is None:
+            return None
+        if hint.state_key != session_state_key(session):
+            self._discard(hint)
+            return None
+
+        try:
+            result = hint.future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except Exception as e:
+            print(f"Error prefetching hint: {e}")
+            result = None
+        HINT_PREFETCH.inc(result="served" if result is not None else "failed")
+        return result
+
+    def spent(self, session_id: str) -> int:
+        with self._lock:
+            return self._spent.get(session_id, 0)
@@ -0,0 +1,218 @@
+"""
+Canvas images served over HTTP by content hash
+
+The chat history shows drawings as ``<img>`` URLs instead of sending the
+PNG bytes through the widget websocket on every render. URLs name the
+image's content hash, so responses never change: they carry a strong ETag
+and an immutable Cache-Control, and the browser keeps them across re-renders
+and reconnects.
+
+Images are registered when the history view shows them and kept in memory
+(least recently used first out, within ``LEIA_IMAGE_CACHE_MB``). URLs also
+name the session and message an image belongs to, so one this process does
+not hold (after a restart, an eviction, or on another worker) is found in
+the stored session instead. Outside the Solara server (e.g. in a notebook)
+no route exists and ``image_source`` returns the bytes instead.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import FrozenSet, List, Optional, Tuple, Union
+
+from canvas_images import CanvasImage
+from metrics import CANVAS_IMAGE_REQUESTS, mount_route
+from session_manager import load_session
+
+
+IMAGE_PATH = "/canvas-images"
+# Students' drawings: cached by their browser, never by a shared proxy or CDN
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+MAX_BYTES = int(float(os.getenv("LEIA_IMAGE_CACHE_MB", "64")) * 1024 * 1024)
+MAX_LOOKUPS = 1024  # Stored messages whose image hashes are remembered
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{32}$")
+_SESSION_RE = re.compile(r"^session_[0-9A-Za-z_-]+$")
+
+
+class ImageStore:
+    """Thread-safe LRU of image bytes by content hash, bounded in bytes"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, image: CanvasImage) -> str:
+        """Keep ``image`` available and return its digest"""
+        digest = image.digest
+        with self._lock:
+            if digest in self._images:
+                self._images.move_to_end(digest)
+                return digest
+            data = bytes(image)
+            self._images[digest] = data
+            self._size += len(data)
+            # The newest image always stays, even when it alone is too big
+            while self._size > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Bytes of a registered image, None if unknown or evicted"""
+        with self._lock:
+            data = self._images.get(digest)
+            if data is not None:
+                self._images.move_to_end(digest)
+            return data
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+IMAGE_STORE = ImageStore()
+_mounted = False
+_sessions_dir: Optional[Path] = None
+
+
+def image_url(
+    image: CanvasImage,
+    store: ImageStore = IMAGE_STORE,
+    session_id: Optional[str] = None,
+    index: Optional[int] = None,
+) -> str:
+    """URL the image is served at (registering it with ``store``).
+
+    ``session_id`` and ``index`` name the message the image is attached to,
+    so it can still be served once ``store`` no longer holds it.
+    """
+    url = f"{IMAGE_PATH}/{store.put(image)}.png"
+    if session_id is not None and index is not None:
+        url += f"?session={session_id}&index={index}"
+    return url
+
+
+def image_source(
+    image: CanvasImage, session_id: Optional[str] = None, index: Optional[int] = None
+) -> Union[str, bytes]:
+    """What to give ``solara.Image``: a cacheable URL when served, else bytes"""
+    if not _mounted:
+        return bytes(image)
+    return image_url(image, session_id=session_id, index=index)
+
+
+def stored_images(sessions_dir: Path, session_id: str, index: int) -> List[CanvasImage]:
+    """Images attached to a stored session's message.
+
+    That is its thumbnail and its full drawing, rebuilt from the session's
+    earlier drawings for a delta snapshot.
+    """
+    session = load_session(session_id, sessions_dir)
+    if session is None or not 0 <= index < len(session.messages):
+        return []
+    msg = session.messages[index]
+    images = []
+    if msg.get("canvas_thumbnail"):
+        images.append(CanvasImage.coerce(msg["canvas_thumbnail"]))
+    if msg.get("canvas_image"):
+        images.append(CanvasImage.coerce(msg["canvas_image"]))
+    elif msg.get("canvas_delta"):
+        from canvas_delta import snapshot_png
+
+        data = snapshot_png(session.messages, index)
+        if data is not None:
+            images.append(CanvasImage(data))
+    return images
+
+
+# (sessions_dir, session_id, index) -> hashes of that message's images, for
+# messages already looked up, so repeated or wrong requests do not load it
+_lookups: "OrderedDict[Tuple[Path, str, int], FrozenSet[str]]" = OrderedDict()
+_lookups_lock = threading.Lock()
+
+
+def _from_session(
+    request, digest: str, store: ImageStore, sessions_dir: Optional[Path]
+) -> Optional[bytes]:
+    session_id = request.query_params.get("session", "")
+    index = request.query_params.get("index", "")
+    if sessions_dir is None or not _SESSION_RE.match(session_id):
+        return None
+    if not index.isdigit():
+        return None
+    key = (sessions_dir, session_id, int(index))
+    with _lookups_lock:
+        known = _lookups.get(key)
+    if known is not None and digest not in known:
+        return None
+
+    try:
+        images = stored_images(sessions_dir, session_id, int(index))
+    except Exception as e:
+        print(f"Error finding canvas image {digest}: {e}")
+        return None
+    # Every image of the message is kept, so its thumbnail and full drawing
+    # are both served from memory from now on
+    for image in images:
+        store.put(image)
+    with _lookups_lock:
+        _lookups[key] = frozenset(image.digest for image in images)
+        _lookups.move_to_end(key)
+        while len(_lookups) > MAX_LOOKUPS:
+            _lookups.popitem(last=False)
+    return next((bytes(i) for i in images if i.digest == digest), None)
+
+
+def _etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def image_endpoint(
+    request, store: ImageStore = IMAGE_STORE, sessions_dir: Optional[Path] = None
+):
+    """Starlette endpoint for ``GET {IMAGE_PATH}/<digest>.png``.
+
+    ``sessions_dir`` defaults to the one given to ``mount_images``.
+    """
+    from starlette.responses import Response
+
+    digest = request.path_params["digest"]
+    if not _DIGEST_RE.match(digest):
+        CANVAS_IMAGE_REQUESTS.inc(status="404")
+        return Response("Not found", status_code=404)
+
+    headers = {"ETag": _etag(digest), "Cache-Control": CACHE_CONTROL}
+    # The URL names the content, so a matching ETag is always still valid,
+    # even for an image this process no longer (or never) held
+    if _etag(digest) in request.headers.get("if-none-match", ""):
+        CANVAS_IMAGE_REQUESTS.inc(status="304")
+        return Response(status_code=304, headers=headers)
+
+    data = store.get(digest)
+    if data is None:
+        data = _from_session(request, digest, store, sessions_dir or _sessions_dir)
+    if data is None:
+        CANVAS_IMAGE_REQUESTS.inc(status="404")
+        return Response("Not found", status_code=404)
+    CANVAS_IMAGE_REQUESTS.inc(status="200")
+    return Response(data, media_type="image/png", headers=headers)
+
+
+def mount_images(app=None, sessions_dir: Optional[Path] = None) -> bool:
+    """Add the canvas image route to a Starlette app.
+
+    Defaults to the running Solara server's app; returns False when there is
+    none, and ``image_source`` then keeps returning bytes. Images this
+    process does not hold are looked up in ``sessions_dir``.
+    """
+    global _mounted, _sessions_dir
+
+    if sessions_dir is not None:
+        _sessions_dir = sessions_dir
+    mounted = mount_route(f"{IMAGE_PATH}/{{digest}}.png", image_endpoint, app)
+    _mounted = _mounted or mounted
+    return mounted
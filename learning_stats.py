@@ -0,0 +1,351 @@
+"""
+Incrementally maintained per-topic and per-day learning statistics (SQLite)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from models import Session, HELP_REQUEST_TEXT
+from parallel import bounded_map
+from session_manager import SessionRef, iter_session_refs, read_session_ref
+
+
+STATS_FILENAME = "_learning_stats.sqlite3"
+LEGACY_STATS_FILENAME = "_learning_stats.json"  # Imported once, then unused
+LEGACY_STATS_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS day_stats (
+    day TEXT NOT NULL,
+    topic_name TEXT NOT NULL,
+    sessions_started INTEGER NOT NULL DEFAULT 0,
+    student_turns INTEGER NOT NULL DEFAULT 0,
+    tutor_turns INTEGER NOT NULL DEFAULT 0,
+    vision_turns INTEGER NOT NULL DEFAULT 0,
+    text_turns INTEGER NOT NULL DEFAULT 0,
+    help_requests INTEGER NOT NULL DEFAULT 0,
+    latency_ms_total REAL NOT NULL DEFAULT 0,
+    latency_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, topic_name)
+);
+CREATE TABLE IF NOT EXISTS counted_sessions (
+    session_id TEXT PRIMARY KEY,
+    message_count INTEGER NOT NULL
+);
+"""
+
+# Usage flags of tutor turns that did not wait on the model
+NO_CALL_USAGE = ("served_locally", "cache_hit", "prefetched")
+
+# Serializes writers within this process; SQLite handles other processes
+_write_lock = threading.Lock()
+
+
+@dataclass
+class TopicStats:
+    """Aggregated counters for one topic (or one topic on one day)"""
+
+    sessions_started: int = 0
+    student_turns: int = 0
+    tutor_turns: int = 0
+    vision_turns: int = 0  # Student turns with a canvas image
+    text_turns: int = 0  # Student turns with text only
+    help_requests: int = 0
+    latency_ms_total: float = 0.0
+    latency_count: int = 0
+
+    @property
+    def turns_per_session(self) -> float:
+        if not self.sessions_started:
+            return 0.0
+        return self.student_turns / self.sessions_started
+
+    @property
+    def avg_latency_ms(self) -> Optional[float]:
+        if not self.latency_count:
+            return None
+        return self.latency_ms_total / self.latency_count
+
+    def merge(self, other: "TopicStats") -> None:
+        """Add another set of counters into this one"""
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+
+COUNTERS = [f.name for f in fields(TopicStats)]
+
+_COLUMNS = ", ".join(COUNTERS)
+_SUMS = ", ".join(f"SUM({name})" for name in COUNTERS)
+_ADD_COUNTS = (
+    f"INSERT INTO day_stats (day, topic_name, {_COLUMNS}) "
+    f"VALUES (?, ?, {', '.join('?' for _ in COUNTERS)}) "
+    "ON CONFLICT (day, topic_name) DO UPDATE SET "
+    + ", ".join(f"{name} = {name} + excluded.{name}" for name in COUNTERS)
+)
+
+
+def _apply_message(stats: TopicStats, msg: Dict) -> None:
+    role = msg.get("role")
+    if role == "student":
+        stats.student_turns += 1
+        if msg.get("canvas_image") or msg.get("canvas_delta"):
+            stats.vision_turns += 1
+        else:
+            stats.text_turns += 1
+        if msg.get("content") == HELP_REQUEST_TEXT:
+            stats.help_requests += 1
+    elif role == "tutor":
+        stats.tutor_turns += 1
+        # Older sessions also stored a latency for turns served without a call
+        usage = msg.get("usage") or {}
+        served = any(usage.get(key) for key in NO_CALL_USAGE)
+        if msg.get("latency_ms") is not None and not served:
+            stats.latency_ms_total += msg["latency_ms"]
+            stats.latency_count += 1
+
+
+class _Aggregates:
+    """Day -> topic counters for a batch of messages, added to the database"""
+
+    def __init__(self):
+        self.days: Dict[str, Dict[str, TopicStats]] = {}
+        self.seen: Dict[str, int] = {}  # session_id -> messages already counted
+
+    def bucket(self, topic: str, day: str) -> TopicStats:
+        return self.days.setdefault(day, {}).setdefault(topic, TopicStats())
+
+    def add_messages(
+        self, session_id: str, topic: str, created_at: str, messages: List[Dict]
+    ) -> None:
+        """Count messages not seen before for this session"""
+        start = self.seen.get(session_id)
+        if start is None:
+            self.bucket(topic, created_at[:10]).sessions_started += 1
+            start = 0
+
+        for msg in messages[start:]:
+            day = (msg.get("timestamp") or created_at)[:10]
+            _apply_message(self.bucket(topic, day), msg)
+
+        self.seen[session_id] = max(start, len(messages))
+
+    def merge(self, other: "_Aggregates") -> None:
+        for day, topics in other.days.items():
+            for topic, stats in topics.items():
+                self.bucket(topic, day).merge(stats)
+        self.seen.update(other.seen)
+
+    @classmethod
+    def from_legacy(cls, data: Dict) -> "_Aggregates":
+        """Aggregates saved by the JSON store this database replaced"""
+        agg = cls()
+        if data.get("version") != LEGACY_STATS_VERSION:
+            return agg
+        agg.days = {
+            d: {t: TopicStats(**s) for t, s in topics.items()}
+            for d, topics in data["days"].items()
+        }
+        agg.seen = dict(data["seen"])
+        return agg
+
+
+@contextmanager
+def _immediate(conn: sqlite3.Connection) -> Iterator[None]:
+    """Transaction holding the write lock from its first read.
+
+    A session's counted messages are read and then added to, so another
+    process must not add the same messages in between.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _add(conn: sqlite3.Connection, agg: _Aggregates) -> None:
+    """Add counters to the stored totals (caller holds the transaction)"""
+    conn.executemany(
+        _ADD_COUNTS,
+        [
+            (day, topic) + tuple(getattr(stats, name) for name in COUNTERS)
+            for day, topics in agg.days.items()
+            for topic, stats in topics.items()
+        ],
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO counted_sessions (session_id, message_count) "
+        "VALUES (?, ?)",
+        list(agg.seen.items()),
+    )
+
+
+class LearningStats:
+    """Learning statistics for one sessions directory, stored alongside it.
+
+    Every save adds only its new messages to the stored totals inside one
+    SQLite transaction, so server workers and a batch rebuild running at
+    the same time never overwrite each other's counts.
+    """
+
+    def __init__(self, sessions_dir: Path):
+        self.sessions_dir = sessions_dir
+        self.path = sessions_dir / STATS_FILENAME
+        self._import_legacy()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _import_legacy(self) -> None:
+        legacy = self.sessions_dir / LEGACY_STATS_FILENAME
+        if self.path.exists() or not legacy.exists():
+            return
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                agg = _Aggregates.from_legacy(json.load(f))
+        except Exception as e:
+            print(f"Error loading learning stats: {e}")
+            return
+        self.replace(agg)
+
+    def record_session(self, session: Session) -> None:
+        """Count the messages appended to a session since it was last recorded"""
+        with _write_lock, closing(self._connect()) as conn, _immediate(conn):
+            row = conn.execute(
+                "SELECT message_count FROM counted_sessions WHERE session_id = ?",
+                (session.session_id,),
+            ).fetchone()
+            agg = _Aggregates()
+            if row is not None:
+                agg.seen[session.session_id] = row[0]
+            agg.add_messages(
+                session.session_id,
+                session.topic_name,
+                session.created_at,
+                session.messages,
+            )
+            _add(conn, agg)
+
+    def replace(self, agg: _Aggregates) -> None:
+        """Swap in freshly recomputed aggregates"""
+        with _write_lock, closing(self._connect()) as conn, _immediate(conn):
+            conn.execute("DELETE FROM day_stats")
+            conn.execute("DELETE FROM counted_sessions")
+            _add(conn, agg)
+
+    def _rows(self, sql: str, params=()) -> List[tuple]:
+        if not self.path.exists():
+            return []
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def topic_stats(self, topic: Optional[str] = None) -> Dict[str, TopicStats]:
+        """Totals per topic, optionally for a single topic"""
+        where = "WHERE topic_name = ? " if topic is not None else ""
+        rows = self._rows(
+            f"SELECT topic_name, {_SUMS} FROM day_stats {where}GROUP BY topic_name",
+            (topic,) if topic is not None else (),
+        )
+        return {row[0]: TopicStats(*row[1:]) for row in rows}
+
+    def daily_stats(
+        self,
+        topic: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, TopicStats]:
+        """Totals per day (YYYY-MM-DD, inclusive range), across or for one topic"""
+        where = "day >= ? AND day <= ?"
+        params: tuple = (start or "", end or "9999-12-31")
+        if topic is not None:
+            where += " AND topic_name = ?"
+            params += (topic,)
+        rows = self._rows(
+            f"SELECT day, {_SUMS} FROM day_stats WHERE {where} "
+            "GROUP BY day ORDER BY day",
+            params,
+        )
+        return {row[0]: TopicStats(*row[1:]) for row in rows}
+
+
+_instances: Dict[Path, LearningStats] = {}
+_instances_lock = threading.Lock()
+
+
+def get_learning_stats(sessions_dir: Path) -> LearningStats:
+    """Return the shared LearningStats for a sessions directory"""
+    key = sessions_dir.resolve()
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = LearningStats(sessions_dir)
+        return _instances[key]
+
+
+def record_session(session: Session, sessions_dir: Path) -> None:
+    """Save hook: update the statistics for a just-saved session"""
+    get_learning_stats(sessions_dir).record_session(session)
+
+
+def _aggregate_session(ref: SessionRef) -> Optional[_Aggregates]:
+    try:
+        data = read_session_ref(ref)
+    except Exception as e:
+        print(f"Error reading session {ref[0]}: {e}")
+        return None
+    agg = _Aggregates()
+    agg.add_messages(
+        data.get("session_id") or ref[0],
+        data["topic_name"],
+        data["created_at"],
+        data.get("messages", []),
+    )
+    return agg
+
+
+def rebuild_stats(sessions_dir: Path, workers: int = 1) -> LearningStats:
+    """Recompute all statistics from scratch, in parallel when workers > 1"""
+    total = _Aggregates()
+    results = bounded_map(
+        _aggregate_session,
+        iter_session_refs(sessions_dir),
+        workers,
+        window=max(1, workers) * 4,
+    )
+    for agg in results:
+        if agg is not None:
+            total.merge(agg)
+
+    stats = get_learning_stats(sessions_dir)
+    stats.replace(total)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: rebuild statistics as a batch job"""
+    parser = argparse.ArgumentParser(description="Rebuild learning statistics")
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    stats = rebuild_stats(args.sessions_dir, workers=args.workers)
+    for name, topic in sorted(stats.topic_stats().items()):
+        print(
+            f"{name}: {topic.sessions_started} session(s), "
+            f"{topic.turns_per_session:.1f} turns/session, "
+            f"{topic.help_requests} help request(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Chat messages rendered once to sanitized HTML
+
+``solara.Markdown`` converts its text and creates a template widget (with
+its own math and diagram loaders) for every message on every history
+render. Instead, each message's markdown is converted once, cleaned to an
+allowlist of tags, and cached by a hash of its content; the history view
+shows the cached HTML in a plain HTML element.
+
+Raw HTML typed into a message is shown as text, and only http(s), mailto
+and in-page links are kept. With ``LEIA_STORE_MESSAGE_HTML=1`` the HTML is
+also stored on each new message (``Message.content_html``), so reopened
+sessions need no conversion at all.
+"""
+
+import hashlib
+import html
+import os
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+
+STORE_HTML = os.getenv("LEIA_STORE_MESSAGE_HTML", "").lower() in ("1", "true", "yes")
+CACHE_SIZE = 2048  # Messages; a long session has a few dozen
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "del", "em", "h1", "h2", "h3", "h4",
+    "h5", "h6", "hr", "i", "li", "ol", "p", "pre", "strong", "sub", "sup",
+    "table", "tbody", "td", "th", "thead", "tr", "ul",
+}  # fmt: skip
+ALLOWED_ATTRIBUTES = {"a": {"href", "title"}, "ol": {"start"}}
+VOID_TAGS = {"br", "hr"}
+DROPPED_CONTENT = {"script", "style"}  # Not even their text is kept
+SAFE_URL_PREFIXES = ("http://", "https://", "mailto:", "#")
+
+
+class _Sanitizer(HTMLParser):
+    """Re-emit HTML keeping only allowed tags and attributes"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self._dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT:
+            self._dropping += 1
+        if self._dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, ())
+        kept = ""
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == "href" and not value.strip().lower().startswith(
+                SAFE_URL_PREFIXES
+            ):
+                continue
+            kept += f' {name}="{html.escape(value)}"'
+        if tag == "a":
+            kept += ' target="_blank" rel="noopener noreferrer"'
+        self.out.append(f"<{tag}{kept}>")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROPPED_CONTENT:
+            self._dropping -= 1
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT:
+            self._dropping = max(0, self._dropping - 1)
+            return
+        if not self._dropping and tag in ALLOWED_TAGS and tag not in VOID_TAGS:
+            self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self._dropping:
+            self.out.append(html.escape(data, quote=False))
+
+
+def sanitize_html(markup: str) -> str:
+    """Keep only allowlisted tags and attributes; everything else is text"""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(markup)
+    sanitizer.close()
+    return "".join(sanitizer.out)
+
+
+_parser = None
+_parser_lock = threading.Lock()
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _convert(text: str) -> str:
+    """Markdown to HTML, with raw HTML in the text escaped"""
+    global _parser
+
+    with _parser_lock:
+        if _parser is None:
+            import markdown
+
+            _parser = markdown.Markdown(
+                extensions=["fenced_code", "tables", "sane_lists"]
+            )
+            # Typed HTML is shown as text rather than passed through
+            _parser.preprocessors.deregister("html_block")
+            _parser.inlinePatterns.deregister("html")
+        try:
+            return _parser.convert(text)
+        finally:
+            _parser.reset()
+
+
+def content_key(text: str) -> str:
+    """Cache key for a message's text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def render_markdown(text: str) -> str:
+    """Sanitized HTML for markdown text, converted once per distinct text"""
+    key = content_key(text)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    rendered = sanitize_html(_convert(text))
+    with _cache_lock:
+        _cache[key] = rendered
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rendered
+
+
+def prerender(text: str) -> Optional[str]:
+    """Render a new message now, so the history view finds it cached.
+
+    Returns the HTML to store on the message when storing is enabled.
+    """
+    rendered = render_markdown(text)
+    return rendered if STORE_HTML else None
+
+
+def message_html(msg: Dict, label: str = "") -> str:
+    """HTML for a message dict, led by a bold ``label`` (e.g. "Leia:")"""
+    rendered = msg.get("content_html") or render_markdown(msg.get("content", ""))
+    if not label:
+        return rendered
+    strong = f"<strong>{html.escape(label)}</strong> "
+    # Inline with the first paragraph, as the markdown prefix used to be
+    if rendered.startswith("<p>"):
+        return "<p>" + strong + rendered[3:]
+    return strong + rendered
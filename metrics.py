@@ -0,0 +1,385 @@
+"""
+Prometheus-style metrics, exported at /metrics on the Solara server
+
+Metrics are plain in-process counters, gauges and histograms rendered in
+the Prometheus text exposition format, so no client library is needed.
+Timing histograms are fed from tracing spans.
+"""
+
+import bisect
+import math
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from tracing import Span, add_span_listener
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+SIZE_BUCKETS = (4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the enclosed block as in progress"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1] if entry else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+AI_REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "leia_ai_request_duration_seconds",
+        "Gemini generate_content latency.",
+        ["kind"],
+        buckets=AI_LATENCY_BUCKETS,
+    )
+)
+AI_ERRORS = REGISTRY.register(
+    Counter(
+        "leia_ai_errors_total",
+        "Error messages returned instead of AI output.",
+        ["function"],
+    )
+)
+AI_IN_FLIGHT = REGISTRY.register(
+    Gauge("leia_ai_requests_in_flight", "Gemini requests currently in progress.")
+)
+AI_TOKENS = REGISTRY.register(
+    Counter(
+        "leia_ai_tokens_total",
+        "Tokens reported by Gemini usage metadata.",
+        ["direction"],
+    )
+)
+AI_CACHE = REGISTRY.register(
+    Counter(
+        "leia_ai_cache_requests_total",
+        "Feedback requests by response cache result (hit, miss, bypass).",
+        ["result"],
+    )
+)
+AI_COALESCED = REGISTRY.register(
+    Counter(
+        "leia_ai_coalesced_requests_total",
+        "Requests that shared an identical Gemini call already in flight.",
+        ["kind"],
+    )
+)
+HINT_PREFETCH = REGISTRY.register(
+    Counter(
+        "leia_hint_prefetch_total",
+        "Speculative hint prefetches by outcome.",
+        ["result"],
+    )
+)
+LOCAL_CHECKS = REGISTRY.register(
+    Counter(
+        "leia_local_answer_checks_total",
+        "Answers verified locally by result (correct, incorrect, unchecked).",
+        ["result"],
+    )
+)
+LOCAL_ANSWERS = REGISTRY.register(
+    Counter("leia_local_answers_total", "Turns answered locally without Gemini.")
+)
+LOCAL_SAVED_SECONDS = REGISTRY.register(
+    Counter(
+        "leia_local_answer_saved_seconds_total",
+        "Estimated Gemini latency saved by local answers (mean feedback latency).",
+    )
+)
+LOCAL_PROBLEMS = REGISTRY.register(
+    Counter(
+        "leia_local_problems_total",
+        "Problems generated locally by use (greeting, next).",
+        ["use"],
+    )
+)
+AI_IMAGE_BYTES = REGISTRY.register(
+    Counter("leia_ai_image_bytes_total", "Image bytes sent to Gemini.")
+)
+SESSION_SAVE_SECONDS = REGISTRY.register(
+    Histogram("leia_session_save_duration_seconds", "Time to write a session file.")
+)
+SESSION_LOAD_SECONDS = REGISTRY.register(
+    Histogram(
+        "leia_session_load_duration_seconds",
+        "Time to load a session.",
+        ["archived"],
+    )
+)
+CANVAS_ENCODE_SECONDS = REGISTRY.register(
+    Histogram("leia_canvas_encode_duration_seconds", "Time to encode the canvas image.")
+)
+CANVAS_IMAGE_BYTES = REGISTRY.register(
+    Histogram(
+        "leia_canvas_image_bytes",
+        "Size of encoded canvas images.",
+        buckets=SIZE_BUCKETS,
+    )
+)
+CANVAS_IMAGE_REQUESTS = REGISTRY.register(
+    Counter(
+        "leia_canvas_image_requests_total",
+        "Requests for canvas images by HTTP status (200, 304, 404).",
+        ["status"],
+    )
+)
+GREETING_POOL = REGISTRY.register(
+    Counter(
+        "leia_greeting_pool_total",
+        "Pre-generated opening messages by outcome.",
+        ["result"],
+    )
+)
+PREWARM_READY = REGISTRY.register(
+    Gauge("leia_prewarm_ready", "1 once the startup pre-warm has finished.")
+)
+ACTIVE_SESSIONS = REGISTRY.register(
+    Gauge("leia_active_sessions", "Browser pages with a tutoring session open.")
+)
+
+
+def observe_span(span: Span) -> None:
+    """Feed the timing histograms from finished tracing spans"""
+    seconds = span.duration_ms / 1000
+    if span.name == "ai.generate_content":
+        AI_REQUEST_SECONDS.observe(seconds, kind=span.attrs.get("kind", "unknown"))
+    elif span.name == "session.write":
+        SESSION_SAVE_SECONDS.observe(seconds)
+    elif span.name == "session.load":
+        SESSION_LOAD_SECONDS.observe(
+            seconds, archived=str(bool(span.attrs.get("archived"))).lower()
+        )
+    elif span.name == "turn.png_encode":
+        CANVAS_ENCODE_SECONDS.observe(seconds)
+        if span.attrs.get("bytes") is not None:
+            CANVAS_IMAGE_BYTES.observe(span.attrs["bytes"])
+
+
+add_span_listener(observe_span)
+
+
+async def metrics_endpoint(request):
+    """Starlette endpoint serving the registry"""
+    from starlette.responses import Response
+
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def mount_route(path: str, endpoint, app=None) -> bool:
+    """Add a GET route to a Starlette app, ahead of its other routes.
+
+    Defaults to the running Solara server's app; returns False when there is
+    none (e.g. when app.py is imported in a notebook).
+    """
+    if app is None:
+        server = sys.modules.get("solara.server.starlette")
+        app = getattr(server, "app", None)
+        if app is None:
+            return False
+
+    from starlette.routing import Route
+
+    if any(getattr(route, "path", None) == path for route in app.router.routes):
+        return True
+    # Ahead of Solara's catch-all routes
+    app.router.routes.insert(0, Route(path, endpoint, methods=["GET"]))
+    return True
+
+
+def mount_metrics(app=None) -> bool:
+    """Add the /metrics route to a Starlette app (the Solara server's by default)"""
+    return mount_route(METRICS_PATH, metrics_endpoint, app)
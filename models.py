@@ -2,8 +2,34 @@
 Data models for Leia's AI Tutor
 """
 
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Dict
+from dataclasses import dataclass, asdict, field
+from typing import Any, List, Optional, Dict, Tuple
+
+from canvas_images import CanvasImage
+
+
+# Text sent on the student's behalf by the "Ask for Help" button
+HELP_REQUEST_TEXT = "I need help with this problem. Can you give me a hint?"
+
+
+@dataclass
+class TopicSection:
+    """A heading (H1-H3) of a topic file and everything under it"""
+
+    level: int
+    title: str
+    start: int  # Character offset of the heading line
+    end: int  # Character offset where the section (with subsections) ends
+    body: str  # Text under the heading, including subsections
+    children: List["TopicSection"] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Problem:
+    """One arithmetic exercise, as understood by answer checkers"""
+
+    kind: str  # Name of the checker that understands it
+    operands: Tuple[int, ...]
 
 
 @dataclass
@@ -15,6 +41,8 @@ class Topic:
     materials: str
     examples: List[str]
     filename: str
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Front-matter
+    sections: List[TopicSection] = field(default_factory=list)  # Top level
 
 
 @dataclass
@@ -23,8 +51,14 @@ class Message:
 
     role: str  # "student" or "tutor"
     content: str
-    canvas_image: Optional[str] = None  # Base64 encoded image
+    canvas_image: Optional[CanvasImage] = None  # PNG (base64 in session files)
+    canvas_thumbnail: Optional[CanvasImage] = None  # Small PNG for the history view
+    canvas_delta: Optional[Dict[str, Any]] = None  # Tiles changed since last drawing
     timestamp: str = ""
+    latency_ms: Optional[float] = None  # AI response time for tutor messages
+    timings: Optional[Dict[str, float]] = None  # Per-stage ms for the turn, if enabled
+    usage: Optional[Dict[str, Any]] = None  # Tokens/payload of the AI call (tutor)
+    content_html: Optional[str] = None  # Sanitized HTML of content, if stored
 
 
 @dataclass
@@ -0,0 +1,28 @@
+"""
+Bounded parallel map shared by the batch jobs (export, statistics rebuild)
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+
+def bounded_map(fn: Callable, items: Iterable, workers: int, window: int) -> Iterator:
+    """Ordered map that keeps at most ``window`` tasks in flight.
+
+    ``Executor.map`` submits the whole iterable up front, which would hold
+    every result of a large store in memory; this keeps memory constant.
+    """
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
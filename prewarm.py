@@ -0,0 +1,160 @@
+"""
+Background pre-warming at server start
+
+On a fresh worker the first student would otherwise pay for parsing the
+topics, listing the saved sessions, importing and configuring the Gemini
+client and generating the first greeting. ``Prewarmer`` runs those steps
+once on a background thread and sets a readiness flag the page can check.
+
+Pre-warming is on when the app is served (LEIA_PREWARM=0 turns it off).
+Pre-generating an opening message per topic costs a model call each and is
+opt-in (LEIA_PREWARM_GREETINGS=1).
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import startup_profile
+from metrics import GREETING_POOL, PREWARM_READY
+from models import Topic
+from tracing import span
+
+
+PREWARM_ENABLED = os.getenv("LEIA_PREWARM", "1") != "0"
+PREWARM_GREETINGS = os.getenv("LEIA_PREWARM_GREETINGS") == "1"
+GREETING_WAIT_SECONDS = 30.0  # How long a new session waits for a running greeting
+
+Step = Tuple[str, Callable[[], object]]
+
+
+class Prewarmer:
+    """Runs named warm-up steps once, in order, on a background thread.
+
+    A failing step is reported and skipped; ``ready`` is set once every step
+    has run, whether or not it succeeded, so nothing waits on it forever.
+    """
+
+    def __init__(self, steps: List[Step], enabled: bool = PREWARM_ENABLED):
+        self.steps = steps
+        self.enabled = enabled
+        self.timings: Dict[str, float] = {}  # step -> ms
+        self.errors: Dict[str, str] = {}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Start warming in the background (once); False when disabled"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.run, name="leia-prewarm", daemon=True
+                )
+                self._thread.start()
+        return True
+
+    def run(self) -> None:
+        """Run every step in the calling thread"""
+        try:
+            for name, step in self.steps:
+                with span(f"prewarm.{name}") as current:
+                    try:
+                        step()
+                    except Exception as e:
+                        print(f"Error pre-warming {name}: {e}")
+                        self.errors[name] = str(e)
+                self.timings[name] = round(current.duration_ms, 1)
+        finally:
+            self._ready.set()
+            PREWARM_READY.set(1)
+            startup_profile.mark("pre-warm finished")
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm (or ``timeout`` seconds); returns ``ready``"""
+        return self._ready.wait(timeout)
+
+
+class GreetingPool:
+    """One pre-generated opening message per topic, replaced when used.
+
+    ``fetch(topic)`` returns ``(text, usage)``, or None if no greeting could
+    be generated (a topic is then not refilled, so a failing or local topic
+    does not keep a worker busy). A greeting is only handed out for the
+    same ``Topic`` it was generated from, so an edited topic file is never
+    greeted with stale content.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Topic], Optional[Tuple[str, object]]],
+        enabled: bool = PREWARM_GREETINGS,
+        workers: int = 2,
+    ):
+        self.fetch = fetch
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=workers) if enabled else None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[Topic, Future]] = {}
+
+    def _schedule(self, topic: Topic) -> None:
+        # Called with the lock held
+        current = self._pending.get(topic.name)
+        if current is not None and current[0] is topic:
+            return
+        if current is not None:
+            current[1].cancel()
+        self._pending[topic.name] = (topic, self._executor.submit(self.fetch, topic))
+        GREETING_POOL.inc(result="scheduled")
+
+    def fill(self, topics: Iterable[Topic]) -> None:
+        """Start generating a greeting for every topic that has none"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for topic in topics:
+                self._schedule(topic)
+
+    def take(self, topic: Topic) -> Optional[Tuple[str, object]]:
+        """Return a pre-generated ``(text, usage)`` for the topic, if any.
+
+        Waits for a greeting that is still being generated (it is already
+        part way through the round trip) and starts its replacement.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._pending.pop(topic.name, None)
+        if entry is None:
+            GREETING_POOL.inc(result="empty")
+            return None
+        if entry[0] is not topic:
+            entry[1].cancel()
+            GREETING_POOL.inc(result="stale")
+            with self._lock:
+                self._schedule(topic)
+            return None
+
+        try:
+            result = entry[1].result(timeout=GREETING_WAIT_SECONDS)
+        except Exception as e:
+            print(f"Error pre-generating greeting: {e}")
+            result = None
+        if result is None:
+            GREETING_POOL.inc(result="failed")
+            return None
+        GREETING_POOL.inc(result="served")
+        with self._lock:
+            self._schedule(topic)
+        return result
@@ -0,0 +1,153 @@
+"""
+Procedural problem generators, declared in topic front-matter::
+
+    ---
+    problem_generator: multiplication
+    operand_range: [11, 99]
+    ---
+
+Generators produce problems with exact solutions locally, so a session can
+start, and move on to the next problem, without asking the model to invent
+one.
+"""
+
+import random
+from dataclasses import dataclass
+from math import gcd
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from models import Problem, Topic
+
+
+@dataclass
+class GeneratedProblem:
+    """A problem statement together with its solution"""
+
+    text: str  # As shown to the student, e.g. "Multiply 24 × 13"
+    problem: Problem
+    solution: str
+
+
+def _range(metadata: Dict[str, Any], key: str, default: Tuple[int, int]):
+    """Inclusive ``[low, high]`` front-matter range"""
+    value = metadata.get(key, default)
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        print(f"Invalid {key} {value!r}, using {list(default)}")
+        return default
+    low, high = int(value[0]), int(value[1])
+    return (low, high) if low <= high else (high, low)
+
+
+class ProblemGenerator:
+    """Base class: subclasses read their parameters from topic metadata"""
+
+    name = ""
+
+    def __init__(self, metadata: Dict[str, Any], rng: Optional[random.Random] = None):
+        self.metadata = metadata
+        self.rng = rng or random.Random()
+
+    def generate_one(self) -> GeneratedProblem:
+        raise NotImplementedError
+
+    def owns(self, problem: Problem) -> bool:
+        """Whether ``problem`` is one this generator could have produced"""
+        raise NotImplementedError
+
+    def generate(self, count: int) -> List[GeneratedProblem]:
+        return [self.generate_one() for _ in range(count)]
+
+
+class MultiplicationGenerator(ProblemGenerator):
+    """``a × b`` with both operands in ``operand_range``.
+
+    Multiples of 10 are skipped: they are too easy as exercises, and are the
+    intermediate steps hints ask about ("what is 23 × 40?").
+    """
+
+    name = "multiplication"
+
+    def __init__(self, metadata, rng=None):
+        super().__init__(metadata, rng)
+        low, high = _range(metadata, "operand_range", (11, 99))
+        self.operands = [n for n in range(low, high + 1) if n % 10] or [low]
+
+    def generate_one(self) -> GeneratedProblem:
+        a, b = self.rng.choice(self.operands), self.rng.choice(self.operands)
+        return GeneratedProblem(
+            text=f"Multiply {a} × {b}",
+            problem=Problem(self.name, (a, b)),
+            solution=f"{a * b:,}",
+        )
+
+    def owns(self, problem: Problem) -> bool:
+        return problem.kind == self.name and all(
+            n in self.operands for n in problem.operands
+        )
+
+
+class SimplifyFractionGenerator(ProblemGenerator):
+    """Proper fractions ``(p·g)/(q·g)`` to reduce to ``p/q``.
+
+    ``denominator_range`` bounds ``q`` (the simplified denominator) and
+    ``gcd_range`` the common factor ``g``.
+    """
+
+    name = "simplify_fraction"
+
+    def __init__(self, metadata, rng=None):
+        super().__init__(metadata, rng)
+        low, high = _range(metadata, "denominator_range", (2, 10))
+        self.reduced = [
+            (p, q)
+            for q in range(max(low, 2), high + 1)
+            for p in range(1, q)
+            if gcd(p, q) == 1
+        ] or [(1, 2)]
+        low, high = _range(metadata, "gcd_range", (2, 6))
+        self.factors = list(range(max(low, 2), high + 1)) or [2]
+
+    def generate_one(self) -> GeneratedProblem:
+        p, q = self.rng.choice(self.reduced)
+        g = self.rng.choice(self.factors)
+        return GeneratedProblem(
+            text=f"Simplify {p * g}/{q * g}",
+            problem=Problem(self.name, (p * g, q * g)),
+            solution=f"{p}/{q}",
+        )
+
+    def owns(self, problem: Problem) -> bool:
+        if problem.kind != self.name:
+            return False
+        n, d = problem.operands
+        g = gcd(n, d)
+        return g in self.factors and (n // g, d // g) in self.reduced
+
+
+_generators: Dict[str, Type[ProblemGenerator]] = {}
+
+
+def register_generator(generator: Type[ProblemGenerator]) -> None:
+    """Make a generator available to topics naming it in their front-matter"""
+    _generators[generator.name] = generator
+
+
+register_generator(MultiplicationGenerator)
+register_generator(SimplifyFractionGenerator)
+
+
+def generator_for(topic: Topic, seed: Any = None) -> Optional[ProblemGenerator]:
+    """The topic's generator; a ``seed`` makes its problems repeatable"""
+    generator = _generators.get(topic.metadata.get("problem_generator", ""))
+    if generator is None:
+        return None
+    return generator(topic.metadata, random.Random(seed) if seed is not None else None)
+
+
+def greeting(topic: Topic, first: GeneratedProblem) -> str:
+    """Opening tutor message for a session that starts on a generated problem"""
+    return (
+        f"Hi Leia! 👋 Let's practice {topic.name}.\n\n"
+        f"Here is your first problem:\n\n**{first.text}**\n\n"
+        f"Take your time. You can type or draw your work!"
+    )
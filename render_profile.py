@@ -0,0 +1,165 @@
+"""
+Render profiler for the Solara UI
+
+With ``LEIA_RENDER_PROFILE=1``, every app component decorated with
+``profiled`` counts its renders and their time (the component's own
+function, not its children), and records what triggered each render: the
+watched reactive variables whose value changed since the component's last
+render, "mount" for the first render, or "parent" when none changed (its
+parent re-rendered, or its own local state changed).
+
+The summary is served at ``/render-profile`` under ``solara run`` (add
+``?reset=1`` to start counting afresh) and printed when the server stops.
+Without the flag, ``profiled`` returns components unchanged.
+"""
+
+import atexit
+import functools
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from metrics import mount_route
+
+
+RENDER_PROFILE = os.getenv("LEIA_RENDER_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_PATH = "/render-profile"
+
+
+@dataclass
+class RenderStats:
+    """Renders of one component"""
+
+    renders: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    triggers: Counter = field(default_factory=Counter)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.renders if self.renders else 0.0
+
+
+class RenderProfiler:
+    """Per-component render counts, times and triggers"""
+
+    def __init__(self, enabled: bool = RENDER_PROFILE):
+        self.enabled = enabled
+        self.stats: Dict[str, RenderStats] = {}
+        self._watched: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, **reactives: Any) -> None:
+        """Name reactive variables so renders can be attributed to them"""
+        self._watched.update(reactives)
+
+    def profiled(self, f: Callable) -> Callable:
+        """Decorator for a component function (under ``@solara.component``)"""
+        if not self.enabled:
+            return f
+        name = f.__name__
+
+        @functools.wraps(f)
+        def render(*args, **kwargs):
+            import solara
+
+            # Watched values as of this component's previous render
+            seen = solara.use_ref(None)
+            values = {key: r.peek() for key, r in self._watched.items()}
+            trigger = self._trigger(seen.current, values)
+            seen.current = values
+
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000, trigger)
+
+        return render
+
+    @staticmethod
+    def _trigger(previous: Optional[Dict[str, Any]], values: Dict[str, Any]) -> str:
+        if previous is None:
+            return "mount"
+        # Identity, not equality: comparing sessions would cost more than
+        # the render being measured
+        changed = [
+            key for key, value in values.items() if previous.get(key) is not value
+        ]
+        return "+".join(changed) if changed else "parent"
+
+    def record(self, component: str, ms: float, trigger: str) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(component, RenderStats())
+            stats.renders += 1
+            stats.total_ms += ms
+            stats.max_ms = max(stats.max_ms, ms)
+            stats.triggers[trigger] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Stats per component, most total render time first"""
+        with self._lock:
+            ordered = sorted(self.stats.items(), key=lambda item: -item[1].total_ms)
+            return {
+                name: {
+                    "renders": stats.renders,
+                    "total_ms": round(stats.total_ms, 2),
+                    "mean_ms": round(stats.mean_ms, 2),
+                    "max_ms": round(stats.max_ms, 2),
+                    "triggers": dict(stats.triggers.most_common()),
+                }
+                for name, stats in ordered
+            }
+
+    def report(self) -> str:
+        """The summary as a text table"""
+        summary = self.summary()
+        if not summary:
+            return "No renders recorded.\n"
+        lines = [
+            f"{'component':<20} {'renders':>7} {'total ms':>9} {'mean ms':>8} "
+            f"{'max ms':>8}  triggers"
+        ]
+        for name, row in summary.items():
+            triggers = ", ".join(f"{key} {n}" for key, n in row["triggers"].items())
+            lines.append(
+                f"{name:<20} {row['renders']:>7} {row['total_ms']:>9.1f} "
+                f"{row['mean_ms']:>8.2f} {row['max_ms']:>8.2f}  {triggers}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+PROFILER = RenderProfiler()
+profiled = PROFILER.profiled
+
+
+def render_profile_endpoint(request):
+    """Starlette endpoint serving the render summary as text"""
+    from starlette.responses import PlainTextResponse
+
+    report = PROFILER.report()
+    if request.query_params.get("reset"):
+        PROFILER.reset()
+    return PlainTextResponse(report)
+
+
+def _print_report() -> None:
+    print("Render profile:\n" + PROFILER.report())
+
+
+def mount_render_profile(app=None) -> bool:
+    """Serve the summary at /render-profile when profiling is enabled"""
+    if not PROFILER.enabled:
+        return False
+    if not mount_route(PROFILE_PATH, render_profile_endpoint, app):
+        return False
+    atexit.unregister(_print_report)  # Once, however often this is called
+    atexit.register(_print_report)
+    return True
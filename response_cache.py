@@ -0,0 +1,153 @@
+"""
+Content-keyed cache for AI responses (LRU + TTL, optionally on disk)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("LEIA_RESPONSE_CACHE_SIZE", "256"))
+DEFAULT_TTL_SECONDS = float(os.getenv("LEIA_RESPONSE_CACHE_TTL", "3600"))
+DEFAULT_CACHE_DIR = os.getenv("LEIA_RESPONSE_CACHE_DIR")  # Unset: memory only
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts (bytes are hashed first)"""
+    normalized = [
+        hashlib.sha256(p).hexdigest() if isinstance(p, (bytes, bytearray)) else p
+        for p in parts
+    ]
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    value: str
+    created_at: float
+    expires_at: float
+    hits: int = 0
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry time to live.
+
+    With ``cache_dir`` set, entries are also written there as JSON files and
+    read back on a memory miss, so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        cache_dir: Optional[Path] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return CacheEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading response cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: CacheEntry) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(key).with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f, ensure_ascii=False)
+            os.replace(tmp, self._path(key))
+        except Exception as e:
+            print(f"Error writing response cache entry {key}: {e}")
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        """Insert as most recently used, evicting the least recently used"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached value for ``key``, or None if missing or expired"""
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                if self.cache_dir is not None:
+                    self._path(key).unlink(missing_ok=True)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        now = self._clock()
+        entry = CacheEntry(
+            value=value, created_at=now, expires_at=now + self.ttl_seconds
+        )
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def entry(self, key: str) -> Optional[CacheEntry]:
+        """The in-memory entry for ``key`` (for inspecting hit counts)"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (files on disk are left alone)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
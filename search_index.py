@@ -0,0 +1,252 @@
+"""
+Full-text search over session conversations (SQLite FTS5)
+"""
+
+import argparse
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from models import Session
+from session_manager import iter_session_refs, read_session_ref
+
+
+INDEX_FILENAME = "_search_index.sqlite3"
+# Around matched words in snippets; plain text, as snippets are shown as is
+SNIPPET_START = "«"
+SNIPPET_END = "»"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_sessions (
+    session_id TEXT PRIMARY KEY,
+    topic_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    indexed_count INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    session_id UNINDEXED,
+    topic_name UNINDEXED,
+    day UNINDEXED,
+    role UNINDEXED,
+    message_index UNINDEXED,
+    tokenize = 'unicode61'
+);
+"""
+
+# Serializes writers within this process; SQLite handles other processes
+_write_lock = threading.Lock()
+_generation = 0  # Bumped on every index write, so callers can drop old results
+
+
+@dataclass
+class SearchHit:
+    """A matching message; pass session_id to load_session to open it"""
+
+    session_id: str
+    topic_name: str
+    created_at: str
+    message_index: int
+    role: str
+    snippet: str
+
+
+def get_index_path(sessions_dir: Path) -> Path:
+    return sessions_dir / INDEX_FILENAME
+
+
+def _connect(sessions_dir: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        get_index_path(sessions_dir), timeout=10, isolation_level=None
+    )
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def _write(conn: sqlite3.Connection) -> Iterator[None]:
+    """Write transaction that takes the database lock before reading.
+
+    ``indexed_count`` is read and then appended after, so two processes
+    saving the same session must not both read the old count.
+    """
+    global _generation
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    _generation += 1
+
+
+def index_generation() -> int:
+    """Changes whenever this process writes to an index"""
+    return _generation
+
+
+def _index_messages(
+    conn: sqlite3.Connection,
+    session_id: str,
+    topic_name: str,
+    created_at: str,
+    messages: List[dict],
+) -> None:
+    """Index the messages not yet indexed for one session (in ``_write``)"""
+    row = conn.execute(
+        "SELECT indexed_count FROM indexed_sessions WHERE session_id = ?",
+        (session_id,),
+    ).fetchone()
+    start = row[0] if row else 0
+
+    if start > len(messages):
+        # The session was rewritten with fewer messages; reindex it
+        conn.execute("DELETE FROM messages_fts WHERE session_id = ?", (session_id,))
+        start = 0
+
+    conn.executemany(
+        "INSERT INTO messages_fts "
+        "(content, session_id, topic_name, day, role, message_index) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (
+                msg.get("content", ""),
+                session_id,
+                topic_name,
+                (msg.get("timestamp") or created_at)[:10],
+                msg.get("role", ""),
+                index,
+            )
+            for index, msg in enumerate(messages[start:], start)
+        ],
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO indexed_sessions "
+        "(session_id, topic_name, created_at, indexed_count) VALUES (?, ?, ?, ?)",
+        (session_id, topic_name, created_at, len(messages)),
+    )
+
+
+def index_session(session: Session, sessions_dir: Path) -> None:
+    """Save hook: add a session's new messages to the search index"""
+    with _write_lock, closing(_connect(sessions_dir)) as conn, _write(conn):
+        _index_messages(
+            conn,
+            session.session_id,
+            session.topic_name,
+            session.created_at,
+            session.messages,
+        )
+
+
+def rebuild_index(sessions_dir: Path) -> int:
+    """Rebuild the index from every stored session; returns sessions indexed"""
+    count = 0
+    with _write_lock, closing(_connect(sessions_dir)) as conn, _write(conn):
+        conn.execute("DELETE FROM messages_fts")
+        conn.execute("DELETE FROM indexed_sessions")
+        for ref in iter_session_refs(sessions_dir):
+            try:
+                data = read_session_ref(ref)
+                _index_messages(
+                    conn,
+                    data.get("session_id") or ref[0],
+                    data["topic_name"],
+                    data["created_at"],
+                    data.get("messages", []),
+                )
+                count += 1
+            except Exception as e:
+                print(f"Error indexing session {ref[0]}: {e}")
+    return count
+
+
+def _to_match_query(query: str) -> str:
+    """Quote each keyword so user input can't break FTS5 query syntax"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return " ".join(terms)
+
+
+def search_sessions(
+    sessions_dir: Path,
+    query: str,
+    topic: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    role: Optional[str] = None,
+    limit: int = 20,
+) -> List[SearchHit]:
+    """Find messages matching all keywords, best matches first.
+
+    Dates are inclusive YYYY-MM-DD bounds on the message day.
+    """
+    match = _to_match_query(query)
+    if not match or not get_index_path(sessions_dir).exists():
+        return []
+
+    sql = (
+        "SELECT f.session_id, f.topic_name, s.created_at, f.message_index, f.role, "
+        "snippet(messages_fts, 0, ?, ?, '…', 12) "
+        "FROM messages_fts AS f "
+        "JOIN indexed_sessions AS s ON s.session_id = f.session_id "
+        "WHERE messages_fts MATCH ?"
+    )
+    params: list = [SNIPPET_START, SNIPPET_END, match]
+    if topic:
+        sql += " AND f.topic_name = ?"
+        params.append(topic)
+    if date_from:
+        sql += " AND f.day >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND f.day <= ?"
+        params.append(date_to)
+    if role:
+        sql += " AND f.role = ?"
+        params.append(role)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+
+    with closing(_connect(sessions_dir)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    return [
+        SearchHit(
+            session_id=row[0],
+            topic_name=row[1],
+            created_at=row[2],
+            message_index=int(row[3]),
+            role=row[4],
+            snippet=row[5],
+        )
+        for row in rows
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: search sessions or rebuild the index"""
+    parser = argparse.ArgumentParser(description="Search tutoring sessions")
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--topic")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        print(f"Indexed {rebuild_index(args.sessions_dir)} session(s)")
+    if args.query:
+        for hit in search_sessions(
+            args.sessions_dir, args.query, args.topic, args.date_from, args.date_to
+        ):
+            print(f"{hit.session_id} [{hit.topic_name}] {hit.role}: {hit.snippet}")
+
+
+if __name__ == "__main__":
+    main()
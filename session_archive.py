@@ -0,0 +1,397 @@
+"""
+Cold-session archival: compression, retention and transparent restore
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+
+ARCHIVE_DIRNAME = "archive"
+INDEX_FILENAME = "_index.json"  # Summaries for list_sessions, by session id
+INDEX_VERSION = 1
+PACK_PREFIX = "sessions_"
+CODEC_SUFFIXES = {"gzip": ".json.gz", "zstd": ".json.zst"}
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+@dataclass
+class ArchiveReport:
+    """Summary of an archival or retention run"""
+
+    archived: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    bytes_before: int = 0  # Size of the hot JSON files that were archived
+    bytes_after: int = 0  # Size of their compressed replacements
+    bytes_deleted: int = 0  # Size of archive entries removed by retention
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after + self.bytes_deleted
+
+    def summary(self) -> str:
+        """Human readable one-line report"""
+        ratio = (self.bytes_after / self.bytes_before) if self.bytes_before else 0.0
+        return (
+            f"Archived {len(self.archived)} session(s) "
+            f"({self.bytes_before:,} -> {self.bytes_after:,} bytes, {ratio:.0%}), "
+            f"deleted {len(self.deleted)} expired session(s) "
+            f"({self.bytes_deleted:,} bytes); "
+            f"reclaimed {self.bytes_reclaimed:,} bytes"
+        )
+
+
+def get_archive_dir(sessions_dir: Path) -> Path:
+    """Directory holding compressed sessions"""
+    return sessions_dir / ARCHIVE_DIRNAME
+
+
+def summarize_session(data: Dict) -> Dict:
+    """The list_sessions entry for a raw session dict"""
+    return {
+        "session_id": data["session_id"],
+        "topic_name": data["topic_name"],
+        "created_at": data["created_at"],
+        "status": data.get("status", "active"),
+        "message_count": len(data.get("messages", [])),
+    }
+
+
+def read_archive_index(sessions_dir: Path) -> Dict[str, Dict]:
+    """Index entries by session id ({} when there is no usable index)"""
+    path = get_archive_dir(sessions_dir) / INDEX_FILENAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error reading archive index: {e}")
+        return {}
+    return data.get("sessions", {}) if data.get("version") == INDEX_VERSION else {}
+
+
+def indexed_summary(
+    index: Dict[str, Dict], session_id: str, path: Path, member: Optional[str]
+) -> Optional[Dict]:
+    """Summary of an archived session, if the index has it at this location"""
+    entry = index.get(session_id)
+    if entry is None or entry["container"] != path.name or entry["member"] != member:
+        return None
+    return dict(entry["summary"])
+
+
+def _index_entry(summary: Dict, path: Path, member: Optional[str]) -> Dict:
+    return {"container": path.name, "member": member, "summary": summary}
+
+
+def update_archive_index(
+    sessions_dir: Path,
+    add: Optional[Dict[str, Dict]] = None,
+    drop: Iterable[str] = (),
+) -> None:
+    """Apply changes to the archive index and fill in any missing entries.
+
+    Archives written before the index existed are read once here, by the
+    archive job, instead of on every listing.
+    """
+    archive_dir = get_archive_dir(sessions_dir)
+    if not archive_dir.exists():
+        return
+    index = read_archive_index(sessions_dir)
+    index.update(add or {})
+    for session_id in drop:
+        index.pop(session_id, None)
+
+    for session_id, path, member in iter_archive_entries(sessions_dir):
+        if indexed_summary(index, session_id, path, member) is not None:
+            continue
+        try:
+            summary = summarize_session(read_archive_entry(path, member))
+        except Exception as e:
+            print(f"Error indexing archived session {session_id}: {e}")
+            continue
+        index[session_id] = _index_entry(summary, path, member)
+
+    path = archive_dir / INDEX_FILENAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "sessions": index}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd codec requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=10).compress(raw)
+    if codec == "gzip":
+        return gzip.compress(raw, compresslevel=9, mtime=0)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def _decompress(name: str, blob: bytes) -> bytes:
+    if name.endswith(CODEC_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise ValueError(f"Cannot read {name}: 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def _session_id_from_name(name: str) -> Optional[str]:
+    for suffix in CODEC_SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def _iter_packs(archive_dir: Path) -> List[Path]:
+    return sorted(archive_dir.glob(f"{PACK_PREFIX}*.zip"))
+
+
+def iter_archive_entries(
+    sessions_dir: Path,
+) -> Iterator[Tuple[str, Path, Optional[str]]]:
+    """Yield (session_id, container path, zip member name or None)"""
+    archive_dir = get_archive_dir(sessions_dir)
+    if not archive_dir.exists():
+        return
+
+    for path in sorted(archive_dir.glob("session_*.json.*")):
+        session_id = _session_id_from_name(path.name)
+        if session_id:
+            yield session_id, path, None
+
+    for pack in _iter_packs(archive_dir):
+        try:
+            with zipfile.ZipFile(pack) as zf:
+                names = zf.namelist()
+        except zipfile.BadZipFile as e:
+            print(f"Error reading archive pack {pack}: {e}")
+            continue
+        for name in names:
+            session_id = _session_id_from_name(name)
+            if session_id:
+                yield session_id, pack, name
+
+
+def read_archive_entry(path: Path, member: Optional[str]) -> Dict:
+    """Decompress one archived session (a file, or a member of a month pack)"""
+    if member is None:
+        blob = path.read_bytes()
+        name = path.name
+    else:
+        with zipfile.ZipFile(path) as zf:
+            blob = zf.read(member)
+        name = member
+    return json.loads(_decompress(name, blob).decode("utf-8"))
+
+
+def read_archived_session(session_id: str, sessions_dir: Path) -> Optional[Dict]:
+    """Return the raw session dict for an archived session, or None"""
+    for entry_id, path, member in iter_archive_entries(sessions_dir):
+        if entry_id == session_id:
+            try:
+                return read_archive_entry(path, member)
+            except Exception as e:
+                print(f"Error reading archived session {session_id}: {e}")
+                return None
+    return None
+
+
+def _rewrite_pack(
+    pack: Path,
+    drop: Optional[set] = None,
+    add: Optional[Dict[str, Tuple[bytes, Tuple[int, ...]]]] = None,
+) -> None:
+    """Rewrite a month pack, dropping and adding members atomically"""
+    drop = drop or set()
+    add = add or {}
+    tmp = pack.with_suffix(".zip.tmp")
+    kept = 0
+
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as out:
+        if pack.exists():
+            with zipfile.ZipFile(pack) as zf:
+                for info in zf.infolist():
+                    if info.filename in drop or info.filename in add:
+                        continue
+                    out.writestr(info, zf.read(info))
+                    kept += 1
+        for name, (blob, date_time) in add.items():
+            out.writestr(zipfile.ZipInfo(name, date_time=date_time), blob)
+            kept += 1
+
+    if kept:
+        os.replace(tmp, pack)
+    else:
+        tmp.unlink()
+        if pack.exists():
+            pack.unlink()
+
+
+def _remove_archived_copies(session_id: str, sessions_dir: Path) -> None:
+    for entry_id, path, member in list(iter_archive_entries(sessions_dir)):
+        if entry_id != session_id:
+            continue
+        if member is None:
+            path.unlink()
+        else:
+            _rewrite_pack(path, drop={member})
+
+
+def archive_cold_sessions(
+    sessions_dir: Path,
+    older_than_days: float = 30,
+    codec: str = "gzip",
+    pack_by_month: bool = False,
+    now: Optional[float] = None,
+) -> ArchiveReport:
+    """Compress sessions whose file has not been modified for N days.
+
+    Archived sessions are re-serialized compactly and compressed with
+    ``codec`` ("gzip" or "zstd"). With ``pack_by_month`` they are stored in
+    ``archive/sessions_YYYY-MM.zip`` by last-modified month, otherwise as one
+    file per session. The hot JSON file is removed once its copy is written.
+    """
+    now = time.time() if now is None else now
+    cutoff = now - older_than_days * SECONDS_PER_DAY
+    suffix = CODEC_SUFFIXES.get(codec)
+    if suffix is None:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    archive_dir = get_archive_dir(sessions_dir)
+    report = ArchiveReport()
+    pending_packs: Dict[Path, Dict[str, Tuple[bytes, Tuple[int, ...]]]] = {}
+    pending_files: List[Path] = []
+    indexed: Dict[str, Dict] = {}
+
+    for json_file in sorted(sessions_dir.glob("session_*.json")):
+        stat = json_file.stat()
+        if stat.st_mtime > cutoff:
+            continue
+
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error reading session {json_file}: {e}")
+            continue
+
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        blob = _compress(raw, codec)
+        session_id = json_file.stem
+
+        archive_dir.mkdir(exist_ok=True)
+        _remove_archived_copies(session_id, sessions_dir)
+
+        if pack_by_month:
+            month = time.strftime("%Y-%m", time.localtime(stat.st_mtime))
+            pack = archive_dir / f"{PACK_PREFIX}{month}.zip"
+            date_time = time.localtime(stat.st_mtime)[:6]
+            pending_packs.setdefault(pack, {})[session_id + suffix] = (
+                blob,
+                date_time,
+            )
+            location = (pack, session_id + suffix)
+        else:
+            target = archive_dir / (session_id + suffix)
+            target.write_bytes(blob)
+            # Keep the original mtime so retention counts from last use
+            os.utime(target, (stat.st_atime, stat.st_mtime))
+            location = (target, None)
+        indexed[session_id] = _index_entry(summarize_session(data), *location)
+
+        report.archived.append(session_id)
+        report.bytes_before += stat.st_size
+        report.bytes_after += len(blob)
+        pending_files.append(json_file)
+
+    for pack, members in pending_packs.items():
+        _rewrite_pack(pack, add=members)
+    update_archive_index(sessions_dir, add=indexed)
+
+    for json_file in pending_files:
+        json_file.unlink()
+
+    return report
+
+
+def apply_retention(
+    sessions_dir: Path, delete_after_days: float, now: Optional[float] = None
+) -> ArchiveReport:
+    """Delete archived sessions last modified more than N days ago"""
+    now = time.time() if now is None else now
+    cutoff = now - delete_after_days * SECONDS_PER_DAY
+    archive_dir = get_archive_dir(sessions_dir)
+    report = ArchiveReport()
+    if not archive_dir.exists():
+        return report
+
+    for path in sorted(archive_dir.glob("session_*.json.*")):
+        session_id = _session_id_from_name(path.name)
+        stat = path.stat()
+        if session_id and stat.st_mtime <= cutoff:
+            report.deleted.append(session_id)
+            report.bytes_deleted += stat.st_size
+            path.unlink()
+
+    for pack in _iter_packs(archive_dir):
+        expired = set()
+        with zipfile.ZipFile(pack) as zf:
+            for info in zf.infolist():
+                session_id = _session_id_from_name(info.filename)
+                if session_id and time.mktime(info.date_time + (0, 0, -1)) <= cutoff:
+                    expired.add(info.filename)
+                    report.deleted.append(session_id)
+                    report.bytes_deleted += info.compress_size
+        if expired:
+            _rewrite_pack(pack, drop=expired)
+
+    update_archive_index(sessions_dir, drop=report.deleted)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: archive cold sessions and apply retention"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--older-than-days", type=float, default=30)
+    parser.add_argument("--codec", choices=sorted(CODEC_SUFFIXES), default="gzip")
+    parser.add_argument("--pack-by-month", action="store_true")
+    parser.add_argument(
+        "--delete-after-days",
+        type=float,
+        default=None,
+        help="Delete archived sessions untouched for this many days",
+    )
+    args = parser.parse_args(argv)
+
+    report = archive_cold_sessions(
+        args.sessions_dir,
+        older_than_days=args.older_than_days,
+        codec=args.codec,
+        pack_by_month=args.pack_by_month,
+    )
+    if args.delete_after_days is not None:
+        retention = apply_retention(args.sessions_dir, args.delete_after_days)
+        report.deleted = retention.deleted
+        report.bytes_deleted = retention.bytes_deleted
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Streaming bulk export of sessions for analytics
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from canvas_images import CanvasImage
+from parallel import bounded_map
+from session_manager import SessionRef, iter_session_refs, read_session_ref
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Columnar formats are optional
+    pyarrow = None
+
+
+FORMATS = ("ndjson", "parquet", "arrow")
+FORMAT_SUFFIXES = {"ndjson": ".ndjson", "parquet": ".parquet", "arrow": ".arrow"}
+
+SESSION_COLUMNS = [
+    ("session_id", "string"),
+    ("topic_name", "string"),
+    ("created_at", "string"),
+    ("status", "string"),
+    ("message_count", "int64"),
+    ("student_turns", "int64"),
+    ("tutor_turns", "int64"),
+    ("image_count", "int64"),
+]
+
+MESSAGE_COLUMNS = [
+    ("session_id", "string"),
+    ("message_index", "int64"),
+    ("role", "string"),
+    ("content", "string"),
+    ("timestamp", "string"),
+    ("has_image", "bool"),
+    ("image_bytes", "int64"),
+    ("image_path", "string"),
+]
+
+Rows = Tuple[Dict, List[Dict]]
+
+
+@dataclass
+class ExportReport:
+    """Summary of an export run"""
+
+    sessions: int = 0
+    messages: int = 0
+    images: int = 0
+    errors: int = 0
+    sessions_path: Optional[Path] = None
+    messages_path: Optional[Path] = None
+
+
+def decode_canvas_image(canvas_image: Union[str, CanvasImage]) -> bytes:
+    """Bytes of a stored canvas image, accepting an optional data-URL prefix"""
+    return bytes(CanvasImage.coerce(canvas_image))
+
+
+def flatten_session(ref: SessionRef, images_dir: Optional[Path] = None) -> Rows:
+    """Turn one stored session into a session row and its message rows.
+
+    When ``images_dir`` is given, canvas images are written there as PNG
+    files and referenced by path; otherwise only their size is exported.
+    """
+    data = read_session_ref(ref)
+    session_id = data.get("session_id") or ref[0]
+    messages = data.get("messages", [])
+
+    message_rows = []
+    for index, msg in enumerate(messages):
+        image_bytes = 0
+        image_path = None
+        canvas_image = msg.get("canvas_image")
+        canvas_delta = msg.get("canvas_delta")
+        raw = None
+        if canvas_image:
+            raw = decode_canvas_image(canvas_image)
+            image_bytes = len(raw)
+        elif canvas_delta:
+            # Stored size is the changed tiles; the export gets the full image
+            if canvas_delta.get("data"):
+                image_bytes = len(decode_canvas_image(canvas_delta["data"]))
+            if images_dir is not None:
+                from canvas_delta import snapshot_png
+
+                raw = snapshot_png(messages, index)
+        if raw is not None and images_dir is not None:
+            path = images_dir / f"{session_id}_{index:04d}.png"
+            path.write_bytes(raw)
+            image_path = str(path)
+        message_rows.append(
+            {
+                "session_id": session_id,
+                "message_index": index,
+                "role": msg.get("role", ""),
+                "content": msg.get("content", ""),
+                "timestamp": msg.get("timestamp", ""),
+                "has_image": bool(canvas_image or canvas_delta),
+                "image_bytes": image_bytes,
+                "image_path": image_path,
+            }
+        )
+
+    session_row = {
+        "session_id": session_id,
+        "topic_name": data.get("topic_name", ""),
+        "created_at": data.get("created_at", ""),
+        "status": data.get("status", "active"),
+        "message_count": len(messages),
+        "student_turns": sum(1 for m in messages if m.get("role") == "student"),
+        "tutor_turns": sum(1 for m in messages if m.get("role") == "tutor"),
+        "image_count": sum(
+            1 for m in messages if m.get("canvas_image") or m.get("canvas_delta")
+        ),
+    }
+    return session_row, message_rows
+
+
+def _safe_flatten(args: Tuple[SessionRef, Optional[Path]]) -> Optional[Rows]:
+    ref, images_dir = args
+    try:
+        return flatten_session(ref, images_dir)
+    except Exception as e:
+        print(f"Error exporting session {ref[0]}: {e}")
+        return None
+
+
+class _NDJSONTable:
+    """Writes one JSON object per line"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Dict]) -> None:
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowTable:
+    """Buffers rows into record batches for Parquet or Arrow IPC output"""
+
+    def __init__(self, path: Path, columns, fmt: str, batch_rows: int = 1024):
+        self.path = path
+        types = {
+            "string": pyarrow.string(),
+            "int64": pyarrow.int64(),
+            "bool": pyarrow.bool_(),
+        }
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(str(path), self.schema)
+        self._rows: List[Dict] = []
+        self._batch_rows = batch_rows
+
+    def write(self, rows: List[Dict]) -> None:
+        self._rows.extend(rows)
+        if len(self._rows) >= self._batch_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        batch = pyarrow.RecordBatch.from_pylist(self._rows, schema=self.schema)
+        self._writer.write_batch(batch)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def _open_table(path: Path, columns, fmt: str):
+    if fmt == "ndjson":
+        return _NDJSONTable(path)
+    if pyarrow is None:
+        raise ValueError(f"The {fmt} format requires the 'pyarrow' package")
+    return _ArrowTable(path, columns, fmt)
+
+
+def export_sessions(
+    sessions_dir: Path,
+    out_dir: Path,
+    fmt: str = "ndjson",
+    export_images: bool = False,
+    workers: int = 1,
+) -> ExportReport:
+    """Stream every session (hot and archived) into sessions/messages tables.
+
+    Sessions are read one at a time, flattened (optionally across a process
+    pool with ``workers`` > 1) and appended to the output tables, so memory
+    use does not grow with the number of sessions.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    images_dir = None
+    if export_images:
+        images_dir = out_dir / "images"
+        images_dir.mkdir(exist_ok=True)
+
+    suffix = FORMAT_SUFFIXES[fmt]
+    report = ExportReport(
+        sessions_path=out_dir / f"sessions{suffix}",
+        messages_path=out_dir / f"messages{suffix}",
+    )
+    sessions_table = _open_table(report.sessions_path, SESSION_COLUMNS, fmt)
+    messages_table = _open_table(report.messages_path, MESSAGE_COLUMNS, fmt)
+
+    try:
+        tasks = ((ref, images_dir) for ref in iter_session_refs(sessions_dir))
+        for result in bounded_map(
+            _safe_flatten, tasks, workers, window=max(1, workers) * 4
+        ):
+            if result is None:
+                report.errors += 1
+                continue
+            session_row, message_rows = result
+            sessions_table.write([session_row])
+            messages_table.write(message_rows)
+            report.sessions += 1
+            report.messages += len(message_rows)
+            report.images += sum(1 for row in message_rows if row["image_path"])
+    finally:
+        sessions_table.close()
+        messages_table.close()
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--images", action="store_true", help="Export PNG files")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    report = export_sessions(
+        args.sessions_dir,
+        args.out_dir,
+        fmt=args.format,
+        export_images=args.images,
+        workers=args.workers,
+    )
+    print(
+        f"Exported {report.sessions} session(s), {report.messages} message(s), "
+        f"{report.images} image(s) to {args.out_dir} ({report.errors} error(s))"
+    )
+
+
+if __name__ == "__main__":
+    main()
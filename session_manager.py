@@ -3,12 +3,46 @@ Session management and storage functionality
 """
 
 import json
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Iterator, Tuple
 from dataclasses import asdict
 from datetime import datetime
 
+from canvas_images import decode_images, to_json_value
 from models import Session
+from session_archive import (
+    indexed_summary,
+    read_archive_index,
+    read_archived_session,
+    iter_archive_entries,
+    read_archive_entry,
+    summarize_session,
+)
+from tracing import span
+
+# (session_id, file path, zip member name or None)
+SessionRef = Tuple[str, Path, Optional[str]]
+
+SaveHook = Callable[[Session, Path], None]
+_save_hooks: List[SaveHook] = []
+
+# list_sessions summaries by (file path, zip member), with the file's
+# (mtime, size) they were read at
+_summary_cache: Dict[Tuple[Path, Optional[str]], Tuple[Tuple[int, int], Dict]] = {}
+_summary_cache_lock = threading.Lock()
+
+
+def register_save_hook(hook: SaveHook) -> None:
+    """Call ``hook(session, sessions_dir)`` after every successful save"""
+    if hook not in _save_hooks:
+        _save_hooks.append(hook)
+
+
+def unregister_save_hook(hook: SaveHook) -> None:
+    """Stop calling a previously registered save hook"""
+    if hook in _save_hooks:
+        _save_hooks.remove(hook)
 
 
 def save_session(session: Session, sessions_dir: Path) -> str:
@@ -17,50 +51,127 @@ def save_session(session: Session, sessions_dir: Path) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         session.session_id = f"session_{timestamp}"
 
+    sessions_dir.mkdir(parents=True, exist_ok=True)
     filepath = sessions_dir / f"{session.session_id}.json"
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(asdict(session), f, indent=2, ensure_ascii=False)
+    with span("session.write", messages=len(session.messages)):
+        with open(filepath, "w", encoding="utf-8") as f:
+            # Canvas images are bytes in memory and base64 only in the file
+            json.dump(
+                asdict(session),
+                f,
+                indent=2,
+                ensure_ascii=False,
+                default=to_json_value,
+            )
+
+    for hook in list(_save_hooks):
+        hook_name = getattr(hook, "__name__", str(hook))
+        try:
+            with span(f"session.hook.{hook_name}"):
+                hook(session, sessions_dir)
+        except Exception as e:
+            print(f"Error in save hook {hook_name}: {e}")
 
     return session.session_id
 
 
+def _session_from_json(data: Dict) -> Session:
+    """Session for a parsed JSON dict, with canvas images decoded to bytes"""
+    decode_images(data.get("messages", []))
+    return Session(**data)
+
+
 def load_session(session_id: str, sessions_dir: Path) -> Optional[Session]:
-    """Load a session from JSON file"""
+    """Load a session from JSON file, falling back to the compressed archive"""
     filepath = sessions_dir / f"{session_id}.json"
 
     if not filepath.exists():
-        return None
+        with span("session.load", archived=True):
+            data = read_archived_session(session_id, sessions_dir)
+            return _session_from_json(data) if data is not None else None
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with span("session.load", archived=False):
+            with open(filepath, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
-        return Session(**data)
+            return _session_from_json(data)
     except Exception as e:
         print(f"Error loading session {session_id}: {e}")
         return None
 
 
+def iter_session_refs(sessions_dir: Path) -> Iterator[SessionRef]:
+    """Yield a reference to every stored session, hot files first.
+
+    References are cheap to create and picklable, so callers can stream
+    through thousands of sessions (or hand them to worker processes) and
+    read each one with ``read_session_ref`` only when needed.
+    """
+    seen = set()
+
+    for json_file in sorted(sessions_dir.glob("session_*.json")):
+        seen.add(json_file.stem)
+        yield json_file.stem, json_file, None
+
+    # A hot file always wins over an older archived copy of the same session
+    for session_id, path, member in iter_archive_entries(sessions_dir):
+        if session_id not in seen:
+            seen.add(session_id)
+            yield session_id, path, member
+
+
+def read_session_ref(ref: SessionRef) -> Dict:
+    """Read the raw session dict behind a reference"""
+    _, path, member = ref
+    if member is None and path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return read_archive_entry(path, member)
+
+
 def list_sessions(sessions_dir: Path) -> List[Dict]:
-    """List all available sessions"""
+    """List all available sessions, including archived ones.
+
+    A session file is only read again once it (or its archive) has changed
+    since it was last listed, and archived sessions are summarized from the
+    archive index instead of being decompressed.
+    """
     sessions = []
 
-    for json_file in sessions_dir.glob("session_*.json"):
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            sessions.append(
-                {
-                    "session_id": data["session_id"],
-                    "topic_name": data["topic_name"],
-                    "created_at": data["created_at"],
-                    "status": data.get("status", "active"),
-                    "message_count": len(data.get("messages", [])),
-                }
-            )
-        except Exception as e:
-            print(f"Error reading session {json_file}: {e}")
+    with span("session.list"):
+        with _summary_cache_lock:
+            cached = dict(_summary_cache)
+        current = {}
+        archive_index = None
+        for ref in iter_session_refs(sessions_dir):
+            session_id, path, member = ref
+            try:
+                stat = path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                entry = cached.get((path, member))
+                if entry is None or entry[0] != signature:
+                    summary = None
+                    if member is not None or path.suffix != ".json":
+                        if archive_index is None:
+                            archive_index = read_archive_index(sessions_dir)
+                        summary = indexed_summary(
+                            archive_index, session_id, path, member
+                        )
+                    if summary is None:
+                        summary = summarize_session(read_session_ref(ref))
+                    entry = (signature, summary)
+                current[(path, member)] = entry
+                sessions.append(dict(entry[1]))
+            except Exception as e:
+                print(f"Error reading session {path}: {e}")
+        with _summary_cache_lock:
+            # Sessions that are gone (or were archived) drop out of the cache
+            stale = [key for key in _summary_cache if sessions_dir in key[0].parents]
+            for key in stale:
+                del _summary_cache[key]
+            _summary_cache.update(current)
 
     # Sort by created_at, newest first
     sessions.sort(key=lambda x: x["created_at"], reverse=True)
@@ -0,0 +1,123 @@
+"""
+Startup-time profiling: import-time breakdown and a startup timeline
+
+Enable with LEIA_STARTUP_PROFILE=1. The report is printed once the first
+page has rendered.
+"""
+
+import builtins
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+ENV_FLAG = "LEIA_STARTUP_PROFILE"
+TIME_TO_FIRST_PAGE_TARGET_MS = 1500.0  # Import of app.py to first Page render
+REPORT_TOP_N = 15
+
+_lock = threading.Lock()
+_original_import = None
+_started_at: Optional[float] = None
+_marks: List[Tuple[str, float]] = []
+_imports: Dict[str, List[float]] = {}  # module -> [inclusive ms, self ms]
+_stack: List[List[float]] = []  # [start, time spent in nested imports]
+_reported = False
+
+
+def is_enabled() -> bool:
+    return os.getenv(ENV_FLAG) == "1"
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Only first-time loads of absolute imports cost anything worth timing
+    if (
+        level
+        or name in sys.modules
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        return _original_import(name, globals, locals, fromlist, level)
+
+    frame = [time.perf_counter(), 0.0]
+    _stack.append(frame)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _stack.pop()
+        inclusive = (time.perf_counter() - frame[0]) * 1000
+        if _stack:
+            _stack[-1][1] += inclusive
+        _imports.setdefault(name, [inclusive, inclusive - frame[1]])
+
+
+def start(force: bool = False) -> bool:
+    """Start recording if LEIA_STARTUP_PROFILE=1 (or ``force``); idempotent"""
+    global _original_import, _started_at
+    if not (force or is_enabled()):
+        return False
+    with _lock:
+        if _original_import is None:
+            _started_at = time.perf_counter()
+            _original_import = builtins.__import__
+            builtins.__import__ = _timed_import
+    return True
+
+
+def stop() -> None:
+    """Stop timing imports (marks recorded so far are kept)"""
+    global _original_import
+    with _lock:
+        if _original_import is not None:
+            builtins.__import__ = _original_import
+            _original_import = None
+
+
+def mark(label: str) -> None:
+    """Record a point on the startup timeline"""
+    if _started_at is not None:
+        _marks.append((label, (time.perf_counter() - _started_at) * 1000))
+
+
+def report() -> str:
+    """Text report: timeline, then the slowest imports by self time"""
+    lines = ["Startup timeline (ms since profiling started):"]
+    for label, at in _marks:
+        lines.append(f"  {at:9.1f}  {label}")
+
+    first_page = next((at for label, at in _marks if label == "first page"), None)
+    if first_page is not None:
+        verdict = "OK" if first_page <= TIME_TO_FIRST_PAGE_TARGET_MS else "OVER TARGET"
+        lines.append(
+            f"Time to first page: {first_page:.1f} ms "
+            f"(target {TIME_TO_FIRST_PAGE_TARGET_MS:.0f} ms) {verdict}"
+        )
+
+    lines.append(f"Slowest imports (top {REPORT_TOP_N} by self time):")
+    lines.append(f"  {'self':>9} {'total':>9}  module")
+    ranked = sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (inclusive, own) in ranked[:REPORT_TOP_N]:
+        lines.append(f"  {own:9.1f} {inclusive:9.1f}  {name}")
+    return "\n".join(lines)
+
+
+def first_page_rendered() -> None:
+    """Mark the first page render and print the report once"""
+    global _reported
+    if _started_at is None or _reported:
+        return
+    _reported = True
+    mark("first page")
+    stop()
+    print(report())
+
+
+def reset() -> None:
+    """Forget everything recorded (used by tests)"""
+    global _started_at, _reported
+    stop()
+    _started_at = None
+    _reported = False
+    _marks.clear()
+    _imports.clear()
+    _stack.clear()
@@ -0,0 +1,307 @@
+"""
+Tests for local answer checking of arithmetic topics
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import ai_service
+import answer_checker
+import metrics
+from answer_checker import (
+    MultiplicationChecker,
+    Problem,
+    SimplifyFractionChecker,
+    check_answer,
+    current_problem,
+    local_feedback,
+    next_example,
+    prompt_note,
+)
+from models import Message, Topic
+
+
+def make_topic(checker: str, examples) -> Topic:
+    return Topic(
+        name="Math",
+        objectives="",
+        materials="Short.",
+        examples=examples,
+        filename="m.md",
+        metadata={"answer_checker": checker},
+    )
+
+
+MULTIPLY = make_topic("multiplication", ["Multiply 24 × 13", "Multiply 25 × 16"])
+FRACTIONS = make_topic("simplify_fraction", ["Simplify 6/8", "Simplify 10/15"])
+
+
+def tutor(content: str) -> Message:
+    return Message(role="tutor", content=content)
+
+
+class TestMultiplicationChecker:
+    """Tests for reading and checking products"""
+
+    def setup_method(self):
+        self.checker = MultiplicationChecker()
+        self.problem = Problem("multiplication", (24, 13))
+
+    def test_finds_problem(self):
+        """Test that the problem is read from tutor text"""
+        problems = self.checker.find_problems("Hi Leia! Can you multiply 24 × 13?")
+
+        assert problems == [self.problem]
+
+    def test_worked_results_are_not_problems(self):
+        """Test that "a × b = c" in a hint is not taken as the problem"""
+        text = "Estimate: 20 × 10 = 200. Now solve 24 x 13!"
+
+        assert self.checker.find_problems(text) == [self.problem]
+
+    def test_correct_answers(self):
+        """Test the answer formats a student might type"""
+        for answer in ("312", "It is 312.", "24 x 13 = 312", "312!"):
+            assert self.checker.check(self.problem, answer).correct, answer
+
+    def test_thousands_separator(self):
+        """Test that 1,035 is read as one number"""
+        result = self.checker.check(Problem("multiplication", (23, 45)), "1,035")
+
+        assert result.correct
+        assert result.expected == "1,035"
+
+    def test_wrong_answer(self):
+        """Test that a wrong product is flagged"""
+        result = self.checker.check(self.problem, "302")
+
+        assert not result.correct
+        assert result.expected == "312"
+
+    def test_ambiguous_answer_unchecked(self):
+        """Test that text with several numbers is left to the tutor"""
+        assert self.checker.check(self.problem, "maybe 302 or 312") is None
+        assert self.checker.check(self.problem, "I don't know") is None
+
+
+class TestSimplifyFractionChecker:
+    """Tests for reading and checking simplified fractions"""
+
+    def setup_method(self):
+        self.checker = SimplifyFractionChecker()
+        self.problem = Problem("simplify_fraction", (6, 8))
+
+    def test_finds_problem(self):
+        """Test both explicit and bare fraction problems"""
+        assert self.checker.find_problems("Simplify 6/8, please!") == [self.problem]
+        assert self.checker.find_problems("What is 6 / 8 in lowest terms?") == [
+            self.problem
+        ]
+
+    def test_worked_results_are_not_problems(self):
+        """Test that fractions around "=" are ignored"""
+        assert self.checker.find_problems("Right, 12/16 = 3/4!") == []
+
+    def test_simplest_form_required(self):
+        """Test that an equal but unsimplified fraction is not accepted"""
+        assert self.checker.check(self.problem, "3/4").correct
+        result = self.checker.check(self.problem, "6/8 = 12/16")
+
+        assert not result.correct
+        assert "simplest form" in result.note
+        assert self.checker.check(self.problem, "3/4").note == ""
+
+    def test_whole_number_answer(self):
+        """Test that 8/4 = 2 is accepted"""
+        result = self.checker.check(Problem("simplify_fraction", (8, 4)), "2")
+
+        assert result.correct
+        assert result.expected == "2"
+
+    def test_whole_number_not_read_as_simplified(self):
+        """Test that "3" is a hint's step, not an answer to simplifying 6/8"""
+        assert self.checker.check(self.problem, "3") is None
+
+    def test_mentioned_fraction_not_assigned(self):
+        """Test that only "Simplify n/d" sets a problem"""
+        text = "What number divides both parts of 6/8?"
+
+        assert self.checker.find_problems(text) == [self.problem]
+        assert self.checker.assigned_problems(text) == []
+
+    def test_wrong_answer(self):
+        """Test that a different value is flagged without a note"""
+        result = self.checker.check(self.problem, "2/3")
+
+        assert not result.correct
+        assert result.note == ""
+
+
+class TestCheckAnswer:
+    """Tests for finding the current problem and the local fast path"""
+
+    def setup_method(self):
+        self.history = [tutor("Hi! Multiply 24 × 13.")]
+
+    def test_problem_found_behind_hint(self):
+        """Test that a hint without the problem still leaves it checkable"""
+        history = self.history + [
+            Message(role="student", content="300"),
+            tutor("Not quite. What is 24 × 3 first?"),
+        ]
+
+        problem = current_problem(MultiplicationChecker(), history)
+
+        assert problem == Problem("multiplication", (24, 3))
+        assert current_problem(MultiplicationChecker(), history[:1]) == Problem(
+            "multiplication", (24, 13)
+        )
+
+    def test_problem_found_behind_encouragement(self):
+        """Test that a message asking nothing new keeps the problem checkable"""
+        history = self.history + [
+            Message(role="student", content="300"),
+            tutor("Not quite, try again. You can do it!"),
+        ]
+
+        assert current_problem(MultiplicationChecker(), history) == Problem(
+            "multiplication", (24, 13)
+        )
+
+    def test_sub_question_not_checked_against_problem(self):
+        """Test that answering a hint's own question gets no verdict"""
+        history = [
+            tutor("Multiply 24 × 13"),
+            Message(role="student", content="?"),
+            tutor("Let's break it up. What is 4 + 20?"),
+        ]
+
+        assert check_answer(MULTIPLY, history, "24") is None
+        assert prompt_note(check_answer(MULTIPLY, history, "24")) == ""
+
+    def test_fraction_sub_question_not_checked(self):
+        """Test that a divisor question is not checked against the fraction"""
+        history = [
+            tutor("Simplify 6/8"),
+            Message(role="student", content="3/4?"),
+            tutor("What is the biggest number that divides both 6 and 8?"),
+        ]
+
+        assert check_answer(FRACTIONS, history, "2") is None
+        assert prompt_note(check_answer(FRACTIONS, history, "2")) == ""
+
+    @pytest.mark.parametrize(
+        "hint, answer",
+        [
+            ("What number divides both parts of 6/8?", "2"),
+            ("What is 6 ÷ 2 in 6/8?", "3"),
+            ("Divide both parts by 2.", "3"),
+        ],
+    )
+    def test_fraction_in_hint_not_checked(self, hint, answer):
+        """Test that a fraction mentioned by a hint is not taken as the problem"""
+        history = [
+            tutor("Simplify 6/8"),
+            Message(role="student", content="I don't know"),
+            tutor(hint),
+        ]
+
+        assert check_answer(FRACTIONS, history, answer) is None
+
+    def test_hint_asking_to_simplify_checked(self):
+        """Test that an explicit "Simplify n/d" question is still checked"""
+        history = [tutor("Let's try another. Can you simplify 10/15?")]
+
+        assert check_answer(FRACTIONS, history, "2/3").correct
+        assert not check_answer(FRACTIONS, history, "10/15").correct
+
+    def test_several_problems_ambiguous(self):
+        """Test that a message with two problems is not guessed at"""
+        history = [tutor("Try 24 × 13 or 25 × 16!")]
+
+        assert current_problem(MultiplicationChecker(), history) is None
+
+    def test_topics_without_checker(self):
+        """Test that topics must opt in"""
+        topic = make_topic("", [])
+
+        assert check_answer(topic, self.history, "312") is None
+
+    def test_off_mode(self, monkeypatch):
+        """Test that LEIA_LOCAL_CHECK=off disables checking"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", "off")
+
+        assert check_answer(MULTIPLY, self.history, "312") is None
+
+    def test_answer_mode_serves_correct_answer(self, monkeypatch):
+        """Test templated feedback offering the next unused example"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", "answer")
+        before = metrics.LOCAL_ANSWERS.value()
+
+        result = check_answer(MULTIPLY, self.history, "312")
+        feedback = local_feedback(MULTIPLY, self.history, result)
+
+        assert "24 × 13 = 312" in feedback
+        assert "Multiply 25 × 16" in feedback
+        assert metrics.LOCAL_ANSWERS.value() == before + 1
+
+    def test_wrong_answers_go_to_tutor(self, monkeypatch):
+        """Test that wrong answers still get a real hint"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", "answer")
+        result = check_answer(MULTIPLY, self.history, "302")
+
+        assert local_feedback(MULTIPLY, self.history, result) is None
+
+    @pytest.mark.parametrize("mode", ["verify", "answer"])
+    def test_intermediate_step_goes_to_tutor(self, monkeypatch, mode):
+        """Test that a hint's sub-step gets no verdict and skips no problem"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", mode)
+        history = self.history + [
+            Message(role="student", content="300"),
+            tutor("Not quite. What is 24 × 3 first?"),
+        ]
+        result = check_answer(MULTIPLY, history, "71")
+
+        assert result is None
+        assert prompt_note(result) == ""
+        assert local_feedback(MULTIPLY, history, result) is None
+
+    def test_verify_mode_never_answers(self, monkeypatch):
+        """Test that the default mode only verifies"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", "verify")
+        result = check_answer(MULTIPLY, self.history, "312")
+
+        assert result.correct
+        assert local_feedback(MULTIPLY, self.history, result) is None
+
+    def test_next_example_skips_asked(self):
+        """Test that examples already asked are not offered again"""
+        history = [tutor("Simplify 6/8"), tutor("Now simplify 10/15")]
+
+        assert next_example(FRACTIONS, history[:1]) == "Simplify 10/15"
+        assert next_example(FRACTIONS, history) is None
+
+
+def test_verdict_sent_to_model(monkeypatch):
+    """Test that get_ai_feedback includes the verified verdict in the prompt"""
+    ai_service.response_cache.clear()
+    prompts = []
+
+    def generate_content(contents):
+        prompts.append(contents)
+        return SimpleNamespace(text="Close! Check the ones digit.", usage_metadata=None)
+
+    model = SimpleNamespace(generate_content=generate_content)
+    monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+    history = [tutor("Multiply 24 × 13")]
+    usage = ai_service.CallUsage()
+
+    verified = check_answer(MULTIPLY, history, "302")
+    ai_service.get_ai_feedback(
+        MULTIPLY, history, "302", None, "key", usage=usage, verified=verified
+    )
+
+    assert "is NOT correct" in prompts[0]
+    assert "The correct answer is 312" in prompts[0]
+    assert usage.local_check == "incorrect"
@@ -0,0 +1,249 @@
+"""
+Tests that reactive state changes re-render only the components that show it
+"""
+
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+solara = pytest.importorskip("solara")
+pytest.importorskip("dotenv")
+v = pytest.importorskip("ipyvuetify")
+
+import app  # noqa: E402
+from ai_service import CallUsage  # noqa: E402
+from models import Session  # noqa: E402
+from session_manager import save_session  # noqa: E402
+from prewarm import Prewarmer  # noqa: E402
+
+
+ANSWER_LABEL = "Type your answer or question here..."
+COMPONENTS = (
+    "SessionControls",
+    "TopicSelect",
+    "NewSessionButton",
+    "StatusMessage",
+    "PreviousSessions",
+    "ConversationSearch",
+    "ChatHistory",
+    "ChatMessage",
+    "StudentInputArea",
+    "AnswerInput",
+    "AnswerButtons",
+)
+
+
+@solara.component
+def Tutor():
+    """The page without the canvas (ipycanvas needs a browser)"""
+    app.SessionControls()
+    app.ChatHistory()
+    app.StudentInputArea()
+
+
+class TestRenderIsolation:
+    """Tests for which components re-render on each state change"""
+
+    def setup_method(self):
+        """Use an empty sessions directory and fresh state"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.rc = None
+        app.student_input.value = ""
+        app.status_message.value = ""
+        app.is_loading.value = False
+        app.current_session.value = None
+
+    def teardown_method(self):
+        """Unmount the page and clean up temporary directory"""
+        if self.rc is not None:
+            self.rc.close()
+        shutil.rmtree(self.temp_dir)
+
+    def render(self, monkeypatch) -> Counter:
+        """Render the page, counting renders per component from now on"""
+        monkeypatch.setattr(app, "SESSIONS_DIR", Path(self.temp_dir))
+        counts = Counter()
+        for name in COMPONENTS + ("InputText",):
+            component = getattr(solara if name == "InputText" else app, name)
+
+            def counted(*args, _f=component.f, _name=name, **kwargs):
+                counts[_name] += 1
+                return _f(*args, **kwargs)
+
+            monkeypatch.setattr(component, "f", counted)
+        _, self.rc = solara.render(Tutor(), handle_error=False)
+        counts.clear()
+        return counts
+
+    def type_answer(self, text: str):
+        self.rc.find(v.TextField, label=ANSWER_LABEL).widget.v_model = text
+
+    def test_typing_renders_only_the_input(self, monkeypatch):
+        """Test that a keystroke re-renders the text field and nothing else"""
+        counts = self.render(monkeypatch)
+
+        self.type_answer("4")
+
+        assert app.student_input.value == "4"
+        assert counts == {"InputText": 1}
+
+    def test_status_renders_only_the_message(self, monkeypatch):
+        """Test that status updates do not rescan topics or sessions"""
+        counts = self.render(monkeypatch)
+
+        app.status_message.value = "Getting feedback from AI tutor..."
+
+        assert counts == {"StatusMessage": 1}
+
+    def test_loading_renders_only_buttons(self, monkeypatch):
+        """Test that the loading flag re-renders just the buttons it disables"""
+        counts = self.render(monkeypatch)
+
+        app.is_loading.value = True
+
+        assert counts == {"NewSessionButton": 1, "AnswerButtons": 1}
+
+    def test_debounced_typing(self, monkeypatch):
+        """Test that debounced typing stores the answer once flushed"""
+        monkeypatch.setattr(app, "INPUT_DEBOUNCE_MS", 60_000)
+        counts = self.render(monkeypatch)
+
+        for text in ("4", "42", "420"):
+            self.type_answer(text)
+
+        assert app.student_input.value == ""
+        assert counts == {"InputText": 3}
+        self.rc.find(v.Btn, children=["✅ Submit Answer"]).widget.click()
+        # Flushed before submitting (which needs a session, so stops there)
+        assert app.status_message.value == "Please start a session first!"
+        assert app.student_input.value == "420"
+
+    def test_new_message_renders_only_itself(self, monkeypatch):
+        """Test that history render work does not grow with the session"""
+        messages = [
+            {"role": "tutor", "content": f"**Step {i}:** explain"} for i in range(20)
+        ]
+        app.current_session.value = Session("Math", messages, "2024-01-01T10:00:00")
+        counts = self.render(monkeypatch)
+
+        app.current_session.value = Session(
+            "Math",
+            messages + [{"role": "student", "content": "42"}],
+            "2024-01-01T10:00:00",
+        )
+
+        assert counts["ChatHistory"] == 1
+        assert counts["ChatMessage"] == 1
+
+    def test_search_results_follow_saves(self, monkeypatch):
+        """Test that a shown search picks up sessions saved after it ran"""
+        self.render(monkeypatch)
+        field = self.rc.find(v.TextField, label="🔍 Search conversations")
+        field.widget.v_model = "pizza"
+        field.widget.fire_event("keyup.enter", None)
+        self.rc.find(children=["No matches found."]).assert_single()
+
+        # Results are filtered by the selected topic
+        session = Session(
+            app.selected_topic.value or "Math",
+            [{"role": "student", "content": "Half a pizza"}],
+            "2024-01-01T10:00:00",
+            session_id="session_20240101_100000",
+        )
+        save_session(session, Path(self.temp_dir))
+        app.current_session.value = session
+
+        labels = [w.children[0] for w in self.rc.find(v.Btn).widgets]
+        assert "📖 2024-01-01 - Half a «pizza»" in labels
+
+
+class TestWarmupNotice:
+    """Tests for the notice shown while the server warms up"""
+
+    def test_shown_until_ready(self, monkeypatch):
+        """Test that the notice goes away once the pre-warm has finished"""
+        release = threading.Event()
+        prewarmer = Prewarmer([("slow", release.wait)], enabled=True)
+        monkeypatch.setattr(app, "prewarmer", prewarmer)
+        prewarmer.start()
+
+        _, rc = solara.render(app.WarmupNotice(), handle_error=False)
+        try:
+            rc.find(v.Alert).assert_not_empty()
+            release.set()
+            deadline = time.monotonic() + 5
+            while rc.find(v.Alert).widgets and time.monotonic() < deadline:
+                time.sleep(0.01)
+            rc.find(v.Alert).assert_empty()
+        finally:
+            release.set()
+            rc.close()
+
+    def test_hidden_when_not_started(self):
+        """Test that nothing is shown when pre-warming is off"""
+        _, rc = solara.render(app.WarmupNotice(), handle_error=False)
+        try:
+            rc.find(v.Alert).assert_empty()
+        finally:
+            rc.close()
+
+
+class TestModelLatency:
+    """Tests for which tutor turns record an AI latency"""
+
+    def test_only_turns_that_waited_on_gemini(self):
+        """Test that local, cached and prefetched turns store no latency"""
+        assert app.model_latency(CallUsage(model_latency_ms=900.0), 950.0) == 950.0
+        assert app.model_latency(CallUsage(coalesced=True), 700.0) == 700.0
+        for usage in (
+            CallUsage(model="local", served_locally=True),
+            CallUsage(cache_hit=True),
+            CallUsage(model_latency_ms=900.0, prefetched=True),
+        ):
+            assert app.model_latency(usage, 3.0) is None
+
+
+class TestHelpWithDrawing:
+    """Tests for serving prefetched hints only without a drawing"""
+
+    def setup_method(self):
+        self.np = pytest.importorskip("numpy")
+        self.taken = []
+        self.submitted = []
+
+    def ask(self, monkeypatch, pixels):
+        canvas = SimpleNamespace(get_image_data=lambda: pixels)
+        monkeypatch.setattr(app.drawing_canvas, "value", canvas)
+        monkeypatch.setattr(
+            app.current_session, "value", Session("Math", [], "2024-01-01T10:00:00")
+        )
+        monkeypatch.setattr(
+            app.hint_prefetcher, "take", lambda s: self.taken.append(s) or ("Hi", None)
+        )
+        monkeypatch.setattr(
+            app, "submit_answer", lambda **kw: self.submitted.append(kw["prefetched"])
+        )
+        app.ask_for_help()
+
+    def test_blank_canvas_uses_prefetched_hint(self, monkeypatch):
+        """Test that a hint prefetched for the conversation is served"""
+        self.ask(monkeypatch, self.np.full((5, 5, 4), 255, dtype=self.np.uint8))
+
+        assert len(self.taken) == 1
+        assert self.submitted == [("Hi", None)]
+
+    def test_drawing_skips_prefetched_hint(self, monkeypatch):
+        """Test that a drawing is sent to the model instead"""
+        pixels = self.np.full((5, 5, 4), 255, dtype=self.np.uint8)
+        pixels[2, 2, :3] = 0
+
+        self.ask(monkeypatch, pixels)
+
+        assert self.taken == []
+        assert self.submitted == [None]
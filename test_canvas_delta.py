@@ -0,0 +1,211 @@
+"""
+Tests for delta-compressed canvas snapshots
+"""
+
+import base64
+import json
+from io import BytesIO
+from pathlib import Path
+import shutil
+import tempfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+import canvas_delta  # noqa: E402
+from canvas_delta import (  # noqa: E402
+    TILE,
+    apply_delta,
+    changed_tiles,
+    encode_snapshot,
+    iter_snapshots,
+    make_delta,
+    snapshot_array,
+    snapshot_png,
+)
+from canvas_images import (  # noqa: E402
+    CanvasImage,
+    encode_png,
+    quantize_canvas,
+    to_json_value,
+)
+from session_export import export_sessions  # noqa: E402
+
+
+WIDTH, HEIGHT = 700, 500  # Not whole tiles, like the app's canvas
+
+
+def blank() -> "np.ndarray":
+    return np.full((HEIGHT, WIDTH), 255, dtype=np.uint8)
+
+
+def submit(messages, pixels):
+    """Store a snapshot the way submit_answer does and add the turn"""
+    image = quantize_canvas(Image.fromarray(pixels))
+    keyframe = CanvasImage(encode_png(image), image)
+    canvas_image, delta = encode_snapshot(messages, image, keyframe)
+    messages.append(
+        {
+            "role": "student",
+            "content": "(see canvas)",
+            "canvas_image": canvas_image,
+            "canvas_delta": delta,
+        }
+    )
+    messages.append({"role": "tutor", "content": "Nice!"})
+
+
+def drawing_steps(count):
+    """Snapshots of a drawing that grows by one stroke per submission"""
+    pixels = blank()
+    # Earlier work in the lower half, so a full image is not trivially small
+    scribble = np.random.default_rng(0).random((HEIGHT // 2, WIDTH)) < 0.02
+    pixels[HEIGHT // 2 :][scribble] = 0
+    steps = []
+    for i in range(count):
+        pixels = pixels.copy()
+        pixels[40 + i * 20 : 44 + i * 20, 30 : 30 + 10 * (i + 1)] = 0
+        steps.append(pixels)
+    return steps
+
+
+class TestTiles:
+    """Tests for tile comparison and reconstruction"""
+
+    def test_changed_tiles(self):
+        """Test that only the tiles touched by a stroke are found"""
+        current = blank()
+        current[40:44, 30:70] = 0
+        current[HEIGHT - 1, WIDTH - 1] = 0  # In the padded edge tile
+
+        tiles = changed_tiles(blank(), current).tolist()
+
+        assert tiles == [[1, 0], [1, 1], [1, 2], [HEIGHT // TILE, WIDTH // TILE]]
+
+    def test_round_trip(self):
+        """Test that applying a delta gives back the exact snapshot"""
+        current = blank()
+        current[100:300, 200:210] = 0
+
+        delta = make_delta(blank(), current)
+
+        assert np.array_equal(apply_delta(blank(), delta), current)
+
+    def test_unchanged_snapshot(self):
+        """Test that a resubmitted drawing stores no tiles"""
+        delta = make_delta(blank(), blank())
+
+        assert delta["tiles"] == [] and delta["data"] is None
+        assert np.array_equal(apply_delta(blank(), delta), blank())
+
+    def test_rgb_snapshots(self):
+        """Test that full colour drawings are diffed too"""
+        previous = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        current = previous.copy()
+        current[5, 5] = (255, 0, 0)
+
+        delta = make_delta(previous, current)
+
+        assert delta["tiles"] == [[0, 0]]
+        assert np.array_equal(apply_delta(previous, delta), current)
+
+
+class TestSessionSnapshots:
+    """Tests for keyframes, deltas and replay within a session"""
+
+    def test_first_snapshot_is_keyframe(self):
+        """Test that a session starts with a complete image"""
+        messages = []
+        submit(messages, drawing_steps(1)[0])
+
+        assert messages[0]["canvas_image"]
+        assert messages[0]["canvas_delta"] is None
+
+    def test_replay_matches_every_snapshot(self):
+        """Test that the timeline replay rebuilds each submission exactly"""
+        steps = drawing_steps(6)
+        messages = []
+        for pixels in steps:
+            submit(messages, pixels)
+
+        replayed = list(iter_snapshots(messages))
+
+        assert [index for index, _ in replayed] == [0, 2, 4, 6, 8, 10]
+        for (_, pixels), expected in zip(replayed, steps):
+            assert np.array_equal(pixels, expected)
+
+    def test_keyframe_interval(self, monkeypatch):
+        """Test that a complete image is stored periodically"""
+        monkeypatch.setattr(canvas_delta, "KEYFRAME_INTERVAL", 3)
+        messages = []
+        for pixels in drawing_steps(7):
+            submit(messages, pixels)
+
+        keyframes = [bool(m["canvas_image"]) for m in messages[::2]]
+
+        assert keyframes == [True, False, False, True, False, False, True]
+
+    def test_deltas_are_smaller(self):
+        """Test that a growing drawing takes less space than full images"""
+        steps = drawing_steps(8)
+        messages = []
+        for pixels in steps:
+            submit(messages, pixels)
+
+        stored = len(json.dumps(messages, default=to_json_value))
+        full = sum(
+            len(base64.b64encode(encode_png(quantize_canvas(Image.fromarray(p)))))
+            for p in steps
+        )
+
+        assert stored < full / 4
+
+    def test_snapshot_png(self):
+        """Test that a single delta snapshot can be shown as a full PNG"""
+        steps = drawing_steps(3)
+        messages = []
+        for pixels in steps:
+            submit(messages, pixels)
+
+        image = Image.open(BytesIO(snapshot_png(messages, 4)))
+
+        assert np.array_equal(snapshot_array(image), steps[2])
+
+
+class TestDeltaExport:
+    """Tests that exports write complete images for delta snapshots"""
+
+    def setup_method(self):
+        """Create temporary directories"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """Clean up temporary directories"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_export_rebuilds_images(self):
+        """Test that exported PNGs are full snapshots"""
+        sessions_dir = self.temp_dir / "sessions"
+        sessions_dir.mkdir()
+        steps = drawing_steps(2)
+        messages = []
+        for pixels in steps:
+            submit(messages, pixels)
+        session = {
+            "session_id": "session_20240101_100000",
+            "topic_name": "Math",
+            "created_at": "2024-01-01T10:00:00",
+            "messages": messages,
+        }
+        (sessions_dir / "session_20240101_100000.json").write_text(
+            json.dumps(session, default=to_json_value)
+        )
+
+        export_sessions(sessions_dir, self.temp_dir / "out", export_images=True)
+
+        exported = sorted((self.temp_dir / "out").rglob("*.png"))
+        assert len(exported) == 2
+        last = Image.open(exported[-1])
+        assert np.array_equal(snapshot_array(last), steps[1])
@@ -0,0 +1,163 @@
+"""
+Tests for canvas image encoding and thumbnails
+"""
+
+import base64
+import copy
+from io import BytesIO
+
+import pytest
+
+from canvas_images import (
+    THUMBNAIL_WIDTH,
+    CanvasImage,
+    decode_images,
+    encode_png,
+    has_ink,
+    make_thumbnail,
+    quantize_canvas,
+)
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def make_drawing(width: int = 700, height: int = 500):
+    """White canvas with a few black pen strokes"""
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(10):
+        draw.line([(20 + i * 60, 30), (60 + i * 50, height - 30)], "black", 4)
+    return image
+
+
+def png_size(image) -> int:
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.tell()
+
+
+def test_has_ink():
+    """Test telling a drawing from the blank white canvas"""
+    np = pytest.importorskip("numpy")
+    blank = np.full((50, 70, 4), 255, dtype=np.uint8)
+    drawn = np.asarray(make_drawing(70, 50).convert("RGBA"))
+
+    assert not has_ink(blank)
+    assert has_ink(drawn)
+    assert not has_ink(None)
+
+
+class TestThumbnail:
+    """Tests for make_thumbnail"""
+
+    def test_resized_to_history_width(self):
+        """Test that the thumbnail keeps the aspect ratio at 300px wide"""
+        thumbnail = Image.open(BytesIO(make_thumbnail(make_drawing())))
+
+        assert thumbnail.size == (THUMBNAIL_WIDTH, 214)
+        assert thumbnail.mode == "P"
+
+    def test_smaller_than_full_image(self):
+        """Test that the thumbnail is a fraction of the full PNG"""
+        drawing = make_drawing()
+
+        assert len(make_thumbnail(drawing)) < png_size(drawing) / 2
+
+    def test_strokes_survive(self):
+        """Test that pen strokes are still visible after quantizing"""
+        thumbnail = Image.open(BytesIO(make_thumbnail(make_drawing())))
+
+        assert thumbnail.convert("L").getextrema()[0] < 64
+
+    def test_small_images_not_thumbnailed(self):
+        """Test that images already small enough are shown as they are"""
+        assert make_thumbnail(make_drawing(THUMBNAIL_WIDTH, 200)) is None
+
+
+class TestQuantize:
+    """Tests for the stored canvas encoding"""
+
+    def test_one_bit_by_default(self):
+        """Test that the default encoding is a 1-bit PNG of the strokes"""
+        drawing = make_drawing()
+        stored = Image.open(BytesIO(encode_png(quantize_canvas(drawing))))
+
+        assert stored.mode == "1"
+        assert stored.size == drawing.size
+        assert stored.convert("L").getextrema() == (0, 255)
+
+    def test_smaller_than_rgb_png(self):
+        """Test that quantizing shrinks the stored image"""
+        drawing = make_drawing()
+
+        assert len(encode_png(quantize_canvas(drawing))) < png_size(drawing) / 2
+
+    def test_grey_palette(self):
+        """Test that other colour counts give an evenly spaced grey palette"""
+        grey = Image.new("RGB", (4, 1))
+        grey.putdata([(0, 0, 0), (90, 90, 90), (170, 170, 170), (255, 255, 255)])
+
+        quantized = quantize_canvas(grey, 4)
+
+        assert quantized.mode == "P"
+        assert quantized.convert("L").tobytes() == bytes([0, 85, 170, 255])
+
+    def test_zero_keeps_image(self):
+        """Test that 0 colours disables quantizing"""
+        drawing = make_drawing()
+
+        assert quantize_canvas(drawing, 0) is drawing
+
+
+class TestCanvasImage:
+    """Tests for the in-memory canvas image value"""
+
+    def test_json_round_trip(self):
+        """Test that base64 is only the stored form of the bytes"""
+        png = encode_png(quantize_canvas(make_drawing()))
+        stored = CanvasImage(png).to_json()
+
+        assert stored == base64.b64encode(png).decode("ascii")
+        assert CanvasImage.from_json(stored).data == png
+        assert CanvasImage.from_json(f"data:image/png;base64,{stored}").data == png
+
+    def test_image_decoded_once(self):
+        """Test that the PIL image is decoded lazily and kept"""
+        image = CanvasImage(encode_png(make_drawing()))
+
+        assert image._image is None
+        assert image.image.size == (700, 500)
+        assert image.image is image.image
+
+    def test_copies_share_bytes(self):
+        """Test that copying a message does not copy its image"""
+        image = CanvasImage(encode_png(make_drawing()))
+        message = {"canvas_image": image}
+
+        assert copy.deepcopy(message)["canvas_image"] is image
+
+    def test_decode_images(self):
+        """Test that loaded messages get CanvasImages in every image field"""
+        png = encode_png(make_drawing())
+        stored = base64.b64encode(png).decode("ascii")
+        messages = [
+            {"role": "tutor", "content": "Hi", "canvas_image": None},
+            {"canvas_image": stored, "canvas_thumbnail": stored},
+            {"canvas_image": None, "canvas_delta": {"tiles": [], "data": None}},
+            {"canvas_delta": {"tiles": [[0, 0]], "data": stored}},
+        ]
+
+        decode_images(messages)
+
+        assert messages[0]["canvas_image"] is None
+        assert messages[1]["canvas_image"] == CanvasImage(png)
+        assert messages[1]["canvas_thumbnail"] == CanvasImage(png)
+        assert messages[2]["canvas_delta"]["data"] is None
+        assert messages[3]["canvas_delta"]["data"] == CanvasImage(png)
+
+    def test_coerce_empty(self):
+        """Test that missing images stay missing"""
+        assert CanvasImage.coerce(None) is None
+        assert CanvasImage.coerce("") is None
+        assert CanvasImage.coerce(b"png") == CanvasImage(b"png")
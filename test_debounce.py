@@ -0,0 +1,51 @@
+"""
+Tests for debounced calls
+"""
+
+import threading
+
+from debounce import Debouncer
+
+
+class TestDebouncer:
+    """Tests for Debouncer"""
+
+    def setup_method(self):
+        """Record the calls made"""
+        self.calls = []
+        self.called = threading.Event()
+
+    def record(self, value):
+        self.calls.append(value)
+        self.called.set()
+
+    def test_burst_makes_one_call(self):
+        """Test that only the last of a burst of calls is made"""
+        debouncer = Debouncer(0.05, self.record)
+
+        for text in ("4", "42", "420"):
+            debouncer(text)
+
+        assert self.called.wait(2)
+        assert self.calls == ["420"]
+        assert not debouncer.pending
+
+    def test_flush(self):
+        """Test that a pending call can be made straight away"""
+        debouncer = Debouncer(60, self.record)
+        debouncer("4")
+
+        debouncer.flush()
+        debouncer.flush()  # Nothing pending any more
+
+        assert self.calls == ["4"]
+
+    def test_cancel(self):
+        """Test that a cancelled call is never made"""
+        debouncer = Debouncer(0.01, self.record)
+        debouncer("4")
+
+        debouncer.cancel()
+
+        assert not self.called.wait(0.1)
+        assert self.calls == []
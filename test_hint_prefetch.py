@@ -0,0 +1,168 @@
+"""
+Tests for speculative hint prefetching
+"""
+
+import threading
+from types import SimpleNamespace
+
+import ai_service
+import hint_prefetch
+from hint_prefetch import HintPrefetcher, session_state_key
+from models import Session, Topic, HELP_REQUEST_TEXT
+
+
+TOPIC = Topic(
+    name="Math", objectives="", materials="Short.", examples=[], filename="m.md"
+)
+
+
+def make_session(*contents: str) -> Session:
+    """Session whose messages alternate tutor / student, starting with tutor"""
+    return Session(
+        topic_name="Math",
+        messages=[
+            {"role": "tutor" if i % 2 == 0 else "student", "content": c}
+            for i, c in enumerate(contents)
+        ],
+        created_at="2024-01-01T10:00:00",
+        session_id="session_20240101_100000",
+    )
+
+
+class FakeFetch:
+    """Counts prefetch calls; each returns a numbered hint"""
+
+    def __init__(self, result=True):
+        self.calls = 0
+        self.histories = []
+        self.result = result
+        self._lock = threading.Lock()
+
+    def __call__(self, topic, history):
+        with self._lock:
+            self.calls += 1
+            self.histories.append(history)
+            number = self.calls
+        return (f"Hint {number}", {"prefetched": True}) if self.result else None
+
+
+class TestHintPrefetcher:
+    """Tests for scheduling, matching and budgets"""
+
+    def test_served_when_state_matches(self):
+        """Test that the hint for the current problem is handed out"""
+        fetch = FakeFetch()
+        prefetcher = HintPrefetcher(fetch, enabled=True)
+        session = make_session("What is 6 x 7?")
+
+        assert prefetcher.schedule(session, TOPIC)
+        hint = prefetcher.take(session)
+
+        assert hint == ("Hint 1", {"prefetched": True})
+        assert fetch.histories[0][-1].content == "What is 6 x 7?"
+        # A hint is handed out only once
+        assert prefetcher.take(session) is None
+
+    def test_discarded_when_state_moved_on(self):
+        """Test that a hint for an older problem is not served"""
+        prefetcher = HintPrefetcher(FakeFetch(), enabled=True)
+        prefetcher.schedule(make_session("What is 6 x 7?"), TOPIC)
+
+        moved_on = make_session("What is 6 x 7?", "42", "Great! What is 8 x 9?")
+
+        assert prefetcher.take(moved_on) is None
+
+    def test_same_state_scheduled_once(self):
+        """Test that re-scheduling an unchanged state makes no new call"""
+        fetch = FakeFetch()
+        prefetcher = HintPrefetcher(fetch, enabled=True)
+        session = make_session("What is 6 x 7?")
+
+        prefetcher.schedule(session, TOPIC)
+        prefetcher.schedule(session, TOPIC)
+        prefetcher.take(session)
+
+        assert fetch.calls == 1
+
+    def test_budget_caps_calls_per_session(self):
+        """Test that no more than ``budget`` prefetches run per session"""
+        fetch = FakeFetch()
+        prefetcher = HintPrefetcher(fetch, enabled=True, budget=2)
+        problems = ["What is 6 x 7?", "42", "What is 8 x 9?", "72", "What is 3 x 4?"]
+
+        results = [
+            prefetcher.schedule(make_session(*problems[: n + 1]), TOPIC)
+            for n in (0, 2, 4)
+        ]
+
+        assert results == [True, True, False]
+        assert prefetcher.spent("session_20240101_100000") == 2
+
+    def test_budgets_kept_for_recent_sessions(self, monkeypatch):
+        """Test that budget counts do not grow with every session ever seen"""
+        monkeypatch.setattr(hint_prefetch, "MAX_TRACKED_SESSIONS", 2)
+        prefetcher = HintPrefetcher(FakeFetch(), enabled=True)
+        for n in range(3):
+            session = make_session("What is 6 x 7?")
+            session.session_id = f"session_{n}"
+            prefetcher.schedule(session, TOPIC)
+
+        assert [prefetcher.spent(f"session_{n}") for n in range(3)] == [0, 1, 1]
+
+    def test_only_after_tutor_message(self):
+        """Test that nothing is prefetched while waiting on the tutor"""
+        fetch = FakeFetch()
+        prefetcher = HintPrefetcher(fetch, enabled=True)
+
+        assert not prefetcher.schedule(make_session("What is 6 x 7?", "42"), TOPIC)
+        assert fetch.calls == 0
+
+    def test_disabled_by_default(self):
+        """Test that prefetching is opt-in"""
+        fetch = FakeFetch()
+        prefetcher = HintPrefetcher(fetch, enabled=False)
+        session = make_session("What is 6 x 7?")
+
+        assert not prefetcher.schedule(session, TOPIC)
+        assert prefetcher.take(session) is None
+        assert fetch.calls == 0
+
+    def test_failed_prefetch_not_served(self):
+        """Test that a failed prefetch falls back to a normal request"""
+        prefetcher = HintPrefetcher(FakeFetch(result=False), enabled=True)
+        session = make_session("What is 6 x 7?")
+
+        prefetcher.schedule(session, TOPIC)
+
+        assert prefetcher.take(session) is None
+
+    def test_state_key_changes_with_messages(self):
+        """Test that the state key tracks the conversation"""
+        assert session_state_key(make_session("a")) != session_state_key(
+            make_session("a", "b", "c")
+        )
+
+
+class TestPrefetchHint:
+    """Tests for the ai_service side of prefetching"""
+
+    def test_generates_help_response(self, monkeypatch):
+        """Test that the prefetch asks exactly what the help button asks"""
+        prompts = []
+
+        def generate_content(contents):
+            prompts.append(contents)
+            return SimpleNamespace(text="Try 6 x 7 as 6 x 7 = 42?", usage_metadata=None)
+
+        model = SimpleNamespace(generate_content=generate_content)
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+
+        hint, usage = ai_service.prefetch_hint(TOPIC, [], "key")
+
+        assert hint.startswith("Try")
+        assert usage.prefetched
+        assert HELP_REQUEST_TEXT in prompts[0]
+
+    def test_no_key_returns_none(self):
+        """Test that nothing is returned without an API key"""
+        assert ai_service.prefetch_hint(TOPIC, [], None) is None
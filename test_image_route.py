@@ -0,0 +1,186 @@
+"""
+Tests for serving canvas images by content hash
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import image_route
+from canvas_images import CanvasImage
+from image_route import ImageStore, image_source, image_url
+from models import Session
+from session_manager import save_session
+
+
+PNG = CanvasImage(b"\x89PNG\r\n\x1a\n first")
+OTHER = CanvasImage(b"\x89PNG\r\n\x1a\n second")
+
+
+class TestImageStore:
+    """Tests for the in-memory content-addressed store"""
+
+    def test_url_names_content(self):
+        """Test that equal bytes share one URL and different bytes do not"""
+        store = ImageStore()
+
+        url = image_url(PNG, store)
+
+        assert url == f"/canvas-images/{PNG.digest}.png"
+        assert image_url(CanvasImage(bytes(PNG)), store) == url
+        assert image_url(OTHER, store) != url
+        assert store.get(PNG.digest) == bytes(PNG)
+
+    def test_url_names_message(self):
+        """Test that the URL says where the image is stored"""
+        url = image_url(PNG, ImageStore(), "session_20240101_100000", 3)
+
+        assert url == (
+            f"/canvas-images/{PNG.digest}.png"
+            "?session=session_20240101_100000&index=3"
+        )
+
+    def test_least_recently_used_evicted(self):
+        """Test that the store stays within its byte budget"""
+        store = ImageStore(max_bytes=len(PNG) + len(OTHER))
+        third = CanvasImage(b"\x89PNG\r\n\x1a\n third")
+        store.put(PNG)
+        store.put(OTHER)
+        store.get(PNG.digest)  # Now more recent than OTHER
+
+        store.put(third)
+
+        assert store.get(OTHER.digest) is None
+        assert store.get(PNG.digest) is not None
+        assert len(store) == 2
+
+    def test_bytes_without_server(self, monkeypatch):
+        """Test that images are passed inline when no route is mounted"""
+        monkeypatch.setattr(image_route, "_mounted", False)
+
+        assert image_source(PNG) == bytes(PNG)
+
+
+class TestImageEndpoint:
+    """Tests for the HTTP route"""
+
+    def setup_method(self):
+        """Register an image to serve and save a session holding another"""
+        self.requests = pytest.importorskip("starlette.requests")
+        self.store = ImageStore()
+        self.store.put(PNG)
+        self.temp_dir = Path(tempfile.mkdtemp())
+        image_route._lookups.clear()
+        session = Session(
+            session_id="session_20240101_100000",
+            topic_name="Geometry",
+            created_at="2024-01-01T10:00:00",
+            messages=[
+                {"role": "tutor", "content": "Draw a triangle"},
+                {"role": "student", "content": "", "canvas_image": OTHER},
+            ],
+        )
+        save_session(session, self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up the sessions directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def get(self, digest, query="", **headers):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": f"/canvas-images/{digest}.png",
+            "query_string": query.encode(),
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "path_params": {"digest": digest},
+        }
+        return image_route.image_endpoint(
+            self.requests.Request(scope), self.store, self.temp_dir
+        )
+
+    def test_serves_png_with_cache_headers(self):
+        """Test that images are immutable and carry a strong ETag"""
+        response = self.get(PNG.digest)
+
+        assert response.status_code == 200
+        assert response.body == bytes(PNG)
+        assert response.media_type == "image/png"
+        assert response.headers["etag"] == f'"{PNG.digest}"'
+        assert "immutable" in response.headers["cache-control"]
+        # Drawings are the student's own: no shared proxy may keep them
+        assert response.headers["cache-control"].startswith("private")
+
+    def test_not_modified(self):
+        """Test that a cached copy is revalidated without a body"""
+        etag = self.get(PNG.digest).headers["etag"]
+
+        response = self.get(PNG.digest, **{"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.body == b""
+
+    def test_unknown_image(self):
+        """Test that unregistered or malformed hashes are not found"""
+        assert self.get(OTHER.digest).status_code == 404
+        assert self.get("../secret").status_code == 404
+
+    def test_miss_found_in_session(self):
+        """Test that an image this process does not hold is read from disk"""
+        response = self.get(OTHER.digest, "session=session_20240101_100000&index=1")
+
+        assert response.status_code == 200
+        assert response.body == bytes(OTHER)
+        assert self.store.get(OTHER.digest) == bytes(OTHER)
+
+    def test_message_looked_up_once(self, monkeypatch):
+        """Test that repeated or wrong requests do not load the session again"""
+        loads = []
+        load_session = image_route.load_session
+        monkeypatch.setattr(
+            image_route,
+            "load_session",
+            lambda *args: loads.append(args) or load_session(*args),
+        )
+        query = "session=session_20240101_100000&index=1"
+        third = CanvasImage(b"\x89PNG\r\n\x1a\n third")
+
+        assert self.get(third.digest, query).status_code == 404
+        assert self.get(third.digest, query).status_code == 404
+        assert self.get(OTHER.digest, query).status_code == 200
+        assert len(loads) == 1
+
+    def test_miss_not_in_session(self):
+        """Test that the stored image must match the requested hash"""
+        third = CanvasImage(b"\x89PNG\r\n\x1a\n third")
+        session = "session=session_20240101_100000"
+
+        assert self.get(OTHER.digest, f"{session}&index=0").status_code == 404
+        assert self.get(OTHER.digest, f"{session}&index=9").status_code == 404
+        assert self.get(OTHER.digest, "session=../x&index=1").status_code == 404
+        assert self.get(OTHER.digest, "session=session_none&index=1").status_code == 404
+        # Looking the message up keeps its images, which are then served
+        assert self.get(third.digest, f"{session}&index=1").status_code == 404
+        assert self.get(OTHER.digest, f"{session}&index=0").status_code == 200
+
+
+def test_mount_images_route(monkeypatch):
+    """Test mounting the route ahead of the app's own routes"""
+    starlette_routing = pytest.importorskip("starlette.routing")
+    from starlette.applications import Starlette
+
+    monkeypatch.setattr(image_route, "_mounted", False)
+    app = Starlette(routes=[starlette_routing.Route("/", lambda request: None)])
+
+    assert image_route.mount_images(app)
+    assert image_route.mount_images(app)  # Idempotent
+    paths = [route.path for route in app.router.routes]
+    assert paths == ["/canvas-images/{digest}.png", "/"]
+    assert image_source(PNG) == image_url(PNG)
+
+
+def test_mount_images_without_server():
+    """Test that nothing is mounted outside the Solara server"""
+    assert image_route.mount_images() is False
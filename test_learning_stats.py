@@ -0,0 +1,296 @@
+"""
+Tests for incrementally maintained learning statistics
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import subprocess
+import sys
+
+from models import Session, HELP_REQUEST_TEXT
+from session_manager import save_session, register_save_hook, unregister_save_hook
+from learning_stats import (
+    LearningStats,
+    TopicStats,
+    get_learning_stats,
+    rebuild_stats,
+    record_session,
+)
+
+
+def make_session(session_id: str, topic: str = "Fractions") -> Session:
+    return Session(
+        topic_name=topic,
+        messages=[
+            {
+                "role": "tutor",
+                "content": "Simplify 6/8",
+                "timestamp": "2024-01-01 12:00:00",
+                "latency_ms": 1000.0,
+            }
+        ],
+        created_at="2024-01-01T12:00:00",
+        session_id=session_id,
+    )
+
+
+def add_turn(session: Session, content: str, canvas: bool = False, day: str = "01"):
+    session.messages.append(
+        {
+            "role": "student",
+            "content": content,
+            "canvas_image": "abc" if canvas else None,
+            "timestamp": f"2024-01-{day} 12:01:00",
+        }
+    )
+    session.messages.append(
+        {
+            "role": "tutor",
+            "content": "Good job!",
+            "timestamp": f"2024-01-{day} 12:01:05",
+            "latency_ms": 3000.0,
+        }
+    )
+
+
+class TestIncrementalStats:
+    """Tests for stats maintained from save_session"""
+
+    def setup_method(self):
+        """Create a temporary directory and register the save hook"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+        register_save_hook(record_session)
+
+    def teardown_method(self):
+        """Clean up temporary directory and hook"""
+        unregister_save_hook(record_session)
+        shutil.rmtree(self.temp_dir)
+
+    def test_counts_appended_messages_once(self):
+        """Test that repeated saves only count new messages"""
+        session = make_session("session_a")
+        save_session(session, self.temp_path)
+        add_turn(session, "3/4")
+        save_session(session, self.temp_path)
+        add_turn(session, "", canvas=True)
+        save_session(session, self.temp_path)
+
+        stats = get_learning_stats(self.temp_path).topic_stats()["Fractions"]
+
+        assert stats.sessions_started == 1
+        assert stats.student_turns == 2
+        assert stats.tutor_turns == 3
+        assert stats.vision_turns == 1
+        assert stats.text_turns == 1
+        assert stats.turns_per_session == 2.0
+        assert stats.avg_latency_ms == pytest.approx(7000.0 / 3)
+
+    def test_latency_only_for_model_calls(self):
+        """Test that turns answered without waiting on Gemini are not averaged"""
+        session = make_session("session_fast")
+        for flag in ("served_locally", "cache_hit", "prefetched"):
+            add_turn(session, "3/4")
+            session.messages[-1]["latency_ms"] = 2.0
+            session.messages[-1]["usage"] = {flag: True}
+        add_turn(session, "4/5")
+        save_session(session, self.temp_path)
+
+        stats = get_learning_stats(self.temp_path).topic_stats()["Fractions"]
+
+        assert stats.tutor_turns == 5
+        assert stats.latency_count == 2
+        assert stats.avg_latency_ms == pytest.approx(2000.0)
+
+    def test_counts_help_requests(self):
+        """Test that Ask for Help turns are counted"""
+        session = make_session("session_help")
+        add_turn(session, HELP_REQUEST_TEXT)
+        save_session(session, self.temp_path)
+
+        stats = get_learning_stats(self.temp_path).topic_stats("Fractions")
+
+        assert stats["Fractions"].help_requests == 1
+
+    def test_daily_stats(self):
+        """Test per-day aggregates and date range filtering"""
+        session = make_session("session_days")
+        add_turn(session, "3/4", day="01")
+        add_turn(session, "2/3", day="02")
+        save_session(session, self.temp_path)
+        save_session(make_session("session_other", topic="Multiplication"), self.temp_path)
+
+        stats = get_learning_stats(self.temp_path)
+        daily = stats.daily_stats()
+        fractions_day2 = stats.daily_stats(topic="Fractions", start="2024-01-02")
+
+        assert daily["2024-01-01"].sessions_started == 2
+        assert daily["2024-01-02"].student_turns == 1
+        assert list(fractions_day2) == ["2024-01-02"]
+
+    def test_daily_stats_for_topic_skips_other_days(self):
+        """Test that days with only other topics are not returned as empty"""
+        other = make_session("session_other", topic="Multiplication")
+        add_turn(other, "312", day="03")
+        save_session(other, self.temp_path)
+        save_session(make_session("session_fractions"), self.temp_path)
+
+        stats = get_learning_stats(self.temp_path)
+
+        assert list(stats.daily_stats(topic="Fractions")) == ["2024-01-01"]
+        assert list(stats.daily_stats(topic="Multiplication")) == [
+            "2024-01-01",
+            "2024-01-03",
+        ]
+
+    def test_stats_persist_across_instances(self):
+        """Test that stats are reloaded from disk"""
+        session = make_session("session_persist")
+        add_turn(session, "3/4")
+        save_session(session, self.temp_path)
+
+        reloaded = LearningStats(self.temp_path)
+
+        assert reloaded.topic_stats()["Fractions"].student_turns == 1
+
+
+class TestSharedStore:
+    """Tests for several processes updating the same statistics"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_workers_do_not_overwrite_each_other(self):
+        """Test that two server workers' counts add up"""
+        worker_a = LearningStats(self.temp_path)
+        worker_b = LearningStats(self.temp_path)
+
+        worker_a.record_session(make_session("session_a"))
+        worker_b.record_session(make_session("session_b"))
+        session = make_session("session_a")
+        add_turn(session, "3/4")
+        worker_b.record_session(session)
+
+        for worker in (worker_a, worker_b):
+            topic = worker.topic_stats()["Fractions"]
+            assert topic.sessions_started == 2
+            assert topic.student_turns == 1
+            assert topic.tutor_turns == 3
+
+    def test_rebuild_in_other_process_is_kept(self):
+        """Test that the server's next save does not undo a batch rebuild"""
+        server = LearningStats(self.temp_path)
+        for i in range(3):
+            session = make_session(f"session_{i}")
+            add_turn(session, "3/4")
+            save_session(session, self.temp_path)  # Saved without the hook
+        server.record_session(make_session("session_0"))
+
+        result = subprocess.run(
+            [sys.executable, "learning_stats.py", "--sessions-dir", self.temp_dir],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+
+        session = make_session("session_3")
+        save_session(session, self.temp_path)
+        server.record_session(session)
+
+        topic = server.topic_stats()["Fractions"]
+        assert topic.sessions_started == 4
+        assert topic.student_turns == 3
+
+    def test_legacy_json_imported(self):
+        """Test that statistics from the JSON store carry over"""
+        counts = {"sessions_started": 1, "student_turns": 2, "latency_count": 0}
+        legacy = {
+            "version": 1,
+            "topics": {"Fractions": counts},
+            "days": {"2024-01-01": {"Fractions": counts}},
+            "seen": {"session_old": 5},
+        }
+        (self.temp_path / "_learning_stats.json").write_text(json.dumps(legacy))
+
+        stats = LearningStats(self.temp_path)
+        session = make_session("session_old")
+        session.messages *= 5
+        stats.record_session(session)  # Nothing new since the import
+
+        topic = stats.topic_stats()["Fractions"]
+        assert topic.sessions_started == 1
+        assert topic.student_turns == 2
+        assert topic.tutor_turns == 0
+
+
+class TestRebuildStats:
+    """Tests for recomputing stats from scratch"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_rebuild_matches_incremental(self, workers):
+        """Test that a batch rebuild finds every saved session"""
+        for i in range(5):
+            session = make_session(f"session_{i}")
+            add_turn(session, "3/4", canvas=bool(i % 2))
+            save_session(session, self.temp_path)
+
+        stats = rebuild_stats(self.temp_path, workers=workers)
+        topic = stats.topic_stats()["Fractions"]
+
+        assert topic.sessions_started == 5
+        assert topic.student_turns == 5
+        assert topic.vision_turns == 2
+
+    def test_rebuild_then_incremental_does_not_double_count(self):
+        """Test that a rebuilt session is not recounted on its next save"""
+        session = make_session("session_x")
+        add_turn(session, "3/4")
+        save_session(session, self.temp_path)
+        rebuild_stats(self.temp_path)
+
+        add_turn(session, "4/5")
+        record_session(session, self.temp_path)
+
+        topic = get_learning_stats(self.temp_path).topic_stats()["Fractions"]
+        assert topic.sessions_started == 1
+        assert topic.student_turns == 2
+
+
+class TestTopicStats:
+    """Tests for TopicStats helpers"""
+
+    def test_empty_stats(self):
+        """Test derived values with no data"""
+        stats = TopicStats()
+
+        assert stats.turns_per_session == 0.0
+        assert stats.avg_latency_ms is None
+
+    def test_merge(self):
+        """Test merging counters"""
+        a = TopicStats(sessions_started=1, latency_ms_total=10.0, latency_count=1)
+        b = TopicStats(sessions_started=2, latency_ms_total=20.0, latency_count=1)
+
+        a.merge(b)
+
+        assert a.sessions_started == 3
+        assert a.avg_latency_ms == 15.0
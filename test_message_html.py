@@ -0,0 +1,81 @@
+"""
+Tests for pre-rendered, sanitized message HTML
+"""
+
+import pytest
+
+import message_html
+from message_html import message_html as render_message
+from message_html import prerender, render_markdown, sanitize_html
+
+
+class TestSanitize:
+    """Tests for the tag allowlist"""
+
+    def test_scripts_removed(self):
+        """Test that scripts and their text are dropped"""
+        assert sanitize_html("<p>Hi<script>alert(1)</script></p>") == "<p>Hi</p>"
+
+    def test_unknown_tags_and_attributes_dropped(self):
+        """Test that only allowlisted markup is kept, text escaped"""
+        markup = '<p onclick="x()">a <img src=x onerror=y> <iframe>b</iframe> &lt;</p>'
+
+        assert sanitize_html(markup) == "<p>a  b &lt;</p>"
+
+    def test_unsafe_links(self):
+        """Test that only http(s), mailto and in-page links keep their href"""
+        safe = sanitize_html('<a href="https://example.com/?a=1&amp;b=2">x</a>')
+        unsafe = sanitize_html('<a href=" JavaScript:alert(1)">x</a>')
+
+        assert 'href="https://example.com/?a=1&amp;b=2"' in safe
+        assert 'rel="noopener noreferrer"' in safe
+        assert "href" not in unsafe
+
+
+class TestRenderMarkdown:
+    """Tests for converting and caching message markdown"""
+
+    def setup_method(self):
+        pytest.importorskip("markdown")
+        message_html._cache.clear()
+
+    def test_markdown_converted(self):
+        """Test bold, lists and code in tutor explanations"""
+        rendered = render_markdown("**Good!**\n\n- 12 × 3\n- `36`")
+
+        assert rendered == (
+            "<p><strong>Good!</strong></p>\n<ul>\n<li>12 × 3</li>\n"
+            "<li><code>36</code></li>\n</ul>"
+        )
+
+    def test_typed_html_shown_as_text(self):
+        """Test that HTML in a message is escaped, not interpreted"""
+        assert render_markdown("<b>3</b> < 4") == "<p>&lt;b&gt;3&lt;/b&gt; &lt; 4</p>"
+
+    def test_converted_once(self, monkeypatch):
+        """Test that the same text is served from the cache"""
+        calls = []
+        convert = message_html._convert
+        monkeypatch.setattr(
+            message_html, "_convert", lambda text: calls.append(text) or convert(text)
+        )
+
+        first = render_markdown("Try **again**")
+
+        assert render_markdown("Try **again**") is first
+        assert calls == ["Try **again**"]
+
+    def test_label_inline(self):
+        """Test that the speaker label leads the first paragraph"""
+        rendered = render_message({"content": "Yes"}, "👧 Leia:")
+
+        assert rendered == "<p><strong>👧 Leia:</strong> Yes</p>"
+
+    def test_stored_html_used(self, monkeypatch):
+        """Test that stored HTML is used as is, and only stored when enabled"""
+        assert render_message({"content": "x", "content_html": "<p>y</p>"}) == (
+            "<p>y</p>"
+        )
+        assert prerender("*x*") is None
+        monkeypatch.setattr(message_html, "STORE_HTML", True)
+        assert prerender("*x*") == "<p><em>x</em></p>"
@@ -0,0 +1,174 @@
+"""
+Tests for the Prometheus-style metrics
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+from datetime import datetime
+
+import ai_service
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry
+from models import Session, Topic
+from session_manager import save_session, load_session
+from tracing import span
+
+
+TOPIC = Topic(
+    name="Math", objectives="", materials="Short.", examples=[], filename="m.md"
+)
+
+
+class FakeModel:
+    """Stands in for a Gemini model"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.in_flight_seen = None
+
+    def generate_content(self, prompt):
+        self.in_flight_seen = metrics.AI_IN_FLIGHT.value()
+        if self.error:
+            raise self.error
+        return type("Response", (), {"text": "Hello!"})()
+
+
+def sample(text: str, prefix: str) -> float:
+    """Value of the first exposition line starting with ``prefix``"""
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found in:\n{text}")
+
+
+class TestExposition:
+    """Tests for the text exposition format"""
+
+    def test_counter_and_gauge(self):
+        """Test HELP/TYPE headers and labelled samples"""
+        registry = Registry()
+        errors = registry.register(Counter("t_errors_total", "Errors.", ["function"]))
+        in_flight = registry.register(Gauge("t_in_flight", "In flight."))
+
+        errors.inc(function="a")
+        errors.inc(2, function="a")
+        with in_flight.track():
+            inside = in_flight.value()
+
+        text = registry.render()
+        assert "# TYPE t_errors_total counter" in text
+        assert sample(text, 't_errors_total{function="a"}') == 3
+        assert inside == 1
+        assert sample(text, "t_in_flight") == 0
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts, sum and count"""
+        registry = Registry()
+        hist = registry.register(Histogram("t_seconds", "Latency.", buckets=(0.1, 1)))
+
+        for value in (0.05, 0.5, 0.7, 3):
+            hist.observe(value)
+
+        text = registry.render()
+        assert sample(text, 't_seconds_bucket{le="0.1"}') == 1
+        assert sample(text, 't_seconds_bucket{le="1"}') == 3
+        assert sample(text, 't_seconds_bucket{le="+Inf"}') == 4
+        assert sample(text, "t_seconds_count") == 4
+        assert sample(text, "t_seconds_sum") == pytest.approx(4.25)
+
+    def test_wrong_labels_rejected(self):
+        """Test that label names must match the declaration"""
+        counter = Counter("t_total", "Test.", ["function"])
+
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+
+    def test_duplicate_registration_rejected(self):
+        """Test that a metric name can only be registered once"""
+        registry = Registry()
+        registry.register(Gauge("t_gauge", "Test."))
+
+        with pytest.raises(ValueError):
+            registry.register(Gauge("t_gauge", "Test."))
+
+
+class TestAppMetrics:
+    """Tests for the metrics fed by the app's code paths"""
+
+    def setup_method(self):
+        """Create temporary directory for test sessions"""
+        ai_service.response_cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_session_save_and_load_observed(self):
+        """Test that session storage spans feed the histograms"""
+        saves = metrics.SESSION_SAVE_SECONDS.count()
+        loads = metrics.SESSION_LOAD_SECONDS.count(archived="false")
+        session = Session(
+            topic_name="Math", messages=[], created_at=datetime.now().isoformat()
+        )
+
+        session_id = save_session(session, self.temp_path)
+        load_session(session_id, self.temp_path)
+
+        assert metrics.SESSION_SAVE_SECONDS.count() == saves + 1
+        assert metrics.SESSION_LOAD_SECONDS.count(archived="false") == loads + 1
+
+    def test_canvas_encode_observed(self):
+        """Test that the canvas encode span records time and size"""
+        sizes = metrics.CANVAS_IMAGE_BYTES.count()
+
+        with span("turn.png_encode") as encode_span:
+            encode_span.attrs["bytes"] = 20_000
+
+        assert metrics.CANVAS_IMAGE_BYTES.count() == sizes + 1
+
+    def test_ai_call_observed_and_in_flight(self, monkeypatch):
+        """Test AI latency and in-flight tracking around a successful call"""
+        model = FakeModel()
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+        calls = metrics.AI_REQUEST_SECONDS.count(kind="initial_task")
+
+        assert ai_service.generate_initial_task(TOPIC, "key") == "Hello!"
+
+        assert model.in_flight_seen >= 1
+        assert metrics.AI_IN_FLIGHT.value() == 0
+        assert metrics.AI_REQUEST_SECONDS.count(kind="initial_task") == calls + 1
+
+    def test_ai_errors_counted(self, monkeypatch):
+        """Test that returned error messages are counted per function"""
+        monkeypatch.setattr(
+            ai_service, "get_gemini_model", lambda key: FakeModel(RuntimeError("quota"))
+        )
+        before = metrics.AI_ERRORS.value(function="get_ai_feedback")
+
+        feedback = ai_service.get_ai_feedback(TOPIC, [], "42", None, "key")
+
+        assert feedback.startswith("Error getting feedback")
+        assert metrics.AI_ERRORS.value(function="get_ai_feedback") == before + 1
+        assert "leia_ai_errors_total" in metrics.REGISTRY.render()
+
+
+def test_mount_metrics_route():
+    """Test mounting the endpoint on a Starlette app"""
+    starlette_routing = pytest.importorskip("starlette.routing")
+    from starlette.applications import Starlette
+
+    app = Starlette(routes=[starlette_routing.Route("/", lambda request: None)])
+
+    assert metrics.mount_metrics(app)
+    assert metrics.mount_metrics(app)  # Idempotent
+    paths = [route.path for route in app.router.routes]
+    assert paths == ["/metrics", "/"]
+
+
+def test_mount_metrics_without_server():
+    """Test that nothing is mounted outside the Solara server"""
+    assert metrics.mount_metrics() is False
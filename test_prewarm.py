@@ -0,0 +1,182 @@
+"""
+Tests for background pre-warming and pre-generated greetings
+"""
+
+import threading
+from types import SimpleNamespace
+
+import ai_service
+from models import Topic
+from prewarm import GreetingPool, Prewarmer
+
+
+def make_topic(name: str = "History") -> Topic:
+    return Topic(
+        name=name, objectives="", materials="Short.", examples=[], filename="h.md"
+    )
+
+
+class FakeFetch:
+    """Counts greeting calls; each returns a numbered greeting"""
+
+    def __init__(self, result=True):
+        self.calls = 0
+        self.result = result
+        self._lock = threading.Lock()
+
+    def __call__(self, topic):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        return (f"Hello {number}", {"prefetched": True}) if self.result else None
+
+
+class TestPrewarmer:
+    """Tests for running warm-up steps and the readiness flag"""
+
+    def test_steps_run_in_order(self):
+        """Test that every step runs once and the flag is set after them"""
+        ran = []
+        prewarmer = Prewarmer(
+            [("a", lambda: ran.append("a")), ("b", lambda: ran.append("b"))],
+            enabled=True,
+        )
+
+        assert not prewarmer.ready
+        assert prewarmer.start()
+        assert prewarmer.start()  # Idempotent
+
+        assert prewarmer.wait(5)
+        assert ran == ["a", "b"]
+        assert set(prewarmer.timings) == {"a", "b"}
+
+    def test_failing_step_does_not_block_readiness(self):
+        """Test that an error is reported and the later steps still run"""
+        ran = []
+
+        def broken():
+            raise RuntimeError("no network")
+
+        prewarmer = Prewarmer(
+            [("client", broken), ("topics", lambda: ran.append("topics"))],
+            enabled=True,
+        )
+
+        prewarmer.run()
+
+        assert prewarmer.ready
+        assert ran == ["topics"]
+        assert prewarmer.errors == {"client": "no network"}
+
+    def test_ready_waits_for_running_step(self):
+        """Test that the page sees ``ready`` only once warming has finished"""
+        release = threading.Event()
+        prewarmer = Prewarmer([("slow", release.wait)], enabled=True)
+
+        prewarmer.start()
+
+        assert prewarmer.started
+        assert not prewarmer.wait(0.05)
+        release.set()
+        assert prewarmer.wait(5)
+
+    def test_disabled(self):
+        """Test that LEIA_PREWARM=0 runs nothing"""
+        ran = []
+        prewarmer = Prewarmer([("a", lambda: ran.append("a"))], enabled=False)
+
+        assert not prewarmer.start()
+        assert not prewarmer.started
+        assert ran == []
+
+
+class TestGreetingPool:
+    """Tests for handing out and refilling pre-generated greetings"""
+
+    def test_served_and_refilled(self):
+        """Test that a greeting is used once and replaced for the next student"""
+        fetch = FakeFetch()
+        pool = GreetingPool(fetch, enabled=True)
+        topic = make_topic()
+
+        pool.fill([topic])
+
+        assert pool.take(topic) == ("Hello 1", {"prefetched": True})
+        # The replacement was started when the first one was handed out
+        assert pool.take(topic) == ("Hello 2", {"prefetched": True})
+
+    def test_fill_once_per_topic(self):
+        """Test that filling again makes no new call"""
+        fetch = FakeFetch()
+        pool = GreetingPool(fetch, enabled=True)
+        topic = make_topic()
+
+        pool.fill([topic])
+        pool.fill([topic])
+
+        assert pool.take(topic)[0] == "Hello 1"
+        assert pool.take(topic)[0] == "Hello 2"
+
+    def test_edited_topic_not_served(self):
+        """Test that a greeting for an older version of a topic is dropped"""
+        fetch = FakeFetch()
+        pool = GreetingPool(fetch, enabled=True)
+        pool.fill([make_topic()])
+
+        edited = make_topic()
+
+        assert pool.take(edited) is None
+        # One for the edited topic was started instead
+        assert pool.take(edited) is not None
+
+    def test_failed_greeting_not_refilled(self):
+        """Test that a topic without a greeting falls back to a normal call"""
+        fetch = FakeFetch(result=False)
+        pool = GreetingPool(fetch, enabled=True)
+        topic = make_topic()
+
+        pool.fill([topic])
+
+        assert pool.take(topic) is None
+        assert pool.take(topic) is None
+        assert fetch.calls == 1
+
+    def test_disabled_by_default(self):
+        """Test that pre-generating greetings is opt-in"""
+        fetch = FakeFetch()
+        pool = GreetingPool(fetch, enabled=False)
+        topic = make_topic()
+
+        pool.fill([topic])
+
+        assert pool.take(topic) is None
+        assert fetch.calls == 0
+
+
+class TestPregenerateInitialTask:
+    """Tests for the ai_service side of pre-generated greetings"""
+
+    def test_generates_greeting(self, monkeypatch):
+        """Test that the greeting is a normal initial task, marked prefetched"""
+
+        def generate_content(contents):
+            return SimpleNamespace(text="Welcome! Who was Caesar?", usage_metadata=None)
+
+        model = SimpleNamespace(generate_content=generate_content)
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+
+        task, usage = ai_service.pregenerate_initial_task(make_topic(), "key")
+
+        assert task.startswith("Welcome")
+        assert usage.prefetched
+
+    def test_local_topic_skipped(self):
+        """Test that topics starting on a generated problem need no greeting"""
+        topic = make_topic("Multiplication Practice")
+        topic.metadata = {"problem_generator": "multiplication"}
+
+        assert ai_service.pregenerate_initial_task(topic, "key") is None
+
+    def test_no_key_returns_none(self):
+        """Test that nothing is returned without an API key"""
+        assert ai_service.pregenerate_initial_task(make_topic(), None) is None
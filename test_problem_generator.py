@@ -0,0 +1,137 @@
+"""
+Tests for procedural problem generators
+"""
+
+from fractions import Fraction
+
+import pytest
+
+import ai_service
+import answer_checker
+from ai_service import CallUsage
+from answer_checker import checker_for, generated_problem, local_feedback
+from models import Message, Problem, Topic
+from problem_generator import (
+    MultiplicationGenerator,
+    SimplifyFractionGenerator,
+    generator_for,
+)
+
+
+def make_topic(kind: str, **metadata) -> Topic:
+    return Topic(
+        name="Math",
+        objectives="",
+        materials="Short.",
+        examples=[],
+        filename="m.md",
+        metadata={"answer_checker": kind, "problem_generator": kind, **metadata},
+    )
+
+
+MULTIPLY = make_topic("multiplication", operand_range=[11, 99])
+FRACTIONS = make_topic("simplify_fraction", denominator_range=[2, 10])
+
+
+class TestGenerators:
+    """Tests for generated problems and their solutions"""
+
+    def test_multiplication_in_range(self):
+        """Test operands stay in range and solutions are exact"""
+        generator = MultiplicationGenerator({"operand_range": [11, 99]})
+
+        for generated in generator.generate(1000):
+            a, b = generated.problem.operands
+            assert 11 <= a <= 99 and 11 <= b <= 99
+            assert a % 10 and b % 10
+            assert generated.solution == f"{a * b:,}"
+
+    def test_fractions_reduce_to_solution(self):
+        """Test that every fraction needs simplifying to its solution"""
+        generator = SimplifyFractionGenerator({"gcd_range": [2, 4]})
+
+        for generated in generator.generate(1000):
+            n, d = generated.problem.operands
+            assert str(Fraction(n, d)) == generated.solution
+            assert Fraction(n, d).denominator < d
+            assert n < d
+
+    def test_solutions_agree_with_checker(self):
+        """Test that the answer checker accepts every generated solution"""
+        for topic in (MULTIPLY, FRACTIONS):
+            checker = checker_for(topic)
+            for generated in generator_for(topic).generate(200):
+                (problem,) = checker.find_problems(generated.text)
+                assert problem == generated.problem
+                assert checker.check(problem, generated.solution).correct
+
+    def test_seed_is_repeatable(self):
+        """Test that a seeded generator always gives the same batch"""
+        first = generator_for(MULTIPLY, seed="session").generate(5)
+
+        assert generator_for(MULTIPLY, seed="session").generate(5) == first
+
+    def test_owns(self):
+        """Test that intermediate steps are not taken as exercises"""
+        generator = MultiplicationGenerator({"operand_range": [11, 99]})
+
+        assert generator.owns(Problem("multiplication", (24, 13)))
+        assert not generator.owns(Problem("multiplication", (24, 3)))
+        assert not generator.owns(Problem("multiplication", (24, 40)))
+        assert not generator.owns(Problem("simplify_fraction", (24, 13)))
+
+    def test_invalid_range_uses_default(self):
+        """Test that a malformed front-matter range falls back"""
+        generator = MultiplicationGenerator({"operand_range": "big"})
+
+        assert generator.operands[0] == 11
+        assert generator.operands[-1] == 99
+
+    def test_topic_without_generator(self):
+        """Test that topics must opt in"""
+        assert generator_for(make_topic("")) is None
+
+
+class TestGeneratedSession:
+    """Tests for seeding sessions and next problems"""
+
+    def test_initial_task_without_model(self, monkeypatch):
+        """Test that a session starts without calling Gemini"""
+
+        def no_model(key):
+            raise AssertionError("model should not be used")
+
+        monkeypatch.setattr(ai_service, "get_gemini_model", no_model)
+        usage = CallUsage()
+
+        task = ai_service.generate_initial_task(MULTIPLY, None, usage=usage)
+
+        assert usage.served_locally
+        assert usage.model == "local"
+        assert len(checker_for(MULTIPLY).find_problems(task)) == 1
+
+    def test_next_problem_not_repeated(self):
+        """Test that the next problem differs from the one just solved"""
+        history = [Message(role="tutor", content="Multiply 24 × 13")]
+
+        upcoming = generated_problem(MULTIPLY, history)
+
+        assert upcoming != "Multiply 24 × 13"
+        assert generated_problem(MULTIPLY, history) == upcoming
+
+    def test_generated_problem_answered_locally(self, monkeypatch):
+        """Test that answer mode serves correct answers to generated problems"""
+        monkeypatch.setattr(answer_checker, "CHECK_MODE", "answer")
+        history = [Message(role="tutor", content="Simplify 12/16")]
+
+        result = answer_checker.check_answer(FRACTIONS, history, "3/4")
+        feedback = local_feedback(FRACTIONS, history, result)
+
+        assert feedback.startswith("Yes! 12/16 = 3/4")
+        assert "Simplify" in feedback.split("**")[1]
+
+
+@pytest.mark.parametrize("count", [1, 1000])
+def test_batch_size(count):
+    """Test that batches of any size are produced"""
+    assert len(generator_for(FRACTIONS).generate(count)) == count
@@ -0,0 +1,77 @@
+"""
+Tests for the component render profiler
+"""
+
+import pytest
+
+from render_profile import RenderProfiler
+
+
+class TestRenderProfiler:
+    """Tests for recording and reporting renders"""
+
+    def test_disabled_leaves_components_alone(self):
+        """Test that nothing is wrapped without the flag"""
+
+        def Page():
+            pass
+
+        assert RenderProfiler(enabled=False).profiled(Page) is Page
+
+    def test_summary_and_report(self):
+        """Test that renders are summed per component, slowest first"""
+        profiler = RenderProfiler(enabled=True)
+        profiler.record("ChatHistory", 30.0, "mount")
+        profiler.record("ChatHistory", 10.0, "current_session")
+        profiler.record("StatusMessage", 1.0, "status_message")
+
+        summary = profiler.summary()
+
+        assert list(summary) == ["ChatHistory", "StatusMessage"]
+        assert summary["ChatHistory"]["renders"] == 2
+        assert summary["ChatHistory"]["mean_ms"] == 20.0
+        assert summary["ChatHistory"]["max_ms"] == 30.0
+        assert summary["ChatHistory"]["triggers"] == {"mount": 1, "current_session": 1}
+        assert "current_session 1" in profiler.report()
+        profiler.reset()
+        assert profiler.report() == "No renders recorded.\n"
+
+    def test_trigger(self):
+        """Test that the watched values that changed are named"""
+        session, other = object(), object()
+
+        trigger = RenderProfiler._trigger
+
+        assert trigger(None, {"current_session": session}) == "mount"
+        assert trigger({"a": 1, "b": session}, {"a": 1, "b": other}) == "b"
+        assert trigger({"a": 1, "b": session}, {"a": 1, "b": session}) == "parent"
+
+
+def test_renders_in_solara():
+    """Test counting and attributing renders of real components"""
+    solara = pytest.importorskip("solara")
+    profiler = RenderProfiler(enabled=True)
+    count = solara.reactive(0)
+    profiler.watch(count=count)
+
+    @solara.component
+    @profiler.profiled
+    def Label():
+        solara.Text("static")
+
+    @solara.component
+    @profiler.profiled
+    def Count():
+        solara.Text(str(count.value))
+        Label()
+
+    _, rc = solara.render(Count(), handle_error=False)
+    try:
+        count.value = 1
+    finally:
+        rc.close()
+
+    summary = profiler.summary()
+    assert summary["Count"]["triggers"] == {"mount": 1, "count": 1}
+    # Unchanged arguments: reacton does not render the child again
+    assert summary["Label"]["triggers"] == {"mount": 1}
@@ -0,0 +1,173 @@
+"""
+Tests for the AI response cache
+"""
+
+from pathlib import Path
+import tempfile
+import shutil
+from types import SimpleNamespace
+
+import ai_service
+from ai_service import CallUsage
+from models import Message, Topic
+from response_cache import ResponseCache, make_key
+
+
+TOPIC = Topic(
+    name="Math", objectives="", materials="Short.", examples=[], filename="m.md"
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingModel:
+    """Gemini stand-in that counts calls"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    def generate_content(self, contents):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text=f"Feedback #{self.calls}", usage_metadata=None)
+
+
+class FakeImage:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def save(self, buffer, format):
+        buffer.write(self.data)
+
+
+class TestResponseCache:
+    """Tests for LRU/TTL behaviour"""
+
+    def setup_method(self):
+        """Create temporary directory for disk entries"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_hit_counts_per_entry(self):
+        """Test that hits are counted on the entry and in total"""
+        cache = ResponseCache(max_entries=4, clock=self.clock)
+        cache.put("k", "v")
+
+        assert cache.get("k") == "v"
+        assert cache.get("k") == "v"
+        assert cache.get("missing") is None
+
+        assert cache.entry("k").hits == 2
+        assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1}
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is dropped"""
+        cache = ResponseCache(max_entries=2, clock=self.clock)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")  # b is now least recently used
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL"""
+        cache = ResponseCache(max_entries=4, ttl_seconds=60, clock=self.clock)
+        cache.put("k", "v")
+
+        self.clock.now += 59
+        assert cache.get("k") == "v"
+        self.clock.now += 2
+        assert cache.get("k") is None
+        assert cache.entry("k") is None
+
+    def test_disk_persistence(self):
+        """Test that entries survive a new cache instance"""
+        first = ResponseCache(cache_dir=Path(self.temp_dir), clock=self.clock)
+        first.put("k", "saved")
+
+        second = ResponseCache(cache_dir=Path(self.temp_dir), clock=self.clock)
+        assert second.get("k") == "saved"
+
+    def test_disabled_when_size_zero(self):
+        """Test that a zero-size cache stores nothing"""
+        cache = ResponseCache(max_entries=0)
+        cache.put("k", "v")
+
+        assert not cache.enabled
+        assert cache.get("k") is None
+
+    def test_make_key_hashes_bytes(self):
+        """Test that keys differ by image content"""
+        assert make_key("p", b"one") != make_key("p", b"two")
+        assert make_key("p", b"one") == make_key("p", b"one")
+
+
+class TestFeedbackCaching:
+    """Tests for caching in get_ai_feedback"""
+
+    def setup_method(self):
+        """Start from an empty cache"""
+        ai_service.response_cache.clear()
+        self.history = [Message(role="tutor", content="What is 6 x 7?")]
+
+    def feedback(self, model, monkeypatch, canvas_image=None, **kwargs):
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+        return ai_service.get_ai_feedback(
+            TOPIC, self.history, "42", canvas_image, "key", **kwargs
+        )
+
+    def test_identical_request_served_from_cache(self, monkeypatch):
+        """Test that a resubmitted answer does not call the model again"""
+        model = CountingModel()
+        usage = CallUsage()
+
+        first = self.feedback(model, monkeypatch)
+        second = self.feedback(model, monkeypatch, usage=usage)
+
+        assert first == second == "Feedback #1"
+        assert model.calls == 1
+        assert usage.cache_hit
+        assert usage.model_latency_ms is None
+
+    def test_bypass_for_another_hint(self, monkeypatch):
+        """Test that use_cache=False always calls the model"""
+        model = CountingModel()
+
+        self.feedback(model, monkeypatch)
+        fresh = self.feedback(model, monkeypatch, use_cache=False)
+
+        assert fresh == "Feedback #2"
+        assert model.calls == 2
+
+    def test_canvas_is_part_of_key(self, monkeypatch):
+        """Test that a different drawing is a cache miss"""
+        model = CountingModel()
+
+        self.feedback(model, monkeypatch, canvas_image=FakeImage(b"one"))
+        self.feedback(model, monkeypatch, canvas_image=FakeImage(b"one"))
+        self.feedback(model, monkeypatch, canvas_image=FakeImage(b"two"))
+
+        assert model.calls == 2
+
+    def test_errors_not_cached(self, monkeypatch):
+        """Test that a failed call is retried next time"""
+        self.feedback(CountingModel(RuntimeError("quota")), monkeypatch)
+        model = CountingModel()
+
+        assert self.feedback(model, monkeypatch) == "Feedback #1"
+        assert model.calls == 1
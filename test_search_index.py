@@ -0,0 +1,174 @@
+"""
+Tests for the session full-text search index
+"""
+
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import sqlite3
+import threading
+
+from models import Session
+from session_manager import (
+    save_session,
+    load_session,
+    register_save_hook,
+    unregister_save_hook,
+)
+import search_index
+from search_index import index_session, rebuild_index, search_sessions
+
+
+def make_session(session_id: str, topic: str, day: str, student_text: str):
+    return Session(
+        topic_name=topic,
+        messages=[
+            {
+                "role": "tutor",
+                "content": "Let's find the greatest common divisor.",
+                "timestamp": f"{day} 12:00:00",
+            },
+            {
+                "role": "student",
+                "content": student_text,
+                "canvas_image": "iVBORw0KGgoAAAANSUhEUgAAAAEAAAAB",
+                "timestamp": f"{day} 12:01:00",
+            },
+        ],
+        created_at=f"{day}T12:00:00",
+        session_id=session_id,
+    )
+
+
+class TestSearchSessions:
+    """Tests for incremental indexing and search"""
+
+    def setup_method(self):
+        """Create a temporary directory and register the index hook"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+        register_save_hook(index_session)
+
+        save_session(
+            make_session("session_a", "Fractions", "2024-01-01", "Is it 3/4? pizza"),
+            self.temp_path,
+        )
+        save_session(
+            make_session("session_b", "Multiplication", "2024-02-01", "I carried a one"),
+            self.temp_path,
+        )
+
+    def teardown_method(self):
+        """Clean up temporary directory and hook"""
+        unregister_save_hook(index_session)
+        shutil.rmtree(self.temp_dir)
+
+    def test_keyword_search(self):
+        """Test finding a student message by keyword"""
+        hits = search_sessions(self.temp_path, "pizza")
+
+        assert len(hits) == 1
+        assert hits[0].session_id == "session_a"
+        assert hits[0].role == "student"
+        assert hits[0].message_index == 1
+        assert "«pizza»" in hits[0].snippet
+
+    def test_hits_link_back_to_sessions(self):
+        """Test that a hit's session_id loads the session"""
+        hit = search_sessions(self.temp_path, "carried")[0]
+
+        session = load_session(hit.session_id, self.temp_path)
+
+        assert session.messages[hit.message_index]["content"] == "I carried a one"
+
+    def test_filter_by_topic_and_date(self):
+        """Test topic and date range filters"""
+        assert len(search_sessions(self.temp_path, "divisor")) == 2
+        assert len(search_sessions(self.temp_path, "divisor", topic="Fractions")) == 1
+        hits = search_sessions(self.temp_path, "divisor", date_from="2024-01-15")
+        assert [h.session_id for h in hits] == ["session_b"]
+        hits = search_sessions(self.temp_path, "divisor", date_to="2024-01-15")
+        assert [h.session_id for h in hits] == ["session_a"]
+
+    def test_base64_images_are_not_indexed(self):
+        """Test that canvas image data is not searchable"""
+        assert search_sessions(self.temp_path, "iVBORw0KGgoAAAANSUhEUgAAAAEAAAAB") == []
+
+    def test_appended_messages_indexed_once(self):
+        """Test that re-saving a session only indexes new messages"""
+        session = load_session("session_a", self.temp_path)
+        session.messages.append({"role": "tutor", "content": "Great pizza slices!"})
+        save_session(session, self.temp_path)
+        save_session(session, self.temp_path)
+
+        hits = search_sessions(self.temp_path, "pizza")
+
+        assert sorted(h.message_index for h in hits) == [1, 2]
+
+    def test_query_syntax_is_escaped(self):
+        """Test that FTS operators in user input don't raise"""
+        assert search_sessions(self.temp_path, 'AND "(') == []
+        assert search_sessions(self.temp_path, "") == []
+
+    def test_rebuild_index(self):
+        """Test rebuilding from sessions written without the hook"""
+        session = make_session("session_c", "Fractions", "2024-03-01", "banana split")
+        with open(self.temp_path / "session_c.json", "w", encoding="utf-8") as f:
+            json.dump(session.__dict__, f)
+        assert search_sessions(self.temp_path, "banana") == []
+
+        count = rebuild_index(self.temp_path)
+
+        assert count == 3
+        assert search_sessions(self.temp_path, "banana")[0].session_id == "session_c"
+        assert len(search_sessions(self.temp_path, "pizza")) == 1
+
+
+class TestConcurrentIndexing:
+    """Tests for two processes indexing the same session"""
+
+    def setup_method(self):
+        """Create a temporary directory for the index"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_no_duplicate_rows(self):
+        """Test that a writer waits for the other's count before reading it"""
+        session = make_session("session_a", "Fractions", "2024-01-01", "pizza")
+        other = sqlite3.connect(
+            self.temp_path / "_search_index.sqlite3",
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        other.executescript(search_index._SCHEMA)
+        other.execute("BEGIN IMMEDIATE")
+        search_index._index_messages(
+            other, "session_a", "Fractions", session.created_at, session.messages
+        )
+        # The other process commits shortly after this one starts indexing
+        committer = threading.Timer(0.2, other.commit)
+        committer.start()
+        try:
+            index_session(session, self.temp_path)
+        finally:
+            committer.join()
+            other.close()
+
+        assert len(search_sessions(self.temp_path, "pizza")) == 1
+
+
+class TestSearchWithoutIndex:
+    """Tests for searching before anything is indexed"""
+
+    def test_missing_index_returns_nothing(self):
+        """Test searching a directory with no index"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            assert search_sessions(Path(temp_dir), "anything") == []
+        finally:
+            shutil.rmtree(temp_dir)
@@ -0,0 +1,236 @@
+"""
+Tests for cold-session archival
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import os
+import time
+
+import session_manager
+from session_manager import save_session, load_session, list_sessions
+from session_archive import (
+    INDEX_FILENAME,
+    archive_cold_sessions,
+    apply_retention,
+    get_archive_dir,
+    read_archive_index,
+    read_archived_session,
+)
+
+
+DAY = 24 * 60 * 60
+
+
+def write_session(sessions_dir: Path, session_id: str, age_days: float) -> Path:
+    """Write a pretty-printed session file with a backdated mtime"""
+    data = {
+        "topic_name": "Fractions",
+        "messages": [
+            {"role": "tutor", "content": "Simplify 6/8", "canvas_image": None},
+            {"role": "student", "content": "3/4", "canvas_image": "A" * 2000},
+        ],
+        "created_at": "2024-01-01T12:00:00",
+        "status": "active",
+        "session_id": session_id,
+    }
+    path = sessions_dir / f"{session_id}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestArchiveColdSessions:
+    """Tests for archive_cold_sessions function"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_archives_only_cold_sessions(self):
+        """Test that only sessions older than the threshold are archived"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        write_session(self.temp_path, "session_new", age_days=1)
+
+        report = archive_cold_sessions(self.temp_path, older_than_days=30)
+
+        assert report.archived == ["session_old"]
+        assert not (self.temp_path / "session_old.json").exists()
+        assert (self.temp_path / "session_new.json").exists()
+        assert (get_archive_dir(self.temp_path) / "session_old.json.gz").exists()
+
+    def test_report_counts_reclaimed_bytes(self):
+        """Test that the report reflects the compressed size"""
+        path = write_session(self.temp_path, "session_old", age_days=40)
+        original_size = path.stat().st_size
+
+        report = archive_cold_sessions(self.temp_path, older_than_days=30)
+
+        assert report.bytes_before == original_size
+        assert 0 < report.bytes_after < original_size
+        assert report.bytes_reclaimed == original_size - report.bytes_after
+        assert "reclaimed" in report.summary()
+
+    def test_unknown_codec_raises(self):
+        """Test that an unknown codec is rejected"""
+        with pytest.raises(ValueError):
+            archive_cold_sessions(self.temp_path, codec="rar")
+
+    def test_pack_by_month(self):
+        """Test packing archived sessions into per-month zip files"""
+        write_session(self.temp_path, "session_a", age_days=40)
+        write_session(self.temp_path, "session_b", age_days=40)
+
+        report = archive_cold_sessions(
+            self.temp_path, older_than_days=30, pack_by_month=True
+        )
+
+        packs = list(get_archive_dir(self.temp_path).glob("sessions_*.zip"))
+        assert len(report.archived) == 2
+        assert len(packs) >= 1
+        assert read_archived_session("session_a", self.temp_path) is not None
+        assert read_archived_session("session_b", self.temp_path) is not None
+
+
+class TestTransparentRestore:
+    """Tests for loading and listing archived sessions"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize("pack_by_month", [False, True])
+    def test_load_archived_session(self, pack_by_month):
+        """Test that load_session decompresses archived sessions"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(
+            self.temp_path, older_than_days=30, pack_by_month=pack_by_month
+        )
+
+        session = load_session("session_old", self.temp_path)
+
+        assert session is not None
+        assert session.session_id == "session_old"
+        assert session.messages[1]["canvas_image"].to_json() == "A" * 2000
+
+    def test_list_includes_archived_sessions(self):
+        """Test that list_sessions keeps archived sessions listed"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        write_session(self.temp_path, "session_new", age_days=1)
+        archive_cold_sessions(self.temp_path, older_than_days=30)
+
+        sessions = list_sessions(self.temp_path)
+
+        assert {s["session_id"] for s in sessions} == {"session_old", "session_new"}
+        assert all(s["message_count"] == 2 for s in sessions)
+
+    @pytest.mark.parametrize("pack_by_month", [False, True])
+    def test_list_reads_archive_index(self, monkeypatch, pack_by_month):
+        """Test that listing does not decompress archived sessions"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(
+            self.temp_path, older_than_days=30, pack_by_month=pack_by_month
+        )
+
+        def no_reads(ref):
+            raise AssertionError(f"{ref[0]} was decompressed")
+
+        monkeypatch.setattr(session_manager, "read_session_ref", no_reads)
+        sessions = list_sessions(self.temp_path)
+
+        assert [s["session_id"] for s in sessions] == ["session_old"]
+        assert sessions[0]["message_count"] == 2
+
+    def test_missing_index_entries_backfilled(self):
+        """Test that archives from before the index are still listed and indexed"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(self.temp_path, older_than_days=30)
+        (get_archive_dir(self.temp_path) / INDEX_FILENAME).unlink()
+
+        assert [s["session_id"] for s in list_sessions(self.temp_path)] == [
+            "session_old"
+        ]
+
+        archive_cold_sessions(self.temp_path, older_than_days=30)
+
+        index = read_archive_index(self.temp_path)
+        assert index["session_old"]["summary"]["message_count"] == 2
+
+    def test_resaved_session_is_not_listed_twice(self):
+        """Test that a hot copy shadows its archived version"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(self.temp_path, older_than_days=30)
+
+        session = load_session("session_old", self.temp_path)
+        session.messages.append({"role": "tutor", "content": "Welcome back"})
+        save_session(session, self.temp_path)
+
+        sessions = list_sessions(self.temp_path)
+        assert len(sessions) == 1
+        assert sessions[0]["message_count"] == 3
+        assert len(load_session("session_old", self.temp_path).messages) == 3
+
+    def test_rearchiving_replaces_old_copy(self):
+        """Test that archiving a resumed session replaces the stale archive entry"""
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(self.temp_path, older_than_days=30, pack_by_month=True)
+
+        session = load_session("session_old", self.temp_path)
+        session.messages.append({"role": "tutor", "content": "Welcome back"})
+        save_session(session, self.temp_path)
+        archive_cold_sessions(self.temp_path, older_than_days=0, pack_by_month=True)
+
+        sessions = list_sessions(self.temp_path)
+        assert len(sessions) == 1
+        assert sessions[0]["message_count"] == 3
+
+
+class TestApplyRetention:
+    """Tests for apply_retention function"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize("pack_by_month", [False, True])
+    def test_deletes_expired_archives(self, pack_by_month):
+        """Test that archived sessions past retention are deleted"""
+        write_session(self.temp_path, "session_ancient", age_days=400)
+        write_session(self.temp_path, "session_old", age_days=40)
+        archive_cold_sessions(
+            self.temp_path, older_than_days=30, pack_by_month=pack_by_month
+        )
+
+        report = apply_retention(self.temp_path, delete_after_days=365)
+
+        assert report.deleted == ["session_ancient"]
+        assert report.bytes_deleted > 0
+        assert set(read_archive_index(self.temp_path)) == {"session_old"}
+        assert load_session("session_ancient", self.temp_path) is None
+        assert load_session("session_old", self.temp_path) is not None
+
+    def test_retention_without_archive_dir(self):
+        """Test that retention is a no-op when nothing was archived"""
+        report = apply_retention(self.temp_path, delete_after_days=1)
+
+        assert report.deleted == []
@@ -0,0 +1,167 @@
+"""
+Tests for streaming session export
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+import base64
+import json
+import os
+import time
+
+from session_archive import archive_cold_sessions
+from session_export import export_sessions, decode_canvas_image
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def write_session(sessions_dir: Path, session_id: str, topic: str = "Math"):
+    """Write a session with one text turn and one canvas turn"""
+    data = {
+        "topic_name": topic,
+        "messages": [
+            {"role": "tutor", "content": "What is 12 × 34?", "canvas_image": None},
+            {
+                "role": "student",
+                "content": "(see canvas)",
+                "canvas_image": base64.b64encode(PNG_BYTES).decode("utf-8"),
+                "timestamp": "2024-01-01 12:01:00",
+            },
+        ],
+        "created_at": "2024-01-01T12:00:00",
+        "status": "active",
+        "session_id": session_id,
+    }
+    path = sessions_dir / f"{session_id}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def read_ndjson(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestExportSessions:
+    """Tests for export_sessions function"""
+
+    def setup_method(self):
+        """Create temporary session and output directories"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.sessions_dir = Path(self.temp_dir) / "sessions"
+        self.sessions_dir.mkdir()
+        self.out_dir = Path(self.temp_dir) / "export"
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_export_ndjson(self):
+        """Test exporting sessions and messages as NDJSON"""
+        write_session(self.sessions_dir, "session_a")
+        write_session(self.sessions_dir, "session_b", topic="Fractions")
+
+        report = export_sessions(self.sessions_dir, self.out_dir)
+
+        sessions = read_ndjson(report.sessions_path)
+        messages = read_ndjson(report.messages_path)
+        assert report.sessions == 2
+        assert report.messages == 4
+        assert {s["topic_name"] for s in sessions} == {"Math", "Fractions"}
+        assert sessions[0]["student_turns"] == 1
+        assert sessions[0]["image_count"] == 1
+        assert messages[1]["has_image"] is True
+        assert messages[1]["image_bytes"] == len(PNG_BYTES)
+        assert messages[1]["image_path"] is None
+
+    def test_export_images_as_files(self):
+        """Test that canvas images are written as separate files"""
+        write_session(self.sessions_dir, "session_a")
+
+        report = export_sessions(self.sessions_dir, self.out_dir, export_images=True)
+
+        messages = read_ndjson(report.messages_path)
+        image_path = Path(messages[1]["image_path"])
+        assert report.images == 1
+        assert image_path.read_bytes() == PNG_BYTES
+
+    def test_export_includes_archived_sessions(self):
+        """Test that archived sessions are exported too"""
+        path = write_session(self.sessions_dir, "session_old")
+        old = time.time() - 90 * 24 * 60 * 60
+        os.utime(path, (old, old))
+        archive_cold_sessions(self.sessions_dir, older_than_days=30)
+        write_session(self.sessions_dir, "session_new")
+
+        report = export_sessions(self.sessions_dir, self.out_dir)
+
+        sessions = read_ndjson(report.sessions_path)
+        assert {s["session_id"] for s in sessions} == {"session_old", "session_new"}
+
+    def test_export_with_process_pool(self):
+        """Test that a process pool produces the same rows in order"""
+        for i in range(10):
+            write_session(self.sessions_dir, f"session_{i:02d}")
+
+        report = export_sessions(self.sessions_dir, self.out_dir, workers=2)
+
+        sessions = read_ndjson(report.sessions_path)
+        assert [s["session_id"] for s in sessions] == [
+            f"session_{i:02d}" for i in range(10)
+        ]
+
+    def test_export_skips_corrupted_sessions(self):
+        """Test that corrupted files are counted as errors"""
+        write_session(self.sessions_dir, "session_ok")
+        (self.sessions_dir / "session_bad.json").write_text("{ invalid }")
+
+        report = export_sessions(self.sessions_dir, self.out_dir)
+
+        assert report.sessions == 1
+        assert report.errors == 1
+
+    def test_unknown_format_raises(self):
+        """Test that an unknown format is rejected"""
+        with pytest.raises(ValueError):
+            export_sessions(self.sessions_dir, self.out_dir, fmt="csv")
+
+    def test_export_parquet(self):
+        """Test exporting columnar Parquet tables"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        write_session(self.sessions_dir, "session_a")
+
+        report = export_sessions(self.sessions_dir, self.out_dir, fmt="parquet")
+
+        table = pq.read_table(report.messages_path)
+        assert table.num_rows == 2
+        assert table.column("role").to_pylist() == ["tutor", "student"]
+        assert table.column("has_image").to_pylist() == [False, True]
+
+    def test_export_arrow(self):
+        """Test exporting Arrow IPC tables"""
+        ipc = pytest.importorskip("pyarrow.ipc")
+        write_session(self.sessions_dir, "session_a")
+
+        report = export_sessions(self.sessions_dir, self.out_dir, fmt="arrow")
+
+        table = ipc.open_file(str(report.messages_path)).read_all()
+        assert table.num_rows == 2
+        assert table.column("has_image").to_pylist() == [False, True]
+
+
+class TestDecodeCanvasImage:
+    """Tests for decode_canvas_image function"""
+
+    def test_plain_base64(self):
+        """Test decoding plain base64"""
+        encoded = base64.b64encode(PNG_BYTES).decode("utf-8")
+        assert decode_canvas_image(encoded) == PNG_BYTES
+
+    def test_data_url(self):
+        """Test decoding a data URL"""
+        encoded = base64.b64encode(PNG_BYTES).decode("utf-8")
+        assert decode_canvas_image(f"data:image/png;base64,{encoded}") == PNG_BYTES
@@ -9,8 +9,15 @@ import shutil
 import json
 from datetime import datetime
 
+from canvas_images import CanvasImage
 from models import Session
-from session_manager import save_session, load_session, list_sessions
+from session_manager import (
+    save_session,
+    load_session,
+    list_sessions,
+    register_save_hook,
+    unregister_save_hook,
+)
 
 
 class TestSaveSession:
@@ -97,6 +104,17 @@ class TestSaveSession:
 
         assert data["topic_name"] == "Modified"
 
+    def test_save_session_creates_directory(self):
+        """Test that the sessions directory is created on first save"""
+        sessions_dir = self.temp_path / "not_yet_created"
+        session = Session(
+            topic_name="Test", messages=[], created_at=datetime.now().isoformat()
+        )
+
+        session_id = save_session(session, sessions_dir)
+
+        assert (sessions_dir / f"{session_id}.json").exists()
+
 
 class TestLoadSession:
     """Tests for load_session function"""
@@ -164,6 +182,26 @@ class TestLoadSession:
         assert session.status == "active"
         assert session.session_id == ""
 
+    def test_canvas_images_round_trip(self):
+        """Test that images are base64 in the file and bytes once loaded"""
+        png = b"\x89PNG\r\n\x1a\n fake"
+        session = Session(
+            topic_name="Math",
+            messages=[
+                {"role": "student", "content": "x", "canvas_image": CanvasImage(png)}
+            ],
+            created_at="2024-01-01T12:00:00",
+            session_id="session_img",
+        )
+
+        save_session(session, self.temp_path)
+        with open(self.temp_path / "session_img.json") as f:
+            stored = json.load(f)["messages"][0]["canvas_image"]
+        loaded = load_session("session_img", self.temp_path)
+
+        assert stored == CanvasImage(png).to_json()
+        assert loaded.messages[0]["canvas_image"].data == png
+
 
 class TestListSessions:
     """Tests for list_sessions function"""
@@ -298,3 +336,102 @@ class TestListSessions:
         # Should only include the valid session
         assert len(sessions) == 1
         assert sessions[0]["session_id"] == "session_valid"
+
+    def test_list_sessions_reads_only_changed_files(self, monkeypatch):
+        """Test that listing again reads only sessions saved since"""
+        import session_manager
+
+        for i in range(2):
+            save_session(
+                Session(
+                    topic_name="Math",
+                    messages=[],
+                    created_at=f"2024-01-0{i + 1}T12:00:00",
+                    session_id=f"session_{i}",
+                ),
+                self.temp_path,
+            )
+        list_sessions(self.temp_path)
+
+        reads = []
+        original = session_manager.read_session_ref
+
+        def counting_read(ref):
+            reads.append(ref[0])
+            return original(ref)
+
+        monkeypatch.setattr(session_manager, "read_session_ref", counting_read)
+        assert len(list_sessions(self.temp_path)) == 2
+        assert reads == []
+
+        session = load_session("session_1", self.temp_path)
+        session.messages.append({"role": "tutor", "content": "Hello"})
+        save_session(session, self.temp_path)
+        sessions = list_sessions(self.temp_path)
+
+        assert reads == ["session_1"]
+        assert sessions[0]["message_count"] == 1
+
+
+class TestSaveHooks:
+    """Tests for save hook registration"""
+
+    def setup_method(self):
+        """Create a temporary directory for test files"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+        self.calls = []
+
+    def teardown_method(self):
+        """Clean up temporary directory and hooks"""
+        unregister_save_hook(self.record_call)
+        unregister_save_hook(self.failing_hook)
+        shutil.rmtree(self.temp_dir)
+
+    def record_call(self, session, sessions_dir):
+        self.calls.append((session.session_id, sessions_dir))
+
+    def failing_hook(self, session, sessions_dir):
+        raise RuntimeError("boom")
+
+    def test_hook_called_after_save(self):
+        """Test that registered hooks see the saved session"""
+        register_save_hook(self.record_call)
+        session = Session(
+            topic_name="Math", messages=[], created_at="2024-01-01T12:00:00"
+        )
+
+        session_id = save_session(session, self.temp_path)
+
+        assert self.calls == [(session_id, self.temp_path)]
+
+    def test_hook_registered_once(self):
+        """Test that registering the same hook twice calls it once"""
+        register_save_hook(self.record_call)
+        register_save_hook(self.record_call)
+        session = Session(
+            topic_name="Math",
+            messages=[],
+            created_at="2024-01-01T12:00:00",
+            session_id="session_once",
+        )
+
+        save_session(session, self.temp_path)
+
+        assert len(self.calls) == 1
+
+    def test_failing_hook_does_not_break_save(self):
+        """Test that a hook error does not prevent saving or later hooks"""
+        register_save_hook(self.failing_hook)
+        register_save_hook(self.record_call)
+        session = Session(
+            topic_name="Math",
+            messages=[],
+            created_at="2024-01-01T12:00:00",
+            session_id="session_hook",
+        )
+
+        save_session(session, self.temp_path)
+
+        assert (self.temp_path / "session_hook.json").exists()
+        assert len(self.calls) == 1
@@ -0,0 +1,176 @@
+"""
+Tests for coalescing identical in-flight AI requests
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import ai_service
+import metrics
+from ai_service import CallUsage
+from models import Topic
+from single_flight import SingleFlight
+
+
+STUDENTS = 8
+
+
+def make_topic(name: str) -> Topic:
+    return Topic(
+        name=name,
+        objectives="",
+        materials="Short.",
+        examples=["6 x 7"],
+        filename="t.md",
+    )
+
+
+class BlockingBackend:
+    """Fake Gemini model that counts calls and holds them until released"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents):
+        with self._lock:
+            self.calls += 1
+        assert self.release.wait(timeout=5)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text="Hi! What is 6 x 7?", usage_metadata=None)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+class TestSingleFlight:
+    """Tests for the SingleFlight primitive"""
+
+    def test_sequential_calls_not_merged(self):
+        """Test that finished calls are not reused"""
+        flight = SingleFlight()
+
+        assert flight.do("k", lambda: 1) == (1, False)
+        assert flight.do("k", lambda: 2) == (2, False)
+        assert flight.merged == 0
+        assert flight.in_flight() == 0
+
+
+class TestCoalescedInitialTask:
+    """Concurrent identical requests against a counting fake backend"""
+
+    def setup_method(self):
+        """Use a fresh coalescer for each test"""
+        self.original = ai_service._in_flight_calls
+        ai_service._in_flight_calls = SingleFlight()
+
+    def teardown_method(self):
+        """Restore the shared coalescer"""
+        ai_service._in_flight_calls = self.original
+
+    def run_class(self, backend, monkeypatch, topics, options):
+        """Start one request per topic concurrently; release once all have queued.
+
+        ``options(i)`` gives the extra keyword arguments for student ``i``.
+        """
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: backend)
+        distinct = len({t.name for t in topics})
+        flight = ai_service._in_flight_calls
+        with ThreadPoolExecutor(max_workers=len(topics)) as pool:
+            futures = [
+                pool.submit(ai_service.generate_initial_task, t, "key", **options(i))
+                for i, t in enumerate(topics)
+            ]
+            wait_until(lambda: flight.merged == len(topics) - distinct)
+            backend.release.set()
+            return [f.result(timeout=5) for f in futures]
+
+    def test_identical_requests_share_one_call(self, monkeypatch):
+        """Test that a classroom starting one topic makes a single upstream call"""
+        backend = BlockingBackend()
+        before = metrics.AI_COALESCED.value(kind="initial_task")
+        usages = [CallUsage() for _ in range(STUDENTS)]
+
+        results = self.run_class(
+            backend,
+            monkeypatch,
+            [make_topic("Math")] * STUDENTS,
+            lambda i: {"usage": usages[i]},
+        )
+
+        assert backend.calls == 1
+        assert set(results) == {"Hi! What is 6 x 7?"}
+        assert sum(u.coalesced for u in usages) == STUDENTS - 1
+        assert sum(u.model_latency_ms is not None for u in usages) == 1
+        assert (
+            metrics.AI_COALESCED.value(kind="initial_task") == before + STUDENTS - 1
+        )
+
+    def test_per_caller_variation(self, monkeypatch):
+        """Test that personalization is applied after sharing"""
+        backend = BlockingBackend()
+
+        results = self.run_class(
+            backend,
+            monkeypatch,
+            [make_topic("Math")] * 3,
+            lambda i: {"personalize": lambda text, i=i: f"[{i}] {text}"},
+        )
+
+        assert backend.calls == 1
+        assert sorted(r[:3] for r in results) == ["[0]", "[1]", "[2]"]
+
+    def test_different_requests_not_merged(self, monkeypatch):
+        """Test that different topics each get their own call"""
+        backend = BlockingBackend()
+        topics = [make_topic("Math"), make_topic("Fractions")] * 2
+
+        self.run_class(backend, monkeypatch, topics, lambda i: {})
+
+        assert backend.calls == 2
+
+    def test_error_shared_by_waiters(self, monkeypatch):
+        """Test that every merged caller sees the failure"""
+        backend = BlockingBackend(error=RuntimeError("quota"))
+
+        results = self.run_class(
+            backend, monkeypatch, [make_topic("Math")] * 3, lambda i: {}
+        )
+
+        assert backend.calls == 1
+        assert all(r.startswith("Error generating task: quota") for r in results)
+
+
+def test_waiter_reraises_leader_error():
+    """Test SingleFlight error propagation directly"""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(timeout=5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", failing)
+        started.wait(timeout=5)
+        waiter = pool.submit(flight.do, "k", lambda: "unused")
+        wait_until(lambda: flight.merged == 1)
+        release.set()
+
+        with pytest.raises(ValueError):
+            leader.result(timeout=5)
+        with pytest.raises(ValueError):
+            waiter.result(timeout=5)
@@ -0,0 +1,119 @@
+"""
+Tests for startup-time profiling and lazy imports
+"""
+
+import subprocess
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+
+import startup_profile
+
+
+class TestStartupProfile:
+    """Tests for the import timeline"""
+
+    def setup_method(self):
+        """Create a throwaway module to import"""
+        startup_profile.reset()
+        self.temp_dir = tempfile.mkdtemp()
+        (Path(self.temp_dir) / "slow_profiled_module.py").write_text(
+            "import time\ntime.sleep(0.02)\n", encoding="utf-8"
+        )
+        sys.path.insert(0, self.temp_dir)
+
+    def teardown_method(self):
+        """Restore the import machinery and clean up"""
+        startup_profile.reset()
+        sys.path.remove(self.temp_dir)
+        sys.modules.pop("slow_profiled_module", None)
+        shutil.rmtree(self.temp_dir)
+
+    def test_disabled_without_env_flag(self, monkeypatch):
+        """Test that nothing is recorded unless the flag is set"""
+        monkeypatch.delenv(startup_profile.ENV_FLAG, raising=False)
+
+        assert startup_profile.start() is False
+        import slow_profiled_module  # noqa: F401
+
+        assert "slow_profiled_module" not in startup_profile.report()
+
+    def test_records_import_time(self, monkeypatch):
+        """Test that a first-time import is timed"""
+        monkeypatch.setenv(startup_profile.ENV_FLAG, "1")
+
+        assert startup_profile.start() is True
+        import slow_profiled_module  # noqa: F401
+        startup_profile.stop()
+
+        inclusive, own = startup_profile._imports["slow_profiled_module"]
+        assert own >= 15
+        assert inclusive >= own
+
+    def test_first_page_report_printed_once(self, capsys):
+        """Test the timeline and time-to-first-page verdict"""
+        startup_profile.start(force=True)
+        startup_profile.mark("app module imported")
+        startup_profile.first_page_rendered()
+        startup_profile.first_page_rendered()
+
+        out = capsys.readouterr().out
+        assert out.count("Startup timeline") == 1
+        assert "app module imported" in out
+        assert "Time to first page:" in out
+        assert "OK" in out
+
+
+def test_ai_service_imports_without_heavy_dependencies():
+    """Test that importing ai_service does not load Gemini or PIL"""
+    code = (
+        "import sys, ai_service; "
+        "print('google.generativeai' in sys.modules, 'PIL' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False False"
+
+
+def test_learning_stats_imports_without_export():
+    """Test that the app's statistics do not pull in the export (and pyarrow)"""
+    code = (
+        "import sys, learning_stats; "
+        "print('session_export' in sys.modules, 'pyarrow' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False False"
+
+
+def test_app_modules_import_without_numpy():
+    """Test that the app's own modules leave numpy to solara and canvas_delta"""
+    code = (
+        "import sys, models, topic_loader, session_manager, ai_service, "
+        "hint_prefetch, debounce, canvas_images, answer_checker, "
+        "learning_stats, search_index, metrics, image_route, message_html, "
+        "prewarm, render_profile, tracing; "
+        "print('numpy' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
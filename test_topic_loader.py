@@ -6,7 +6,18 @@ import pytest
 from pathlib import Path
 import tempfile
 import shutil
-from topic_loader import parse_markdown_topic, load_all_topics
+import os
+import topic_loader
+from topic_loader import (
+    parse_markdown_topic,
+    parse_topic_text,
+    load_all_topics,
+    get_topics,
+    build_topic_pack,
+    find_section,
+    iter_sections,
+)
+from topic_pack import read_topic_pack, packed_topic
 
 
 class TestParseMarkdownTopic:
@@ -110,6 +121,142 @@ Only materials here
         assert len(topic.examples) == 0
 
 
+class TestParseTopicStream:
+    """Tests for the single-pass section parser"""
+
+    CONTENT = """---
+generator: multiplication
+min_factor: 10
+grades: [3, 4]
+draft: false
+title: "Two digits"
+---
+# Multiplication
+
+## Materials
+Intro text.
+
+### Place Value
+Tens and ones.
+
+#### Deep heading stays in the body
+
+### Worked Example
+```
+## not a heading
+```
+
+## Teacher Notes
+Custom section.
+"""
+
+    def parse(self):
+        return parse_topic_text(self.CONTENT)
+
+    def test_front_matter(self):
+        """Test that front-matter values are parsed with simple types"""
+        metadata, _ = self.parse()
+
+        assert metadata == {
+            "generator": "multiplication",
+            "min_factor": 10,
+            "grades": [3, 4],
+            "draft": False,
+            "title": "Two digits",
+        }
+
+    def test_section_tree(self):
+        """Test that H1/H2/H3 headings form a tree"""
+        _, sections = self.parse()
+
+        assert [s.title for s in sections] == ["Multiplication"]
+        h2 = sections[0].children
+        assert [s.title for s in h2] == ["Materials", "Teacher Notes"]
+        assert [s.title for s in h2[0].children] == ["Place Value", "Worked Example"]
+        assert h2[1].body == "Custom section."
+
+    def test_offsets_slice_source(self):
+        """Test that start/end offsets delimit the section in the source"""
+        _, sections = self.parse()
+        place_value = find_section(sections, "place value")
+
+        text = self.CONTENT[place_value.start : place_value.end]
+
+        assert text.startswith("### Place Value\n")
+        assert place_value.body in text
+        assert "Worked Example" not in text
+
+    def test_parent_body_includes_subsections(self):
+        """Test that a section body includes its subsections"""
+        _, sections = self.parse()
+        materials = find_section(sections, "materials", level=2)
+
+        assert materials.body.startswith("Intro text.")
+        assert "### Place Value" in materials.body
+        assert "#### Deep heading stays in the body" in materials.body
+
+    def test_headings_in_code_blocks_ignored(self):
+        """Test that '##' lines inside fenced code are not headings"""
+        _, sections = self.parse()
+
+        assert find_section(sections, "not a heading") is None
+        assert "## not a heading" in find_section(sections, "worked example").body
+
+    def test_code_block_at_start_of_text(self):
+        """Test that a fence on the first line also hides headings"""
+        _, sections = parse_topic_text("```\n# not a heading\n```\n# Title\n")
+
+        assert [s.title for s in sections] == ["Title"]
+
+    def test_unclosed_code_block_runs_to_end(self):
+        """Test that headings after an unclosed fence stay in the body"""
+        _, sections = parse_topic_text("# Title\n```\n## Inside\n")
+
+        assert sections[0].children == []
+        assert sections[0].body == "```\n## Inside"
+
+    def test_unclosed_front_matter_is_body(self):
+        """Test that a leading '---' without a closing line is not front matter"""
+        metadata, sections = parse_topic_text(
+            "---\n# Title\nkey: value\n## Notes\nHi\n"
+        )
+
+        assert metadata == {}
+        assert sections[0].title == "Title"
+        assert sections[0].children[0].body == "Hi"
+
+    def test_no_front_matter(self):
+        """Test a file without front matter"""
+        metadata, sections = parse_topic_text("# Title\nBody\n")
+
+        assert metadata == {}
+        assert sections[0].body == "Body"
+
+    def test_iter_sections_document_order(self):
+        """Test depth-first iteration"""
+        _, sections = self.parse()
+
+        assert [s.level for s in iter_sections(sections)] == [1, 2, 3, 3, 2]
+
+    def test_topic_exposes_sections_and_metadata(self):
+        """Test that parse_markdown_topic keeps the structure"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = Path(temp_dir) / "mult.md"
+            filepath.write_text(self.CONTENT, encoding="utf-8")
+
+            topic = parse_markdown_topic(filepath)
+
+            assert topic.metadata["generator"] == "multiplication"
+            assert topic.name == "Multiplication"
+            assert "### Worked Example" in topic.materials
+            assert (
+                find_section(topic.sections, "teacher notes").body == "Custom section."
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+
 class TestLoadAllTopics:
     """Tests for load_all_topics function"""
 
@@ -207,3 +354,102 @@ Materials 2
 
         # At least the valid topic should be loaded
         assert "Valid" in topics or len(topics) >= 0  # Graceful failure
+
+    def test_get_topics_cached_until_changed(self):
+        """Test that topics are only parsed again after a file changes"""
+        topic_file = self.temp_path / "topic.md"
+        topic_file.write_text("# First\n\n## Materials\nTest", encoding="utf-8")
+
+        topics = get_topics(self.temp_path)
+
+        assert get_topics(self.temp_path) is topics
+        topic_file.write_text("# Second title\n\n## Materials\nTest", encoding="utf-8")
+        changed = get_topics(self.temp_path)
+        assert list(changed) == ["Second title"]
+        assert get_topics(self.temp_path) is changed
+
+
+class TestTopicPack:
+    """Tests for the precompiled topic pack"""
+
+    def setup_method(self):
+        """Create a temporary directory with two topics"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+        for i in range(2):
+            (self.temp_path / f"topic{i}.md").write_text(
+                f"# Topic {i}\n\n## Materials\nMaterials {i}\n\n"
+                f"## Example Problems\n- Problem {i}\n",
+                encoding="utf-8",
+            )
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_build_pack(self):
+        """Test that the pack is written with source hashes"""
+        path = build_topic_pack(self.temp_path)
+
+        pack = read_topic_pack(self.temp_path)
+        assert path.exists()
+        assert set(pack) == {"topic0.md", "topic1.md"}
+        assert len(pack["topic0.md"]["sha256"]) == 64
+
+    def test_load_uses_pack(self, monkeypatch):
+        """Test that unchanged sources are not parsed again"""
+        build_topic_pack(self.temp_path)
+        parsed = []
+        monkeypatch.setattr(
+            topic_loader,
+            "parse_markdown_topic",
+            lambda path: parsed.append(path),
+        )
+
+        topics = load_all_topics(self.temp_path)
+
+        assert parsed == []
+        assert topics["Topic 1"].materials == "Materials 1"
+        assert topics["Topic 1"].examples == ["Problem 1"]
+        assert topics["Topic 1"].sections[0].children[0].title == "Materials"
+
+    def test_changed_source_is_reparsed(self):
+        """Test falling back to parsing when a source changed"""
+        build_topic_pack(self.temp_path)
+        (self.temp_path / "topic0.md").write_text(
+            "# Topic 0\n\n## Materials\nEdited materials\n", encoding="utf-8"
+        )
+
+        topics = load_all_topics(self.temp_path)
+
+        assert topics["Topic 0"].materials == "Edited materials"
+        assert topics["Topic 1"].materials == "Materials 1"
+
+    def test_touched_source_uses_hash(self):
+        """Test that a new mtime with identical content still uses the pack"""
+        build_topic_pack(self.temp_path)
+        source = self.temp_path / "topic0.md"
+        os.utime(source, (1, 1))
+
+        entry = read_topic_pack(self.temp_path)["topic0.md"]
+
+        assert packed_topic(entry, source) is not None
+
+    def test_new_source_is_loaded(self):
+        """Test that topics added after the build are parsed"""
+        build_topic_pack(self.temp_path)
+        (self.temp_path / "topic2.md").write_text(
+            "# Topic 2\n\n## Materials\nNew\n", encoding="utf-8"
+        )
+
+        topics = load_all_topics(self.temp_path)
+
+        assert len(topics) == 3
+
+    def test_version_mismatch_ignores_pack(self):
+        """Test that a pack from another version is ignored"""
+        path = build_topic_pack(self.temp_path)
+        path.write_text('{"version": -1, "sources": {}}', encoding="utf-8")
+
+        assert read_topic_pack(self.temp_path) == {}
+        assert len(load_all_topics(self.temp_path)) == 2
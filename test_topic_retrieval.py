@@ -0,0 +1,150 @@
+"""
+Tests for retrieval of relevant topic material
+"""
+
+from pathlib import Path
+import tempfile
+import shutil
+
+from models import Topic
+from topic_loader import parse_markdown_topic
+from topic_retrieval import (
+    BM25Index,
+    MaterialChunk,
+    chunk_materials,
+    estimate_tokens,
+    select_materials,
+    tokenize,
+)
+
+
+FILLER = "This paragraph adds general practice text for the lesson. " * 20
+
+CONTENT = f"""# Simplifying Fractions
+
+## Learning Objectives
+- Find the GCD
+
+## Materials
+Fractions have a numerator and a denominator.
+
+### What is a Fraction?
+A fraction is part of a whole. {FILLER}
+
+### Finding the Greatest Common Divisor (GCD)
+The GCD is the largest number that divides both numbers. List the factors.
+{FILLER}
+
+### Worked Example: Simplify 12/16
+Divide 12 and 16 by their GCD 4 to get 3/4. {FILLER}
+
+## Example Problems
+- Simplify 8/12
+"""
+
+
+class TestSelectMaterials:
+    """Tests for BM25 chunk selection"""
+
+    def setup_method(self):
+        """Parse a topic with several H3 material chunks"""
+        self.temp_dir = tempfile.mkdtemp()
+        filepath = Path(self.temp_dir) / "fractions.md"
+        filepath.write_text(CONTENT, encoding="utf-8")
+        self.topic = parse_markdown_topic(filepath)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_chunks_follow_h3_sections(self):
+        """Test that materials are split into intro and H3 chunks"""
+        chunks = chunk_materials(self.topic)
+
+        assert [c.title for c in chunks] == [
+            "Materials",
+            "What is a Fraction?",
+            "Finding the Greatest Common Divisor (GCD)",
+            "Worked Example: Simplify 12/16",
+        ]
+        assert chunks[2].text.startswith("### Finding the Greatest")
+
+    def test_selects_relevant_chunk(self):
+        """Test that the best matching chunk is selected"""
+        selected = select_materials(
+            self.topic, "How do I find the GCD? What are the factors?", top_k=1
+        )
+
+        assert selected.startswith("### Finding the Greatest Common Divisor")
+        assert "Worked Example" not in selected
+
+    def test_respects_token_budget(self):
+        """Test that selected material stays within the budget"""
+        budget = 300
+        selected = select_materials(
+            self.topic, "fraction GCD simplify 12/16", top_k=3, token_budget=budget
+        )
+
+        assert selected is not None
+        assert estimate_tokens(selected) <= budget
+        assert len(selected) < len(self.topic.materials)
+
+    def test_chunks_kept_in_document_order(self):
+        """Test that multiple chunks are returned in document order"""
+        selected = select_materials(
+            self.topic, "simplify 12/16 GCD factors", top_k=2, token_budget=700
+        )
+
+        assert selected.index("Finding the Greatest") < selected.index("Worked Example")
+
+    def test_truncates_single_oversized_chunk(self):
+        """Test that the best chunk is cut to fit a tiny budget"""
+        selected = select_materials(self.topic, "GCD factors", token_budget=50)
+
+        assert selected.startswith("### Finding the Greatest")
+        assert estimate_tokens(selected) <= 50
+
+    def test_falls_back_when_nothing_matches(self):
+        """Test that an unrelated query returns None (use full materials)"""
+        assert select_materials(self.topic, "dinosaurs volcano") is None
+
+    def test_falls_back_for_small_materials(self):
+        """Test that materials already within budget are not trimmed"""
+        topic = Topic(
+            name="Small",
+            objectives="",
+            materials="Short materials about GCD.",
+            examples=[],
+            filename="small.md",
+        )
+
+        assert select_materials(topic, "GCD") is None
+
+    def test_topic_without_sections(self):
+        """Test chunking a Topic built without a section tree"""
+        topic = Topic(
+            name="Plain", objectives="", materials="Text", examples=[], filename="p.md"
+        )
+
+        assert [c.title for c in chunk_materials(topic)] == ["Materials"]
+
+
+class TestBM25Index:
+    """Tests for the BM25 scorer"""
+
+    def test_rare_terms_score_higher(self):
+        """Test that a chunk matching the query ranks first"""
+        index = BM25Index(
+            [
+                MaterialChunk("a", "carry the tens digit when multiplying", 0),
+                MaterialChunk("b", "estimate by rounding to the nearest ten", 1),
+            ]
+        )
+
+        scores = index.scores("how do I carry")
+
+        assert scores[0] > scores[1] == 0
+
+    def test_tokenize_drops_stopwords(self):
+        """Test tokenization"""
+        assert tokenize("What is the GCD of 12 and 16?") == ["gcd", "12", "16"]
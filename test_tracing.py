@@ -0,0 +1,103 @@
+"""
+Tests for tracing spans and the span ring buffer
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+from datetime import datetime
+
+import tracing
+from models import Session
+from session_manager import save_session, load_session
+from tracing import SpanBuffer, Span, recent_spans, span, stage_summary, trace
+
+
+class TestSpans:
+    """Tests for span recording"""
+
+    def setup_method(self):
+        """Start each test with an empty buffer"""
+        tracing.clear_spans()
+
+    def test_span_recorded_with_duration(self):
+        """Test that a finished span lands in the buffer"""
+        with span("stage.a", size=3) as current:
+            current.attrs["extra"] = True
+
+        recorded = recent_spans("stage.a")
+        assert len(recorded) == 1
+        assert recorded[0].duration_ms >= 0
+        assert recorded[0].attrs == {"size": 3, "extra": True}
+        assert recorded[0].trace_id is None
+
+    def test_span_records_error(self):
+        """Test that an exception is noted and re-raised"""
+        with pytest.raises(ValueError):
+            with span("stage.fail"):
+                raise ValueError("boom")
+
+        assert recent_spans("stage.fail")[0].error == "ValueError"
+
+    def test_trace_collects_stage_timings(self):
+        """Test that spans inside a trace share its id and add up by name"""
+        with trace("turn") as turn:
+            with span("stage.a"):
+                pass
+            with span("stage.a"):
+                pass
+            with span("stage.b"):
+                pass
+
+        assert set(turn.timings) == {"turn", "stage.a", "stage.b"}
+        assert {s.trace_id for s in recent_spans("stage.a")} == {turn.trace_id}
+        # The trace's own span covers all of its stages
+        assert turn.timings["turn"] >= turn.timings["stage.a"] + turn.timings["stage.b"]
+
+    def test_ring_buffer_keeps_latest(self):
+        """Test that the buffer drops the oldest spans"""
+        buffer = SpanBuffer(maxlen=3)
+        for i in range(5):
+            buffer.append(Span(name=f"s{i}", started_at=0.0))
+
+        assert [s.name for s in buffer.snapshot()] == ["s2", "s3", "s4"]
+
+    def test_stage_summary(self):
+        """Test per-stage percentiles"""
+        spans = [
+            Span(name="ai", started_at=0.0, duration_ms=ms) for ms in range(1, 101)
+        ]
+
+        summary = stage_summary(spans)
+
+        assert summary["ai"]["count"] == 100
+        assert summary["ai"]["p50_ms"] == pytest.approx(50, abs=1)
+        assert summary["ai"]["p95_ms"] == pytest.approx(95, abs=1)
+        assert summary["ai"]["max_ms"] == 100
+
+
+class TestSessionManagerSpans:
+    """Tests for spans emitted by session storage"""
+
+    def setup_method(self):
+        """Create temporary directory for test sessions"""
+        tracing.clear_spans()
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_and_load_traced(self):
+        """Test that save and load stages are timed"""
+        session = Session(
+            topic_name="Math", messages=[], created_at=datetime.now().isoformat()
+        )
+
+        session_id = save_session(session, self.temp_path)
+        load_session(session_id, self.temp_path)
+
+        assert recent_spans("session.write")
+        assert recent_spans("session.load")[0].attrs == {"archived": False}
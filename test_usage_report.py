@@ -0,0 +1,167 @@
+"""
+Tests for token/payload usage capture and the usage report
+"""
+
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+from dataclasses import asdict
+from types import SimpleNamespace
+
+import ai_service
+from ai_service import CallUsage
+from models import Session, Topic
+from session_manager import save_session
+from usage_report import aggregate_usage, format_report, main
+
+
+TOPIC = Topic(
+    name="Math", objectives="", materials="Short.", examples=["2 x 3"], filename="m.md"
+)
+
+
+class FakeModel:
+    """Gemini stand-in returning usage metadata"""
+
+    def __init__(self):
+        self.contents = None
+
+    def generate_content(self, contents):
+        self.contents = contents
+        return SimpleNamespace(
+            text="Great job!",
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=120,
+                candidates_token_count=30,
+                total_token_count=150,
+            ),
+        )
+
+
+class FakeImage:
+    """Just enough of a PIL image for encoding"""
+
+    def save(self, buffer, format):
+        buffer.write(b"\x89PNG" + b"\0" * 96)
+
+
+def tutor_message(usage: dict) -> dict:
+    return {"role": "tutor", "content": "Hi", "usage": usage}
+
+
+class TestUsageCapture:
+    """Tests for usage recorded by ai_service"""
+
+    def setup_method(self):
+        """Make sure every call reaches the model"""
+        ai_service.response_cache.clear()
+
+    def test_usage_filled_in(self, monkeypatch):
+        """Test that token counts and latency are captured"""
+        model = FakeModel()
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+        usage = CallUsage()
+
+        text = ai_service.generate_initial_task(TOPIC, "key", usage=usage)
+
+        assert text == "Great job!"
+        assert (usage.input_tokens, usage.output_tokens, usage.total_tokens) == (
+            120,
+            30,
+            150,
+        )
+        assert usage.model_latency_ms is not None
+        assert usage.prompt_chars == len(model.contents)
+        assert usage.context_strategy == "full"
+
+    def test_image_bytes_counted(self, monkeypatch):
+        """Test that the canvas is sent as an inline PNG and its size recorded"""
+        model = FakeModel()
+        monkeypatch.setattr(ai_service, "get_gemini_model", lambda key: model)
+        usage = CallUsage()
+
+        ai_service.get_ai_feedback(TOPIC, [], "", FakeImage(), "key", usage=usage)
+
+        prompt, part = model.contents
+        assert part["mime_type"] == "image/png"
+        assert usage.image_bytes == len(part["data"]) == 100
+
+    def test_no_call_leaves_usage_empty(self):
+        """Test that a missing API key records no call"""
+        usage = CallUsage()
+
+        ai_service.get_ai_feedback(TOPIC, [], "42", None, None, usage=usage)
+
+        assert usage.model_latency_ms is None
+
+
+class TestUsageReport:
+    """Tests for usage aggregation"""
+
+    def setup_method(self):
+        """Create sessions with recorded usage"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_path = Path(self.temp_dir)
+        retrieval = asdict(
+            CallUsage(
+                context_strategy="retrieval",
+                input_tokens=100,
+                output_tokens=20,
+                image_bytes=2048,
+                model_latency_ms=800.0,
+            )
+        )
+        full = asdict(
+            CallUsage(input_tokens=300, output_tokens=40, model_latency_ms=1200.0)
+        )
+        for i, (topic, usages) in enumerate(
+            [("Fractions", [retrieval, full]), ("Multiplication", [full])]
+        ):
+            save_session(
+                Session(
+                    topic_name=topic,
+                    messages=[tutor_message(u) for u in usages]
+                    + [{"role": "student", "content": "4"}, tutor_message(None)],
+                    created_at=f"2024-01-0{i + 1}T10:00:00",
+                    session_id=f"session_2024010{i + 1}_100000",
+                ),
+                self.temp_path,
+            )
+
+    def teardown_method(self):
+        """Clean up temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_by_topic(self):
+        """Test per-topic totals"""
+        totals = aggregate_usage(self.temp_path, "topic")
+
+        fractions = totals["Fractions"]
+        assert fractions.calls == 2
+        assert fractions.total_tokens == 460
+        assert fractions.image_calls == 1
+        assert fractions.avg_latency_ms == pytest.approx(1000.0)
+        assert totals["Multiplication"].input_tokens == 300
+
+    def test_by_strategy(self):
+        """Test per-context-strategy totals"""
+        totals = aggregate_usage(self.temp_path, "strategy")
+
+        assert totals["retrieval"].calls == 1
+        assert totals["full"].calls == 2
+
+    def test_report_and_cli(self, capsys):
+        """Test the text report, heaviest first"""
+        report = format_report(aggregate_usage(self.temp_path, "topic"), "topic")
+        lines = report.splitlines()
+        assert lines[1].startswith("Fractions")
+
+        main(["--sessions-dir", str(self.temp_path), "--by", "session", "--json"])
+        out = capsys.readouterr().out
+        assert '"session_20240101_100000"' in out
+
+    def test_rejects_unknown_grouping(self):
+        """Test group_by validation"""
+        with pytest.raises(ValueError):
+            aggregate_usage(self.temp_path, "student")
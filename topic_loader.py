@@ -2,43 +2,174 @@
 Topic loading and parsing functionality
 """
 
+from bisect import bisect_right
+from itertools import chain
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
 import re
+import threading
 
-from models import Topic
+from models import Topic, TopicSection
+from topic_pack import read_topic_pack, packed_topic, write_topic_pack
+
+# Headings (H1-H3) and code fences at the start of a line. Each pattern
+# starts with a newline and a fixed character, which lets the regex engine
+# skip quickly between the few lines that can match.
+_HEADING = r"(#{1,3})[ \t]+([^\n]*)"
+_FENCE = r"(?:```|~~~)"
+HEADING_RE = re.compile(r"\n" + _HEADING)
+FIRST_HEADING_RE = re.compile(_HEADING)
+FENCE_RE = re.compile(r"\n" + _FENCE)
+FIRST_FENCE_RE = re.compile(_FENCE)
+CLOSING_HASHES_RE = re.compile(r"(?:^|[ \t]+)#+[ \t]*$")
+FRONT_MATTER_END_RE = re.compile(r"^---[ \t]*$", re.MULTILINE)
+
+
+def _parse_scalar(value: str) -> Any:
+    """Interpret a front-matter value: int, float, bool, [list] or string"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.startswith("[") and value.endswith("]"):
+        inner = value[1:-1].strip()
+        return [_parse_scalar(item) for item in inner.split(",")] if inner else []
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_front_matter(text: str) -> Dict[str, Any]:
+    metadata = {}
+    for line in text.splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            metadata[key.strip()] = _parse_scalar(value)
+    return metadata
+
+
+def _split_front_matter(text: str) -> Tuple[str, int]:
+    """Front-matter text and the offset where the markdown starts.
+
+    A leading ``---`` that is never closed is not front matter, so such a
+    file is parsed as plain markdown rather than swallowed whole.
+    """
+    first_line, newline, _ = text.partition("\n")
+    if first_line.strip() != "---" or not newline:
+        return "", 0
+    match = FRONT_MATTER_END_RE.search(text, len(first_line) + 1)
+    if match is None:
+        return "", 0
+    return text[len(first_line) + 1 : match.start()], match.end() + 1
+
+
+def parse_topic_text(text: str) -> Tuple[Dict[str, Any], List[TopicSection]]:
+    """Parse markdown text into its front matter and section tree.
+
+    Returns the front-matter metadata (a leading ``---`` block of
+    ``key: value`` lines) and the tree of H1-H3 sections with character
+    offsets. Headings inside fenced code blocks are ignored; deeper headings
+    stay in the body text.
+    """
+    front_matter, scan_from = _split_front_matter(text)
+    roots: List[TopicSection] = []
+    stack: List[TopicSection] = []
+    body_starts: List[Tuple[TopicSection, int]] = []
+
+    def close(until_level: int, end: int) -> None:
+        while stack and stack[-1].level >= until_level:
+            stack.pop().end = end
+
+    # Headings are in a code block after an odd number of fences
+    fences = [m.start() for m in FENCE_RE.finditer(text, scan_from)]
+    if FIRST_FENCE_RE.match(text, scan_from):
+        fences.insert(0, scan_from)
+
+    first = FIRST_HEADING_RE.match(text, scan_from)
+    matches = HEADING_RE.finditer(text, scan_from)
+    for match in chain([first], matches) if first else matches:
+        if bisect_right(fences, match.start()) % 2:
+            continue
+        level = len(match.group(1))
+        start = match.start(1)
+        close(level, start)
+        title = match.group(2)
+        if "#" in title:
+            title = CLOSING_HASHES_RE.sub("", title)
+        section = TopicSection(
+            level=level, title=title.strip(), start=start, end=start, body=""
+        )
+        (stack[-1].children if stack else roots).append(section)
+        stack.append(section)
+        body_starts.append((section, match.end() + 1))
+
+    close(1, len(text))
+
+    # Bodies are sliced from the text once, already stripped (an outer
+    # section's body holds all of its subsections, so copies add up)
+    for section, body_start in body_starts:
+        start, end = body_start, section.end
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        section.body = text[start:end]
+
+    return _parse_front_matter(front_matter), roots
+
+
+def iter_sections(sections: List[TopicSection]) -> Iterator[TopicSection]:
+    """Walk a section tree depth-first, in document order"""
+    for section in sections:
+        yield section
+        yield from iter_sections(section.children)
+
+
+def find_section(
+    sections: List[TopicSection], title: str, level: Optional[int] = None
+) -> Optional[TopicSection]:
+    """Find the first section whose title contains ``title`` (case-insensitive)"""
+    needle = title.lower()
+    for section in iter_sections(sections):
+        if needle in section.title.lower() and level in (None, section.level):
+            return section
+    return None
 
 
 def parse_markdown_topic(filepath: Path) -> Topic:
     """Parse a markdown file into a Topic object"""
     with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+        metadata, sections = parse_topic_text(f.read())
 
-    # Extract title (first H1)
-    title_match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
-    name = title_match.group(1) if title_match else filepath.stem
+    all_sections = list(iter_sections(sections))
 
-    # Split by H2 headers
-    sections = re.split(r"\n##\s+", content)
+    # Title is the first H1, falling back to the file name
+    h1 = next((s for s in all_sections if s.level == 1), None)
+    name = h1.title if h1 else filepath.stem
 
     objectives = ""
     materials = ""
     examples = []
 
-    for section in sections[1:]:  # Skip the part before first H2
-        lines = section.split("\n", 1)
-        header = lines[0].strip()
-        body = lines[1].strip() if len(lines) > 1 else ""
+    for section in all_sections:
+        if section.level != 2:
+            continue
+        header = section.title.lower()
 
-        if "learning objective" in header.lower():
-            objectives = body
-        elif "material" in header.lower():
-            materials = body
-        elif "example problem" in header.lower():
+        if "learning objective" in header:
+            objectives = section.body
+        elif "material" in header:
+            materials = section.body
+        elif "example problem" in header:
             # Extract list items
             examples = [
                 line.strip("- ").strip()
-                for line in body.split("\n")
+                for line in section.body.split("\n")
                 if line.strip().startswith("-")
             ]
 
@@ -48,21 +179,82 @@ def parse_markdown_topic(filepath: Path) -> Topic:
         materials=materials,
         examples=examples,
         filename=filepath.name,
+        metadata=metadata,
+        sections=sections,
     )
 
 
-def load_all_topics(topics_dir: Path) -> Dict[str, Topic]:
-    """Load all topics from the topics directory"""
+def load_all_topics(topics_dir: Path, use_pack: bool = True) -> Dict[str, Topic]:
+    """Load all topics from the topics directory.
+
+    Topics come from the precompiled pack (see build_topic_pack) when it is
+    present and its source is unchanged; any other file is parsed.
+    """
     topics = {}
     if not topics_dir.exists():
         topics_dir.mkdir(exist_ok=True)
         return topics
 
+    pack = read_topic_pack(topics_dir) if use_pack else {}
+
     for md_file in topics_dir.glob("*.md"):
         try:
-            topic = parse_markdown_topic(md_file)
+            topic = packed_topic(pack.get(md_file.name), md_file)
+            if topic is None:
+                topic = parse_markdown_topic(md_file)
             topics[topic.name] = topic
         except Exception as e:
             print(f"Error loading topic {md_file}: {e}")
 
     return topics
+
+
+_topics_cache: Dict[Path, Tuple[Tuple, Dict[str, Topic]]] = {}
+_topics_cache_lock = threading.Lock()
+
+
+def _topics_signature(topics_dir: Path) -> Tuple:
+    """Name, mtime and size of every topic file, to notice any change"""
+    files = []
+    for md_file in topics_dir.glob("*.md"):
+        stat = md_file.stat()
+        files.append((md_file.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(files))
+
+
+def get_topics(topics_dir: Path) -> Dict[str, Topic]:
+    """Topics of a directory, loaded again only when a topic file changes.
+
+    Costs a stat per topic file instead of reading them, so the UI can call
+    it on every render. The returned dict is shared and must not be changed.
+    """
+    signature = _topics_signature(topics_dir) if topics_dir.exists() else ()
+    key = topics_dir.resolve()
+    with _topics_cache_lock:
+        cached = _topics_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    topics = load_all_topics(topics_dir)
+    with _topics_cache_lock:
+        _topics_cache[key] = (signature, topics)
+    return topics
+
+
+def build_topic_pack(topics_dir: Path) -> Path:
+    """Parse every topic and write the precompiled pack"""
+    topics = load_all_topics(topics_dir, use_pack=False)
+    return write_topic_pack(topics_dir, topics.values())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: build the topic pack"""
+    parser = argparse.ArgumentParser(description="Compile topics into a pack")
+    parser.add_argument("--topics-dir", type=Path, default=Path("topics"))
+    args = parser.parse_args(argv)
+
+    path = build_topic_pack(args.topics_dir)
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
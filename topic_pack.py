@@ -0,0 +1,147 @@
+"""
+Precompiled topic pack: all parsed topics in one versioned JSON file
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from models import Topic, TopicSection
+
+
+PACK_FILENAME = ".topic_pack.json"
+PACK_VERSION = 2  # Bump whenever the Topic fields or parsing rules change
+
+
+def get_pack_path(topics_dir: Path) -> Path:
+    return topics_dir / PACK_FILENAME
+
+
+def hash_source(filepath: Path) -> str:
+    """SHA-256 of a topic source file"""
+    return hashlib.sha256(filepath.read_bytes()).hexdigest()
+
+
+def read_topic_pack(topics_dir: Path) -> Dict[str, Dict]:
+    """Return the pack entries keyed by source filename ({} if missing/stale)"""
+    path = get_pack_path(topics_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            pack = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error reading topic pack {path}: {e}")
+        return {}
+
+    if pack.get("version") != PACK_VERSION:
+        return {}
+    return pack.get("sources", {})
+
+
+def _encode_text(source: str, value: str):
+    """Store a string as a [start, end] span of the source when possible.
+
+    Section bodies overlap heavily (an H2 body contains its H3 bodies), so
+    spans keep the pack close to the size of the sources themselves.
+    """
+    start = source.find(value) if value else -1
+    return [start, start + len(value)] if start >= 0 else value
+
+
+def _decode_text(source: str, value) -> str:
+    return source[value[0] : value[1]] if isinstance(value, list) else value
+
+
+def _encode_section(source: str, section: TopicSection) -> List:
+    return [
+        section.level,
+        section.title,
+        section.start,
+        section.end,
+        _encode_text(source, section.body),
+        [_encode_section(source, child) for child in section.children],
+    ]
+
+
+def _decode_section(source: str, data: List) -> TopicSection:
+    level, title, start, end, body, children = data
+    return TopicSection(
+        level,
+        title,
+        start,
+        end,
+        _decode_text(source, body),
+        [_decode_section(source, child) for child in children],
+    )
+
+
+def encode_topic(topic: Topic, source: str) -> Dict:
+    """Compact, JSON-ready form of a parsed Topic"""
+    data = asdict(topic)
+    data["objectives"] = _encode_text(source, topic.objectives)
+    data["materials"] = _encode_text(source, topic.materials)
+    data["sections"] = [_encode_section(source, s) for s in topic.sections]
+    return data
+
+
+def decode_topic(data: Dict, source: str) -> Topic:
+    """Rebuild a Topic from encode_topic output and its source text"""
+    return Topic(
+        **{
+            **data,
+            "objectives": _decode_text(source, data["objectives"]),
+            "materials": _decode_text(source, data["materials"]),
+            "sections": [_decode_section(source, s) for s in data["sections"]],
+        }
+    )
+
+
+def packed_topic(entry: Optional[Dict], filepath: Path) -> Optional[Topic]:
+    """Return the packed Topic for a source file if the source is unchanged.
+
+    A matching size and mtime is trusted; otherwise the source hash decides,
+    so touching a file without editing it does not force a re-parse.
+    """
+    if not entry:
+        return None
+    stat = filepath.stat()
+    if stat.st_size != entry["size"]:
+        return None
+    if (
+        stat.st_mtime_ns != entry["mtime_ns"]
+        and hash_source(filepath) != entry["sha256"]
+    ):
+        return None
+    return decode_topic(entry["topic"], entry["source"])
+
+
+def write_topic_pack(topics_dir: Path, topics: Iterable[Topic]) -> Path:
+    """Write the pack for already-parsed topics, recording source hashes"""
+    sources = {}
+    for topic in topics:
+        filepath = topics_dir / topic.filename
+        stat = filepath.stat()
+        source = filepath.read_text(encoding="utf-8")
+        sources[topic.filename] = {
+            "sha256": hash_source(filepath),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "source": source,
+            "topic": encode_topic(topic, source),
+        }
+
+    path = get_pack_path(topics_dir)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": PACK_VERSION, "sources": sources},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,156 @@
+"""
+Lexical retrieval of relevant topic material (BM25 over H3 chunks)
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from models import Topic
+from topic_loader import find_section
+
+
+TOKEN_RE = re.compile(r"[a-z]+|\d+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its "
+    "let me my of on or our so that the their this to us we what when which "
+    "with you your".split()
+)
+CHARS_PER_TOKEN = 4  # Rough estimate, good enough for budgeting
+DEFAULT_TOP_K = 3
+DEFAULT_TOKEN_BUDGET = 600
+
+
+@dataclass
+class MaterialChunk:
+    """One retrievable piece of a topic's materials"""
+
+    title: str
+    text: str  # Heading plus body, as it would appear in the prompt
+    position: int  # Order within the materials
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_materials(topic: Topic) -> List[MaterialChunk]:
+    """Split the Materials section into its introduction and H3 subsections"""
+    section = find_section(topic.sections, "material", level=2)
+    if section is None or not section.children:
+        if not topic.materials:
+            return []
+        return [MaterialChunk(title="Materials", text=topic.materials, position=0)]
+
+    chunks = []
+    intro = section.body.split("\n### ", 1)[0].strip()
+    if intro and not intro.startswith("### "):
+        chunks.append(MaterialChunk(title="Materials", text=intro, position=0))
+    for child in section.children:
+        chunks.append(
+            MaterialChunk(
+                title=child.title,
+                text=f"### {child.title}\n{child.body}",
+                position=len(chunks),
+            )
+        )
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks"""
+
+    def __init__(self, chunks: List[MaterialChunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._terms = [Counter(tokenize(c.text)) for c in chunks]
+        self._lengths = [sum(t.values()) for t in self._terms]
+        self._avg_length = (sum(self._lengths) / len(chunks)) if chunks else 0.0
+        doc_freq: Counter = Counter()
+        for terms in self._terms:
+            doc_freq.update(terms.keys())
+        n = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        result = []
+        for terms, length in zip(self._terms, self._lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            result.append(score)
+        return result
+
+
+_index_cache: Dict[Tuple[str, int], BM25Index] = {}
+_index_lock = threading.Lock()
+_MAX_CACHED_INDEXES = 64
+
+
+def get_topic_index(topic: Topic) -> BM25Index:
+    """Return the (cached) BM25 index for a topic's materials"""
+    key = (topic.name, hash(topic.materials))
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            if len(_index_cache) >= _MAX_CACHED_INDEXES:
+                _index_cache.pop(next(iter(_index_cache)))
+            index = _index_cache[key] = BM25Index(chunk_materials(topic))
+        return index
+
+
+def select_materials(
+    topic: Topic,
+    query: str,
+    top_k: int = DEFAULT_TOP_K,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> Optional[str]:
+    """Pick the materials most relevant to ``query`` within a token budget.
+
+    Returns None when retrieval would not help - the full materials already
+    fit the budget, or nothing in them matches the query - so callers fall
+    back to the full materials.
+    """
+    if estimate_tokens(topic.materials) <= token_budget:
+        return None
+
+    index = get_topic_index(topic)
+    scores = index.scores(query)
+    ranked = sorted(
+        (i for i, score in enumerate(scores) if score > 0),
+        key=lambda i: scores[i],
+        reverse=True,
+    )
+    if not ranked:
+        return None
+
+    best = index.chunks[ranked[0]].text
+    if estimate_tokens(best) > token_budget:
+        # Even the best chunk alone is too long; send its beginning
+        return best[: (token_budget - 1) * CHARS_PER_TOKEN]
+
+    chosen = []
+    used = 0
+    for i in ranked[:top_k]:
+        cost = estimate_tokens(index.chunks[i].text)
+        if used + cost <= token_budget:
+            chosen.append(i)
+            used += cost
+
+    # Keep document order so worked examples read naturally
+    return "\n\n".join(index.chunks[i].text for i in sorted(chosen))
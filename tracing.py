@@ -0,0 +1,156 @@
+"""
+Lightweight tracing spans recorded into an in-memory ring buffer
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+BUFFER_SIZE = int(os.getenv("LEIA_TRACE_BUFFER_SIZE", "2048"))
+# Store per-stage timings on tutor messages (off by default to keep sessions small)
+STORE_TURN_TIMINGS = os.getenv("LEIA_STORE_TURN_TIMINGS") == "1"
+
+
+@dataclass
+class Span:
+    """One timed stage"""
+
+    name: str
+    started_at: float  # Wall-clock time.time()
+    duration_ms: float = 0.0
+    trace_id: Optional[str] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None  # Exception type name if the stage raised
+
+
+@dataclass
+class Trace:
+    """Groups the spans of one user action (e.g. a submitted turn)"""
+
+    name: str
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    timings: Dict[str, float] = field(default_factory=dict)  # span name -> ms
+
+    def rounded_timings(self) -> Dict[str, float]:
+        return {name: round(ms, 1) for name, ms in self.timings.items()}
+
+
+class SpanBuffer:
+    """Thread-safe ring buffer holding the most recent spans"""
+
+    def __init__(self, maxlen: int = BUFFER_SIZE):
+        self._spans: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def append(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def snapshot(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+_buffer = SpanBuffer()
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("leia_trace", default=None)
+_span_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """Call ``listener(span)`` whenever a span finishes"""
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[Span], None]) -> None:
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time the enclosed block; the yielded Span can take extra attrs"""
+    active = _current_trace.get()
+    current = Span(
+        name=name,
+        started_at=time.time(),
+        trace_id=active.trace_id if active else None,
+        attrs=attrs,
+    )
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1000
+        _buffer.append(current)
+        if active is not None:
+            active.timings[name] = active.timings.get(name, 0.0) + current.duration_ms
+        for listener in list(_span_listeners):
+            try:
+                listener(current)
+            except Exception as e:
+                print(f"Error in span listener: {e}")
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Start a trace; spans opened inside it (in this context) join it.
+
+    The trace itself is recorded as a span named ``name`` covering the block.
+    """
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        with span(name):
+            yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def recent_spans(name: Optional[str] = None, limit: Optional[int] = None) -> List[Span]:
+    """Most recent spans from the ring buffer, oldest first"""
+    spans = _buffer.snapshot()
+    if name is not None:
+        spans = [s for s in spans if s.name == name]
+    return spans[-limit:] if limit else spans
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stage_summary(spans: Optional[List[Span]] = None) -> Dict[str, Dict[str, float]]:
+    """Count, p50, p95 and max duration (ms) per span name"""
+    by_name: Dict[str, List[float]] = {}
+    for s in recent_spans() if spans is None else spans:
+        by_name.setdefault(s.name, []).append(s.duration_ms)
+
+    summary = {}
+    for name, durations in by_name.items():
+        durations.sort()
+        summary[name] = {
+            "count": len(durations),
+            "p50_ms": _percentile(durations, 0.5),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1],
+        }
+    return summary
+
+
+def clear_spans() -> None:
+    _buffer.clear()
@@ -0,0 +1,128 @@
+"""
+Token and payload usage report built from the usage stored on tutor messages
+"""
+
+import argparse
+import json
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from session_manager import iter_session_refs, read_session_ref
+
+
+GROUP_BY = ("topic", "session", "strategy", "model")
+
+
+@dataclass
+class UsageTotals:
+    """Summed usage for one group of AI calls"""
+
+    calls: int = 0
+    cache_hits: int = 0  # Responses served from the cache (no model call)
+    coalesced: int = 0  # Responses shared with an identical in-flight call
+    local: int = 0  # Turns answered by the local answer checker
+    input_tokens: int = 0
+    output_tokens: int = 0
+    image_bytes: int = 0
+    image_calls: int = 0
+    model_latency_ms_total: float = 0.0
+
+    @property
+    def avg_latency_ms(self) -> Optional[float]:
+        return self.model_latency_ms_total / self.calls if self.calls else None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, usage: Dict) -> None:
+        if usage.get("cache_hit"):
+            self.cache_hits += 1
+            return
+        if usage.get("coalesced"):
+            self.coalesced += 1
+            return
+        if usage.get("served_locally"):
+            self.local += 1
+            return
+        self.calls += 1
+        self.input_tokens += usage.get("input_tokens") or 0
+        self.output_tokens += usage.get("output_tokens") or 0
+        self.image_bytes += usage.get("image_bytes") or 0
+        if usage.get("image_bytes"):
+            self.image_calls += 1
+        self.model_latency_ms_total += usage.get("model_latency_ms") or 0.0
+
+
+def _group_key(group_by: str, session: Dict, usage: Dict) -> str:
+    if group_by == "topic":
+        return session.get("topic_name", "")
+    if group_by == "session":
+        return session.get("session_id", "")
+    if group_by == "strategy":
+        return usage.get("context_strategy", "unknown")
+    return usage.get("model", "unknown")
+
+
+def aggregate_usage(
+    sessions_dir: Path, group_by: str = "topic"
+) -> Dict[str, UsageTotals]:
+    """Sum usage over all stored sessions (including archived ones)"""
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {GROUP_BY}")
+
+    totals: Dict[str, UsageTotals] = {}
+    for ref in iter_session_refs(sessions_dir):
+        try:
+            session = read_session_ref(ref)
+        except Exception as e:
+            print(f"Error reading session {ref[1]}: {e}")
+            continue
+        for msg in session.get("messages", []):
+            usage = msg.get("usage")
+            if msg.get("role") != "tutor" or not usage:
+                continue
+            key = _group_key(group_by, session, usage)
+            totals.setdefault(key, UsageTotals()).add(usage)
+    return totals
+
+
+def format_report(totals: Dict[str, UsageTotals], group_by: str) -> str:
+    """Plain-text table, heaviest token users first"""
+    lines = [
+        f"{group_by:<32} {'calls':>6} {'cached':>6} {'shared':>6} {'local':>6} "
+        f"{'in tok':>9} {'out tok':>9} {'tok/call':>9} {'img KB':>8} {'avg ms':>8}"
+    ]
+    ranked = sorted(totals.items(), key=lambda item: item[1].total_tokens, reverse=True)
+    for key, t in ranked:
+        avg = t.avg_latency_ms
+        lines.append(
+            f"{key[:32]:<32} {t.calls:>6} {t.cache_hits:>6} {t.coalesced:>6} "
+            f"{t.local:>6} "
+            f"{t.input_tokens:>9} {t.output_tokens:>9} "
+            f"{t.total_tokens / (t.calls or 1):>9.0f} {t.image_bytes / 1024:>8.0f} "
+            f"{avg if avg is not None else 0:>8.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Report AI token and payload usage")
+    parser.add_argument("--sessions-dir", type=Path, default=Path("sessions"))
+    parser.add_argument("--by", choices=GROUP_BY, default="topic")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead")
+    args = parser.parse_args(argv)
+
+    totals = aggregate_usage(args.sessions_dir, group_by=args.by)
+    if args.json:
+        print(json.dumps({key: asdict(t) for key, t in totals.items()}, indent=2))
+    elif not totals:
+        print("No usage recorded yet.")
+    else:
+        print(format_report(totals, args.by))
+
+
+if __name__ == "__main__":
+    main()